@@ -0,0 +1,79 @@
+"""Benchmark cache codecs: encode/decode time and encoded size
+
+Usage:
+    python benchmarks/cache_codecs.py [--items 5000] [--rounds 20]
+
+Codecs whose optional dependency is not installed are skipped.
+"""
+
+import argparse
+from pathlib import Path
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import nonebot
+
+nonebot.init(localstore_use_cwd=True)
+nonebot.require("nonebot_plugin_monitor")
+
+from nonebot_plugin_monitor.cache import CODEC_FACTORIES, decode_data, encode_data
+
+
+def make_snapshot(items: int) -> dict:
+    """Build a snapshot resembling a news list site"""
+    return {
+        "timestamp": 1700000000.0,
+        "items": [
+            {
+                "id": 100000 + i,
+                "title": f"第 {i} 条快讯：某公司发布公告称拟回购股份",
+                "url": f"https://example.com/news/{100000 + i}",
+                "tags": ["公告", "回购", f"tag{i % 7}"],
+                "score": i * 0.37,
+                "pinned": i % 11 == 0,
+            }
+            for i in range(items)
+        ],
+    }
+
+
+def bench(data: dict, codec: str, compression: str, rounds: int) -> tuple[float, float, int]:
+    raw = encode_data(data, codec, compression)
+    assert decode_data(raw, codec, compression) == data
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        encode_data(data, codec, compression)
+    encode_ms = (time.perf_counter() - start) / rounds * 1000
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        decode_data(raw, codec, compression)
+    decode_ms = (time.perf_counter() - start) / rounds * 1000
+
+    return encode_ms, decode_ms, len(raw)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    data = make_snapshot(args.items)
+    print(f"{'codec':<20}{'encode ms':>12}{'decode ms':>12}{'size KiB':>12}")
+    for codec in CODEC_FACTORIES:
+        for compression in ("none", "zstd"):
+            label = codec if compression == "none" else f"{codec}+zstd"
+            try:
+                encode_ms, decode_ms, size = bench(data, codec, compression, args.rounds)
+            except ImportError as e:
+                print(f"{label:<20}skipped ({e.name} not installed)")
+                continue
+            print(f"{label:<20}{encode_ms:>12.2f}{decode_ms:>12.2f}{size / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
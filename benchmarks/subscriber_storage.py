@@ -0,0 +1,87 @@
+"""Benchmark subscriber storage: memory and fan-out time, lists of str vs SubscriberSet
+
+Usage:
+    python benchmarks/subscriber_storage.py [--subscribers 1000000] [--sites 20]
+"""
+
+import argparse
+import json
+from pathlib import Path
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import nonebot
+
+nonebot.init(localstore_use_cwd=True)
+nonebot.require("nonebot_plugin_monitor")
+
+from nonebot_plugin_monitor.manager import SubscriptionManager
+
+
+def make_subscriptions(subscribers: int, sites: int) -> dict[str, dict[str, list[str]]]:
+    """Spread QQ-like ids over sites, with 5% of them subscribed to 全部"""
+    rng = random.Random(0)
+    data: dict[str, dict[str, list[str]]] = {f"site_{i}": {"users": [], "groups": []} for i in range(sites)}
+    data["all"] = {"users": [], "groups": []}
+    for _ in range(subscribers):
+        member = str(rng.randrange(10_000_000, 4_000_000_000))
+        site = "all" if rng.random() < 0.05 else f"site_{rng.randrange(sites)}"
+        data[site]["groups" if rng.random() < 0.2 else "users"].append(member)
+    return data
+
+
+def legacy_subscribers(data: dict[str, dict[str, list[str]]], site_name: str) -> list[int]:
+    """The previous fan-out: concatenate lists and parse every id when sending"""
+    subscribers = [*data[site_name]["users"], *data[site_name]["groups"], *data["all"]["users"], *data["all"]["groups"]]
+    return [int(subscriber) for subscriber in subscribers]
+
+
+def measure(build):
+    """Run `build` once for time and once under tracemalloc for the memory its result retains"""
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=1_000_000)
+    parser.add_argument("--sites", type=int, default=20)
+    args = parser.parse_args()
+
+    raw = make_subscriptions(args.subscribers, args.sites)
+    encoded = json.dumps(raw)
+
+    legacy, legacy_bytes, legacy_load = measure(lambda: json.loads(encoded))
+    manager = SubscriptionManager()
+    compact, compact_bytes, compact_load = measure(lambda: manager._from_dict(json.loads(encoded)))
+    manager.subscriptions = compact
+
+    start = time.perf_counter()
+    for i in range(args.sites):
+        legacy_subscribers(legacy, f"site_{i}")
+    legacy_fan_out = (time.perf_counter() - start) / args.sites * 1000
+
+    start = time.perf_counter()
+    for i in range(args.sites):
+        manager.get_subscribers(f"site_{i}")
+    compact_fan_out = (time.perf_counter() - start) / args.sites * 1000
+
+    print(f"{args.subscribers} subscriptions over {args.sites} sites")
+    print(f"{'storage':<16}{'memory MiB':>12}{'load s':>10}{'fan-out ms':>12}")
+    print(f"{'list[str]':<16}{legacy_bytes / 2**20:>12.1f}{legacy_load:>10.2f}{legacy_fan_out:>12.2f}")
+    print(f"{'SubscriberSet':<16}{compact_bytes / 2**20:>12.1f}{compact_load:>10.2f}{compact_fan_out:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,25 @@
+import asyncio
+import time
+
 from nonebot import get_driver, logger
 from nonebot.plugin import PluginMetadata
 
 from . import handler as handler  # Import handler to register command handlers
+from .config import plugin_config
+from .execution import shutdown_process_pool
+from .fetch import close_shared_client
+from .listing import subscription_list
 from .manager import subscription_manager
-from .scheduler import scheduler_instance
+from .push import setup_push_endpoint
+from .scheduler import scheduler, scheduler_instance
+from .state import (
+    load_state_snapshot,
+    restore_state,
+    restore_subscriptions,
+    save_state_snapshot,
+    save_state_snapshot_periodically,
+    warm_up,
+)
 
 __plugin_meta__ = PluginMetadata(
     name="网站订阅插件",
@@ -11,8 +27,18 @@ __plugin_meta__ = PluginMetadata(
     usage="""
     订阅命令：
     - /订阅列表: 查看可订阅的网站列表
-    - /订阅 <网站名>: 订阅指定网站
-    - /取消订阅 <网站名>: 取消订阅指定网站
+    - /订阅 <网站名...>: 订阅一个或多个网站 (空格或逗号分隔)
+    - /取消订阅 <网站名...>: 取消订阅一个或多个网站
+    - /订阅过滤 <网站名> [关键词或 /正则/ ...]: 仅推送匹配任一规则的更新，不带规则时查看当前规则
+    - /取消订阅过滤 <网站名> [关键词 ...]: 删除指定或全部过滤规则
+    - /推送设置 [免打扰 HH:MM-HH:MM | 间隔 <分钟> | 每日上限 <条数> | 清除]: 查看或修改推送设置
+
+    管理命令：
+    - /立即检查 [网站名...]: 立即检查全部或指定网站的更新
+    - /检查队列: 查看检查流水线各阶段的队列状态
+    - /建立基线 [网站名...]: 为没有缓存的网站抓取当前内容作为基线，不发送通知
+    - /导入订阅 <文件路径>: 从 JSON 文件批量导入订阅
+    - /导出订阅 [文件路径]: 将全部订阅导出为 JSON 文件
     """,
     type="application",
     homepage="https://github.com/zanderzhng/nonebot-plugin-monitor",
@@ -22,6 +48,13 @@ __plugin_meta__ = PluginMetadata(
 # 获取驱动以访问全局配置
 driver = get_driver()
 
+# Keep references to background tasks so they are not garbage collected
+_background_tasks: set[asyncio.Task] = set()
+
+# 在 ASGI 服务上注册推送接口 (需在服务启动前完成)
+if plugin_config.push_ingestion:
+    setup_push_endpoint(driver)
+
 
 @driver.on_startup
 async def plugin_init():
@@ -31,10 +64,17 @@ async def plugin_init():
     """
 
     logger.info("网站订阅插件正在初始化...")
+    started = time.perf_counter()
+
+    # 一次读取状态快照，恢复订阅、站点缓存与调度进度
+    snapshot = load_state_snapshot() if plugin_config.startup_snapshot else None
+    if snapshot is not None:
+        restored = restore_state(snapshot)
+        logger.info(f"已从状态快照恢复 {restored} 个站点缓存")
 
     # 初始化订阅管理器
     try:
-        await subscription_manager.initialize()
+        await subscription_manager.initialize(restore_subscriptions(snapshot))
         logger.success("订阅管理器初始化完成")
     except Exception as e:
         logger.error(f"订阅管理器初始化失败: {e}")
@@ -43,9 +83,44 @@ async def plugin_init():
     try:
         loaded_sites = scheduler_instance.load_site_modules()
         logger.success(f"网站订阅模块加载完成，共加载 {len(loaded_sites)} 个站点")
+        # 预先渲染订阅列表中的站点目录
+        subscription_list.refresh_catalog()
     except Exception as e:
         logger.error(f"网站订阅模块加载失败: {e}")
 
+    # 恢复上次关闭时未完成的推送
+    scheduler_instance.load_checkpoint()
+
+    # 加载推送设置与延迟推送的通知，定期发送到期的通知
+    scheduler_instance.dispatcher.load_preferences()
+    scheduler_instance.dispatcher.load_pending()
+    scheduler.add_job(
+        scheduler_instance.dispatch_deferred,
+        "interval",
+        id="delivery_dispatch",
+        replace_existing=True,
+        seconds=scheduler_instance.dispatcher.resolution,
+    )
+
+    # 在后台预热: 导入延迟加载的站点模块、建立连接、读取缓存
+    _background_tasks.add(warmup_task := asyncio.create_task(warm_up(snapshot, started)))
+    warmup_task.add_done_callback(_background_tasks.discard)
+
+    # 定期保存状态快照
+    if plugin_config.startup_snapshot and plugin_config.state_snapshot_interval > 0:
+        scheduler.add_job(
+            save_state_snapshot_periodically,
+            "interval",
+            id="state_snapshot",
+            replace_existing=True,
+            seconds=plugin_config.state_snapshot_interval,
+        )
+
+    # 监视站点目录，热重载变更的站点
+    if plugin_config.site_hot_reload:
+        _background_tasks.add(watch_task := asyncio.create_task(scheduler_instance.watch_sites()))
+        watch_task.add_done_callback(_background_tasks.discard)
+
     logger.success("网站订阅插件初始化完成")
 
 
@@ -56,6 +131,14 @@ async def plugin_shutdown():
     执行必要的清理工作
     """
     logger.info("网站订阅插件正在关闭...")
+    for task in list(_background_tasks):
+        task.cancel()
+    # 停止调度新的检查，等待进行中的检查与推送完成，未完成的写入检查点
+    await scheduler_instance.shutdown(plugin_config.shutdown_drain_timeout)
+    if plugin_config.startup_snapshot:
+        save_state_snapshot()
+    await close_shared_client()
+    shutdown_process_pool()
     logger.info("网站订阅插件已关闭")
 
 
@@ -63,6 +146,14 @@ async def plugin_shutdown():
 @driver.on_bot_connect
 async def handle_connect(bot):
     logger.success(f"Bot {bot.self_id} 已连接")
+    # 首个 Bot 连接后继续上次未完成的推送，并补检停机期间错过的站点
+    if not scheduler_instance.caught_up:
+        _background_tasks.add(catch_up_task := asyncio.create_task(scheduler_instance.catch_up_after_restart()))
+        catch_up_task.add_done_callback(_background_tasks.discard)
+    # 连接流式数据源
+    if not scheduler_instance.streaming:
+        _background_tasks.add(stream_task := asyncio.create_task(scheduler_instance.start_streams()))
+        stream_task.add_done_callback(_background_tasks.discard)
 
 
 @driver.on_bot_disconnect
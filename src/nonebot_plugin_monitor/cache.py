@@ -1,16 +1,224 @@
-"""Cache management module for site data"""
+"""Cache management module for site data
 
+Cache files are written with the codec selected by `cache_codec` and
+optionally compressed with `cache_compression`. Files written with any other
+known codec (including the legacy pretty-printed `*_subscription.json`) are
+still read transparently and migrated to the configured format on first load.
+
+Decoded cache data of up to `cache_memory_entries` files is kept in memory
+(least recently used first out) together with the file's size and
+modification time; a load only stats the file and reuses the decoded data
+while the file is unchanged. Every load returns its own copy, so callers may
+modify it; data passed to `save_cache` is kept as is and must not be modified
+afterwards.
+"""
+
+from collections.abc import Callable
+import copy
 import json
+import os
 from pathlib import Path
 from typing import Any
 
-from nonebot_plugin_localstore import get_plugin_cache_dir
+from .config import plugin_config
+
+
+class CacheCodec:
+    """Serializer used to turn cached site data into bytes and back"""
+
+    def __init__(
+        self,
+        name: str,
+        suffix: str,
+        encode_func: Callable[[Any], bytes],
+        decode_func: Callable[[bytes], Any],
+    ):
+        self.name = name
+        self.suffix = suffix
+        self.encode = encode_func
+        self.decode = decode_func
+
+
+def _json_codec() -> CacheCodec:
+    return CacheCodec(
+        name="json",
+        suffix=".json",
+        encode_func=lambda data: json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8"),
+        decode_func=lambda raw: json.loads(raw.decode("utf-8")),
+    )
+
+
+def _orjson_codec() -> CacheCodec:
+    import orjson
+
+    return CacheCodec(name="orjson", suffix=".orjson.json", encode_func=orjson.dumps, decode_func=orjson.loads)
+
+
+def _msgpack_codec() -> CacheCodec:
+    import msgpack
+
+    return CacheCodec(
+        name="msgpack",
+        suffix=".msgpack",
+        encode_func=lambda data: msgpack.packb(data, use_bin_type=True),
+        decode_func=lambda raw: msgpack.unpackb(raw, raw=False, strict_map_key=False),
+    )
+
+
+# Codec factories, imported lazily so that optional dependencies are only needed when selected
+CODEC_FACTORIES: dict[str, Callable[[], CacheCodec]] = {
+    "json": _json_codec,
+    "orjson": _orjson_codec,
+    "msgpack": _msgpack_codec,
+}
+
+ZSTD_SUFFIX = ".zst"
+
+_codecs: dict[str, CacheCodec] = {}
+
+
+def get_codec(name: str) -> CacheCodec:
+    """Get a cache codec by name
+
+    Raises:
+        ValueError: If the codec is unknown
+        ImportError: If the codec's optional dependency (extra of the same name) is not installed
+    """
+    if name not in _codecs:
+        if name not in CODEC_FACTORIES:
+            raise ValueError(f"Unknown cache codec: {name}")
+        try:
+            _codecs[name] = CODEC_FACTORIES[name]()
+        except ImportError as e:
+            raise ImportError(f"缓存编码 {name} 需要安装 nonebot-plugin-monitor[{name}]: {e}") from e
+    return _codecs[name]
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError(f"zstd 压缩需要安装 nonebot-plugin-monitor[zstd]: {e}") from e
+    return zstandard
+
+
+def _zstd_compress(raw: bytes) -> bytes:
+    try:
+        from compression import zstd  # type: ignore[import-not-found]  # Python 3.14+
+
+        return zstd.compress(raw, level=plugin_config.cache_compression_level)
+    except ImportError:
+        return _zstandard().ZstdCompressor(level=plugin_config.cache_compression_level).compress(raw)
+
+
+def _zstd_decompress(raw: bytes) -> bytes:
+    try:
+        from compression import zstd  # type: ignore[import-not-found]  # Python 3.14+
+
+        return zstd.decompress(raw)
+    except ImportError:
+        return _zstandard().ZstdDecompressor().decompressobj().decompress(raw)
+
+
+def encode_data(data: Any, codec_name: str | None = None, compression: str | None = None) -> bytes:
+    """Encode data with a codec and optional compression (defaults from config)"""
+    codec = get_codec(codec_name or plugin_config.cache_codec)
+    raw = codec.encode(data)
+    if (compression or plugin_config.cache_compression) == "zstd":
+        raw = _zstd_compress(raw)
+    return raw
+
+
+def decode_data(raw: bytes, codec_name: str | None = None, compression: str | None = None) -> Any:
+    """Decode data written by `encode_data`"""
+    if (compression or plugin_config.cache_compression) == "zstd":
+        raw = _zstd_decompress(raw)
+    return get_codec(codec_name or plugin_config.cache_codec).decode(raw)
+
+
+def _file_suffix(codec_name: str, compression: str) -> str:
+    suffix = get_codec(codec_name).suffix
+    return suffix + ZSTD_SUFFIX if compression == "zstd" else suffix
+
+
+def get_cache_suffix() -> str:
+    """Get the file suffix for the configured codec and compression"""
+    return _file_suffix(plugin_config.cache_codec, plugin_config.cache_compression)
 
 
 def get_cache_file(site_name: str) -> Path:
     """Get cache file path for a site"""
-    cache_dir = get_plugin_cache_dir()
-    return cache_dir / f"{site_name}_subscription.json"
+    return plugin_config.cache_dir / f"{site_name}_subscription{get_cache_suffix()}"
+
+
+def _candidate_files(site_name: str) -> list[tuple[Path, str, str]]:
+    """List every file a site's cache may have been written to, as (path, codec, compression)"""
+    candidates = []
+    for codec_name in CODEC_FACTORIES:
+        for compression in ("none", "zstd"):
+            try:
+                suffix = _file_suffix(codec_name, compression)
+            except ImportError:
+                continue
+            candidates.append((plugin_config.cache_dir / f"{site_name}_subscription{suffix}", codec_name, compression))
+    # Longest suffixes first, so ".orjson.json" is never mistaken for legacy ".json"
+    candidates.sort(key=lambda candidate: len(candidate[0].name), reverse=True)
+    return candidates
+
+
+# Decoded cache files: {path: (file signature, data)}, valid while the file is unchanged.
+# Insertion order is recency order
+_memory_cache: dict[Path, tuple[dict[str, int], Any]] = {}
+
+
+def _remember(path: Path, signature: dict[str, int], data: Any) -> bool:
+    """Keep decoded data in memory, evicting the least recently used files beyond the limit"""
+    limit = plugin_config.cache_memory_entries
+    if limit <= 0:
+        return False
+    _memory_cache.pop(path, None)
+    _memory_cache[path] = (signature, data)
+    while len(_memory_cache) > limit:
+        del _memory_cache[next(iter(_memory_cache))]
+    return True
+
+
+def file_signature(path: Path) -> dict[str, int]:
+    """Size and modification time identifying a version of a file"""
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def get_memory_cache_entry(site_name: str) -> tuple[dict[str, int], Any] | None:
+    """Get a site's decoded cache and the signature of the file it was read from, if held in memory"""
+    return _memory_cache.get(get_cache_file(site_name))
+
+
+def prime_cache(site_name: str, data: Any, signature: dict[str, int]) -> bool:
+    """
+    Seed the in-memory cache with data read elsewhere (e.g. a state snapshot)
+    Args:
+        site_name: Name of the site
+        data: Decoded cache data
+        signature: Signature of the cache file the data was read from
+    Returns:
+        True if the cache file is unchanged and the data was kept
+    """
+    cache_file = get_cache_file(site_name)
+    try:
+        if file_signature(cache_file) != signature:
+            return False
+    except OSError:
+        return False
+    return _remember(cache_file, signature, data)
+
+
+def write_atomic(path: Path, raw: bytes):
+    """Write bytes to a file through a temporary file so readers never see a partial write"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = path.with_name(path.name + ".tmp")
+    tmp_file.write_bytes(raw)
+    os.replace(tmp_file, path)
 
 
 def load_cache(site_name: str) -> Any:
@@ -20,13 +228,30 @@ def load_cache(site_name: str) -> Any:
         site_name: Name of the site
 
     Returns:
-        Cached data or None if not found
+        A copy of the cached data, or None if not found
     """
     cache_file = get_cache_file(site_name)
     try:
         if cache_file.exists():
-            with open(cache_file, encoding="utf-8") as f:
-                return json.load(f)
+            signature = file_signature(cache_file)
+            cached = _memory_cache.pop(cache_file, None)
+            if cached is not None and cached[0] == signature:
+                _memory_cache[cache_file] = cached
+                return copy.deepcopy(cached[1])
+            data = decode_data(cache_file.read_bytes())
+            return copy.deepcopy(data) if _remember(cache_file, signature, data) else data
+
+        # Fall back to files written with another codec and migrate them
+        for path, codec_name, compression in _candidate_files(site_name):
+            if path == cache_file or not path.exists():
+                continue
+            data = decode_data(path.read_bytes(), codec_name, compression)
+            if save_cache(site_name, data):
+                path.unlink(missing_ok=True)
+                import nonebot
+
+                nonebot.logger.info(f"已将站点 {site_name} 的缓存从 {path.name} 迁移到 {cache_file.name}")
+            return copy.deepcopy(data) if cache_file in _memory_cache else data
     except Exception as e:
         # Log the error but don't fail - return None to indicate no cache
         import nonebot
@@ -41,16 +266,15 @@ def save_cache(site_name: str, data: Any) -> bool:
 
     Args:
         site_name: Name of the site
-        data: Data to cache
+        data: Data to cache; it is kept in memory and must not be modified afterwards
 
     Returns:
         True if successful, False otherwise
     """
     cache_file = get_cache_file(site_name)
     try:
-        cache_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(cache_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        write_atomic(cache_file, encode_data(data))
+        _remember(cache_file, file_signature(cache_file), data)
         return True
     except Exception as e:
         # Log the error
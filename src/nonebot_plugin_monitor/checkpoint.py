@@ -0,0 +1,49 @@
+"""Checkpoint of site checks left unfinished at shutdown
+
+A check that already detected an update but had not finished delivering it is
+written here on shutdown, with the rendered notification and the subscribers
+already notified. On the next start it resumes from where it stopped instead
+of being detected again and sent to everyone twice.
+"""
+
+from pathlib import Path
+from typing import Any
+
+from nonebot import logger
+
+from .cache import decode_data, encode_data, get_cache_suffix, write_atomic
+from .config import plugin_config
+
+
+def get_checkpoint_file() -> Path:
+    """Get the shutdown checkpoint file path"""
+    return plugin_config.cache_dir / f"shutdown_checkpoint{get_cache_suffix()}"
+
+
+def save_checkpoint(entries: list[dict[str, Any]]) -> bool:
+    """Write unfinished checks, or remove the checkpoint when there are none"""
+    checkpoint_file = get_checkpoint_file()
+    try:
+        if not entries:
+            checkpoint_file.unlink(missing_ok=True)
+            return True
+        write_atomic(checkpoint_file, encode_data(entries))
+        logger.info(f"已保存 {len(entries)} 个未完成的站点检查")
+        return True
+    except Exception as e:
+        logger.error(f"保存检查点失败: {e}")
+        return False
+
+
+def take_checkpoint() -> list[dict[str, Any]]:
+    """Read and remove the checkpoint; the entries are re-checkpointed if still unfinished at the next shutdown"""
+    checkpoint_file = get_checkpoint_file()
+    try:
+        if not checkpoint_file.exists():
+            return []
+        entries = decode_data(checkpoint_file.read_bytes())
+        checkpoint_file.unlink(missing_ok=True)
+        return entries if isinstance(entries, list) else []
+    except Exception as e:
+        logger.warning(f"加载检查点失败: {e}")
+        return []
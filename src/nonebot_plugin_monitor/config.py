@@ -1,10 +1,11 @@
 from pathlib import Path
+from typing import Literal
 
 from nonebot import get_driver
 from nonebot.compat import model_dump
 
 # Import localstore for subscription data paths
-from nonebot_plugin_localstore import get_plugin_cache_dir, get_plugin_data_file
+from nonebot_plugin_localstore import get_plugin_cache_dir, get_plugin_data_dir, get_plugin_data_file
 from pydantic import BaseModel, ConfigDict, Field
 
 
@@ -14,9 +15,141 @@ class Config(BaseModel):
     # 订阅数据存储路径 (using localstore)
     subscriptions_data_file: Path = Field(default_factory=lambda: get_plugin_data_file("subscriptions.json"))
 
+    # 订阅关键词过滤数据存储路径 (using localstore)
+    subscription_filters_file: Path = Field(default_factory=lambda: get_plugin_data_file("subscription_filters.json"))
+
+    # 订阅者推送设置 (免打扰时段、最小间隔、每日上限) 存储路径 (using localstore)
+    delivery_preferences_file: Path = Field(default_factory=lambda: get_plugin_data_file("delivery_preferences.json"))
+
+    # 订阅存储方式: single (单个 subscriptions.json) 或 sharded (每个站点一个文件，按需加载)
+    subscription_storage: Literal["single", "sharded"] = "single"
+
+    # 分片订阅数据目录 (using localstore)
+    subscriptions_shard_dir: Path = Field(default_factory=lambda: get_plugin_data_dir() / "subscriptions")
+
     # 缓存目录路径 (using localstore)
     cache_dir: Path = Field(default_factory=get_plugin_cache_dir)
 
+    # 缓存文件编码格式: json (兼容旧版), orjson, msgpack
+    # orjson / msgpack 需要安装对应的可选依赖: nonebot-plugin-monitor[orjson] / [msgpack]
+    cache_codec: Literal["json", "orjson", "msgpack"] = "json"
+
+    # 缓存文件压缩方式, zstd 在 Python 3.14 以下需要安装 nonebot-plugin-monitor[zstd]
+    cache_compression: Literal["none", "zstd"] = "none"
+
+    # zstd 压缩级别
+    cache_compression_level: int = 3
+
+    # 内存中保留的已解码缓存文件数量 (0 表示不保留，每次从文件读取)
+    cache_memory_entries: int = 256
+
+    # 每个站点保留的历史快照数量 (0 表示不记录历史)
+    history_max_entries: int = 20
+
+    # 历史快照最长保留时间 (秒, 0 表示不限)
+    history_max_age: float = 0
+
+    # 每隔多少个版本写入一次完整的基准快照
+    history_base_interval: int = 10
+
+    # 共享数据源抓取结果的复用时间 (秒), 同一时刻触发的站点只请求一次上游
+    source_cache_ttl: float = 5.0
+
+    # 手动批量检查时的最大并发数
+    check_concurrency: int = 4
+
+    # 站点没有缓存时 (新站点、缓存被清空), 首次检查只建立基线而不推送当前全部内容
+    seed_missing_cache: bool = True
+
+    # 检查流水线各阶段的并发数与队列容量
+    pipeline_fetch_workers: int = 4
+    pipeline_diff_workers: int = 2
+    pipeline_render_workers: int = 2
+    pipeline_deliver_workers: int = 2
+    pipeline_queue_size: int = 16
+
+    # 启动时根据站点清单延迟导入未变更的站点模块
+    lazy_site_loading: bool = True
+
+    # 后台预热时并行导入站点模块的数量
+    site_import_concurrency: int = 4
+
+    # 延迟推送的时间桶宽度与检查间隔 (秒)
+    delivery_dispatch_interval: float = 30
+
+    # 跨站点近似重复通知抑制: 同一订阅者近期已从其他站点收到相似内容时不再推送
+    cross_site_dedup: bool = False
+
+    # 近似重复判定的时间窗口 (秒)
+    dedup_window: float = 1800
+
+    # 指纹索引最多保留的通知数量
+    dedup_max_entries: int = 2048
+
+    # 视为近似重复的 SimHash 指纹最大汉明距离 (64 位中)
+    dedup_max_distance: int = 8
+
+    # 接收上游推送的更新 (在 NoneBot 的 ASGI 服务上注册推送接口)
+    push_ingestion: bool = False
+
+    # 推送接口路径
+    push_path: str = "/monitor/push"
+
+    # 推送请求签名密钥 (HMAC-SHA256)，未配置时不启用推送接口
+    push_secret: str = ""
+
+    # 接受推送的站点名称
+    push_sites: list[str] = []
+
+    # 接受推送的站点的兜底轮询间隔 (秒)
+    push_poll_interval: int = 3600
+
+    # 推送请求时间戳与本机时间的最大偏差 (秒)，用于防止重放
+    push_max_skew: float = 300
+
+    # 启动后补检停机期间错过检查的站点
+    catch_up_missed_checks: bool = True
+
+    # 补检时的最大并发数
+    catch_up_concurrency: int = 2
+
+    # 关闭时等待进行中的站点检查完成的最长时间 (秒)
+    shutdown_drain_timeout: float = 10.0
+
+    # 启动时从状态快照恢复订阅、站点缓存与调度进度
+    startup_snapshot: bool = False
+
+    # 定期保存状态快照的间隔 (秒, 0 表示仅在关闭时保存)
+    state_snapshot_interval: float = 600
+
+    # 启动预热 (导入站点模块、建立连接、读取缓存) 的时间预算 (秒, 0 表示不限)
+    startup_warmup_budget: float = 30.0
+
+    # 启动预热时的并发数
+    startup_warmup_concurrency: int = 16
+
+    # 额外的站点目录 (其中的站点模块与内置站点写法相同)
+    extra_site_dirs: list[Path] = []
+
+    # 外部站点包的入口点组名
+    site_entry_point_group: str = "nonebot_plugin_monitor.sites"
+
+    # 监视站点目录并热重载变更的站点
+    site_hot_reload: bool = False
+
+    # 站点目录轮询间隔 / 变更合并时间 (秒), 安装 nonebot-plugin-monitor[watch] 后使用系统文件变更通知
+    site_reload_interval: float = 2.0
+
+    # 站点共享进程池的进程数 (0 表示 CPU 核心数)
+    # 进程以 forkserver/spawn 方式启动，每个进程首次使用时需初始化 NoneBot 并加载本插件
+    process_pool_workers: int = 0
+
+    # 单次抓取允许的最大响应体大小 (字节)
+    fetch_max_body_size: int = 5 * 1024 * 1024
+
+    # 抓取请求超时时间 (秒)
+    fetch_timeout: float = 30.0
+
     model_config = ConfigDict(extra="ignore")
 
 
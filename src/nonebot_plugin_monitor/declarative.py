@@ -0,0 +1,287 @@
+"""Declarative site definitions
+
+Simple sites can be described in a TOML or YAML file in `sites/` instead of a
+Python module. The definition is compiled once at load time into an item
+extractor, a key getter and message templates, and wrapped in a regular
+`SiteConfig`, so checking it costs no more than a hand-written module.
+
+Example (TOML):
+    display_name = "示例快讯"
+    description = "示例快讯 - 每 5 分钟检查一次"
+    schedule = "*/5 * * * *"
+    url = "https://api.example.com/news"
+    headers = { User-Agent = "Mozilla/5.0" }
+    items = "$.data.list[*]"        # JSONPath to the items, or `css = "ul.news li"` for HTML
+    key = "id"                      # field identifying an item
+    limit = 20
+    template = "{title}\\n{url}"
+    header = "【{display_name}】"
+
+`select` projects each JSON item to a few fields (dotted paths), keeping the
+cache small:
+    select = { title = "title", url = "link.href", id = "id" }
+
+For HTML pages, `fields` maps item field names to CSS selectors relative to
+each matched element, with an optional `@attr` suffix:
+    fields = { title = "a", url = "a@href" }
+"""
+
+from collections.abc import Callable
+import json
+from pathlib import Path
+import re
+from string import Formatter
+from typing import Any
+
+from .fetch import fetch_bytes, iter_json_items
+from .sites import SiteConfig
+
+DEFINITION_SUFFIXES = (".toml", ".yaml", ".yml")
+
+_WILDCARD = object()
+_JSONPATH_TOKEN = re.compile(r"\.(\*|[A-Za-z_][\w-]*)|\[(\*|-?\d+)\]|\[['\"]([^'\"]+)['\"]\]")
+
+
+def compile_jsonpath(path: str) -> Callable[[Any], list[Any]]:
+    """
+    Compile a JSONPath subset ($, .key, ['key'], [n], [*], .*) into an extractor
+    Returns:
+        Function returning the list of matched values
+    """
+    if not path.startswith("$"):
+        raise ValueError(f"JSONPath must start with '$': {path}")
+
+    steps: list[Any] = []
+    array_wildcard = False  # Whether the last step is [*], which only matches list items
+    position = 1
+    while position < len(path):
+        match = _JSONPATH_TOKEN.match(path, position)
+        if match is None:
+            raise ValueError(f"Unsupported JSONPath syntax at {path[position:]!r}: {path}")
+        name, index, quoted = match.groups()
+        array_wildcard = index == "*"
+        if name == "*" or index == "*":
+            steps.append(_WILDCARD)
+        elif index is not None:
+            steps.append(int(index))
+        else:
+            steps.append(quoted if quoted is not None else name)
+        position = match.end()
+
+    def extract(data: Any) -> list[Any]:
+        current = [data]
+        for step in steps:
+            matched = []
+            for value in current:
+                if step is _WILDCARD:
+                    if isinstance(value, list):
+                        matched.extend(value)
+                    elif isinstance(value, dict):
+                        matched.extend(value.values())
+                elif isinstance(step, int):
+                    if isinstance(value, list) and -len(value) <= step < len(value):
+                        matched.append(value[step])
+                elif isinstance(value, dict) and step in value:
+                    matched.append(value[step])
+            current = matched
+        return current
+
+    # Plain key path ending in [*] can be streamed with iter_json_items; .* also matches object
+    # values, which the streaming decoder does not handle, so it always takes a full parse.
+    # The keys are passed as a tuple since quoted keys may contain dots
+    extract.stream_path = (
+        tuple(steps[:-1]) if array_wildcard and all(isinstance(step, str) for step in steps[:-1]) else None
+    )
+    return extract
+
+
+def compile_getter(path: str) -> Callable[[Any], Any]:
+    """Compile a dotted field path (e.g. "author.name") into a getter returning None when missing"""
+    keys = [int(key) if key.lstrip("-").isdigit() else key for key in path.split(".")]
+
+    def get(value: Any) -> Any:
+        for key in keys:
+            if isinstance(value, dict):
+                value = value.get(key)
+            elif isinstance(value, list) and isinstance(key, int) and -len(value) <= key < len(value):
+                value = value[key]
+            else:
+                return None
+        return value
+
+    return get
+
+
+class CompiledTemplate:
+    """A str.format-style template parsed once into literal text and field getters"""
+
+    def __init__(self, template: str):
+        self.template = template
+        self._parts: list[tuple[str, Callable[[Any], Any] | None, str, str | None]] = []
+        for literal, field_name, format_spec, conversion in Formatter().parse(template):
+            getter = compile_getter(field_name) if field_name else None
+            self._parts.append((literal, getter, format_spec or "", conversion))
+
+    def render(self, values: dict[str, Any]) -> str:
+        """Render with `values`; missing fields render as empty text"""
+        pieces = []
+        for literal, getter, format_spec, conversion in self._parts:
+            pieces.append(literal)
+            if getter is None:
+                continue
+            value = getter(values)
+            if value is None:
+                continue
+            if conversion == "r":
+                value = repr(value)
+            elif conversion == "s":
+                value = str(value)
+            pieces.append(format(value, format_spec))
+        return "".join(pieces)
+
+
+def _compile_css(selector: str, fields: dict[str, str]) -> Callable[[bytes], list[dict[str, Any]]]:
+    try:
+        from bs4 import BeautifulSoup
+    except ImportError as e:
+        raise ValueError("CSS selectors need beautifulsoup4 installed (nonebot-plugin-monitor[html])") from e
+
+    compiled_fields = []
+    for field_name, field_selector in fields.items():
+        field_selector, _, attribute = field_selector.partition("@")
+        compiled_fields.append((field_name, field_selector.strip(), attribute.strip()))
+
+    def extract(raw: bytes) -> list[dict[str, Any]]:
+        soup = BeautifulSoup(raw, "html.parser")
+        items = []
+        for element in soup.select(selector):
+            item = {}
+            for field_name, field_selector, attribute in compiled_fields:
+                target = element.select_one(field_selector) if field_selector else element
+                if target is None:
+                    item[field_name] = None
+                elif attribute:
+                    item[field_name] = target.get(attribute)
+                else:
+                    item[field_name] = target.get_text(strip=True)
+            items.append(item)
+        return items
+
+    return extract
+
+
+def load_definition_file(path: Path) -> dict[str, Any]:
+    """Read a TOML or YAML definition file"""
+    if path.suffix == ".toml":
+        try:
+            import tomllib
+        except ImportError:  # Python 3.10
+            try:
+                import tomli as tomllib
+            except ImportError as e:
+                raise ValueError("TOML definitions need tomli on Python 3.10 (nonebot-plugin-monitor[toml])") from e
+
+        return tomllib.loads(path.read_text(encoding="utf-8"))
+
+    try:
+        import yaml
+    except ImportError as e:
+        raise ValueError("YAML definitions need pyyaml installed (nonebot-plugin-monitor[yaml])") from e
+
+    return yaml.safe_load(path.read_text(encoding="utf-8")) or {}
+
+
+def compile_definition(definition: dict[str, Any], site_name: str) -> SiteConfig:
+    """
+    Compile a site definition into a SiteConfig
+    Args:
+        definition: Parsed definition
+        site_name: Site name (usually the file stem)
+    Raises:
+        ValueError: If the definition is invalid
+    """
+    for required in ("url", "key", "template"):
+        if required not in definition:
+            raise ValueError(f"Site definition {site_name} is missing '{required}'")
+    if ("items" in definition) == ("css" in definition):
+        raise ValueError(f"Site definition {site_name} needs exactly one of 'items' (JSONPath) or 'css'")
+
+    url: str = definition["url"]
+    method: str = definition.get("method", "GET").upper()
+    request_kwargs: dict[str, Any] = {
+        key: definition[key] for key in ("headers", "params", "json", "data") if key in definition
+    }
+    limit: int | None = definition.get("limit")
+    display_name: str = definition.get("display_name", site_name)
+    description: str = definition.get("description", display_name)
+    schedule: str = definition.get("schedule", "*/30 * * * *")
+    separator: str = definition.get("separator", "\n\n")
+
+    get_key = compile_getter(str(definition["key"]))
+    item_template = CompiledTemplate(definition["template"])
+    header_template = CompiledTemplate(definition["header"]) if definition.get("header") else None
+    field_getters = {name: compile_getter(path) for name, path in definition.get("select", {}).items()}
+
+    if "items" in definition:
+        extract_json = compile_jsonpath(definition["items"])
+
+        async def fetch_items() -> list[Any]:
+            if extract_json.stream_path is not None:
+                return [
+                    item
+                    async for item in iter_json_items(
+                        url, path=extract_json.stream_path, limit=limit, method=method, **request_kwargs
+                    )
+                ]
+            raw = await fetch_bytes(url, method=method, **request_kwargs)
+            items = extract_json(json.loads(raw))
+            return items[:limit] if limit else items
+    else:
+        extract_html = _compile_css(definition["css"], definition.get("fields", {}))
+
+        async def fetch_items() -> list[Any]:
+            items = extract_html(await fetch_bytes(url, method=method, **request_kwargs))
+            return items[:limit] if limit else items
+
+    async def fetch() -> dict[str, Any]:
+        items = await fetch_items()
+        if field_getters:
+            items = [{name: getter(item) for name, getter in field_getters.items()} for item in items]
+        keyed = [(str(get_key(item)), item) for item in items]
+        return {"keys": [key for key, _ in keyed], "items": [item for _, item in keyed]}
+
+    def compare(cached_data: Any, latest_data: Any) -> bool:
+        # Items whose key is not in the previous data are new; recorded for format_notification
+        seen = set(cached_data.get("keys", [])) if isinstance(cached_data, dict) else set()
+        latest_data["new"] = [key for key in latest_data["keys"] if key not in seen]
+        return bool(latest_data["new"])
+
+    def format_notification(latest_data: Any) -> str:
+        new_keys = set(latest_data.get("new", latest_data["keys"]))
+        context = {"display_name": display_name, "name": site_name}
+        rendered = [
+            item_template.render({**context, **item}) if isinstance(item, dict) else item_template.render(context)
+            for key, item in zip(latest_data["keys"], latest_data["items"])
+            if key in new_keys
+        ]
+        if header_template is not None:
+            rendered.insert(0, header_template.render({**context, "count": len(rendered)}))
+        return separator.join(rendered)
+
+    return SiteConfig(
+        name=site_name,
+        fetch_func=fetch,
+        compare_func=compare,
+        format_func=format_notification,
+        description_func=lambda: description,
+        schedule_func=lambda: schedule,
+        display_name_func=lambda: display_name,
+    )
+
+
+def load_definition(path: Path) -> SiteConfig:
+    """Load and compile a definition file; the site name defaults to the file stem"""
+    definition = load_definition_file(path)
+    if not isinstance(definition, dict):
+        raise ValueError(f"Site definition {path.name} must be a mapping")
+    return compile_definition(definition, str(definition.get("name", path.stem)))
@@ -0,0 +1,157 @@
+"""Cross-site near-duplicate suppression
+
+Several sources often publish the same story within minutes. Each formatted
+notification is fingerprinted with a 64-bit SimHash over character trigrams
+(which works for Chinese text without word segmentation), and looked up in an
+index of the fingerprints delivered recently by other sites. A subscriber who
+already received a notification within `dedup_max_distance` bits is skipped.
+Only notifications that were actually sent are recorded: held or failed sends
+do not suppress anything.
+
+The index is bounded both in time (`dedup_window`) and size
+(`dedup_max_entries`). Fingerprints are split into `max_distance + 1` bands and
+lookups compare only fingerprints sharing a band with the new one: two
+fingerprints at most `max_distance` bits apart always agree on at least one
+band, so near-duplicates are found without scanning the whole index.
+"""
+
+from collections import deque
+from collections.abc import Iterable
+import hashlib
+import re
+import time
+
+from .subscribers import Member
+
+FINGERPRINT_BITS = 64
+SHINGLE_SIZE = 3
+
+_IGNORED = re.compile(r"[\W_]+")
+
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash of a text's character trigrams, ignoring case, whitespace and punctuation"""
+    normalized = _IGNORED.sub("", text.lower())
+    if len(normalized) <= SHINGLE_SIZE:
+        features = [normalized] if normalized else []
+    else:
+        features = [normalized[i : i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)]
+
+    weights = [0] * FINGERPRINT_BITS
+    for feature, count in _count(features).items():
+        value = _feature_hash(feature)
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += count if value >> bit & 1 else -count
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def _count(features: Iterable[str]) -> dict[str, int]:
+    counts: dict[str, int] = {}
+    for feature in features:
+        counts[feature] = counts.get(feature, 0) + 1
+    return counts
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two fingerprints"""
+    return (a ^ b).bit_count()
+
+
+class _Entry:
+    """A delivered notification's fingerprint and the subscribers it went to"""
+
+    __slots__ = ("fingerprint", "recipients", "site_name", "timestamp")
+
+    def __init__(self, fingerprint: int, site_name: str, timestamp: float, recipients: set[str]):
+        self.fingerprint = fingerprint
+        self.site_name = site_name
+        self.timestamp = timestamp
+        self.recipients = recipients
+
+
+class RecentFingerprints:
+    """Time-windowed, bounded index of recently delivered notification fingerprints"""
+
+    def __init__(self, window: float, max_entries: int, max_distance: int = 8):
+        self.window = window
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        # Band boundaries splitting the 64 bits as evenly as possible
+        bands = min(max_distance + 1, FINGERPRINT_BITS)
+        self.band_ranges = [
+            (FINGERPRINT_BITS * band // bands, FINGERPRINT_BITS * (band + 1) // bands) for band in range(bands)
+        ]
+        self.entries: deque[_Entry] = deque()
+        self.bands: dict[tuple[int, int], list[_Entry]] = {}
+        self.suppressed = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _bands(self, fingerprint: int) -> list[tuple[int, int]]:
+        return [(start, fingerprint >> start & ((1 << (end - start)) - 1)) for start, end in self.band_ranges]
+
+    def _evict(self, now: float):
+        while self.entries and (len(self.entries) > self.max_entries or now - self.entries[0].timestamp > self.window):
+            entry = self.entries.popleft()
+            for key in self._bands(entry.fingerprint):
+                bucket = self.bands[key]
+                bucket.remove(entry)
+                if not bucket:
+                    del self.bands[key]
+
+    def find_similar(self, fingerprint: int, site_name: str) -> list[_Entry]:
+        """Recent entries from other sites within `max_distance` bits of a fingerprint"""
+        similar: dict[int, _Entry] = {}
+        for key in self._bands(fingerprint):
+            for entry in self.bands.get(key, ()):
+                if (
+                    entry.site_name != site_name
+                    and hamming_distance(entry.fingerprint, fingerprint) <= self.max_distance
+                ):
+                    similar[id(entry)] = entry
+        return list(similar.values())
+
+    def select(self, site_name: str, text: str, subscribers: list[Member], now: float | None = None) -> list[Member]:
+        """
+        Drop subscribers who recently received a near-duplicate from another site
+        Args:
+            site_name: Site of the notification
+            text: Formatted notification
+            subscribers: Subscribers the notification is for
+            now: Current time, defaults to `time.time()`
+        Returns:
+            Subscribers that should receive the notification, in their original order
+        """
+        now = time.time() if now is None else now
+        self._evict(now)
+        already_received: set[str] = set()
+        for entry in self.find_similar(simhash(text), site_name):
+            already_received |= entry.recipients
+
+        selected = [member for member in subscribers if str(member) not in already_received]
+        self.suppressed += len(subscribers) - len(selected)
+        return selected
+
+    def record(self, site_name: str, text: str, recipients: list[Member], now: float | None = None):
+        """
+        Remember that a notification was delivered, so near-duplicates from other sites are skipped
+        Args:
+            site_name: Site of the notification
+            text: Formatted notification
+            recipients: Subscribers the notification was actually sent to
+            now: Current time, defaults to `time.time()`
+        """
+        if not recipients:
+            return
+        now = time.time() if now is None else now
+        fingerprint = simhash(text)
+        entry = _Entry(fingerprint, site_name, now, {str(member) for member in recipients})
+        self.entries.append(entry)
+        for key in self._bands(fingerprint):
+            self.bands.setdefault(key, []).append(entry)
+        self._evict(now)
@@ -0,0 +1,348 @@
+"""Per-subscriber delivery preferences and deferred delivery
+
+A subscriber (user or group) may set quiet hours, a minimum interval between
+messages and a daily message limit. Notifications that may not be sent yet
+are held instead of sent: each subscriber's deferred notifications are kept
+as references to the shared message objects, and the subscriber is filed in a
+time bucket (`delivery_dispatch_interval` seconds wide) for the moment it may
+receive messages again. A single periodic job releases the due buckets, and
+every subscriber gets all its held notifications as one batched message, so
+no task or timer exists per message and a batch counts once towards the
+limits.
+
+Deferred notifications are written to the cache directory on shutdown and
+restored on the next start.
+"""
+
+from datetime import datetime, timedelta, tzinfo
+import heapq
+import json
+import math
+from pathlib import Path
+import re
+from typing import Any
+
+from nonebot import logger
+
+from .cache import decode_data, encode_data, get_cache_suffix, write_atomic
+from .config import plugin_config
+from .subscribers import Member
+
+BATCH_SEPARATOR = "\n\n"
+MAX_MIN_INTERVAL = 7 * 24 * 3600  # Longest allowed interval between two messages, in seconds
+MAX_PER_DAY = 10000  # Highest allowed daily message limit
+
+_QUIET_HOURS = re.compile(r"^(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})$")
+
+
+def parse_quiet_hours(text: str) -> tuple[int, int]:
+    """
+    Parse quiet hours written as `HH:MM-HH:MM` (may wrap past midnight)
+    Returns:
+        (start, end) in minutes after midnight
+    Raises:
+        ValueError: If the text is not a valid range
+    """
+    match = _QUIET_HOURS.match(text.strip())
+    if not match:
+        raise ValueError(f"免打扰时段格式应为 HH:MM-HH:MM: {text}")
+    start_hour, start_minute, end_hour, end_minute = map(int, match.groups())
+    if start_hour > 23 or end_hour > 23 or start_minute > 59 or end_minute > 59:
+        raise ValueError(f"无效的免打扰时段: {text}")
+    start, end = start_hour * 60 + start_minute, end_hour * 60 + end_minute
+    if start == end:
+        raise ValueError("免打扰时段的开始与结束时间不能相同")
+    return start, end
+
+
+def format_quiet_hours(quiet_hours: tuple[int, int]) -> str:
+    """Format quiet hours as `HH:MM-HH:MM`"""
+    start, end = quiet_hours
+    return f"{start // 60:02d}:{start % 60:02d}-{end // 60:02d}:{end % 60:02d}"
+
+
+class DeliveryPolicy:
+    """Delivery preferences of one subscriber"""
+
+    __slots__ = ("max_per_day", "min_interval", "quiet_hours")
+
+    def __init__(self, quiet_hours: tuple[int, int] | None = None, min_interval: float = 0, max_per_day: int = 0):
+        self.quiet_hours = quiet_hours  # (start, end) minutes after midnight
+        self.min_interval = min_interval  # Seconds between two messages, 0 for no limit
+        self.max_per_day = max_per_day  # Messages per day, 0 for no limit
+
+    def validate(self):
+        """
+        Check that the limits can be applied
+        Raises:
+            ValueError: If the interval or daily limit is negative, not finite or too large
+        """
+        if not math.isfinite(self.min_interval) or not 0 <= self.min_interval <= MAX_MIN_INTERVAL:
+            raise ValueError(f"间隔应在 0 到 {MAX_MIN_INTERVAL // 60} 分钟之间")
+        if not 0 <= self.max_per_day <= MAX_PER_DAY:
+            raise ValueError(f"每日上限应在 0 到 {MAX_PER_DAY} 条之间")
+
+    def is_default(self) -> bool:
+        """Whether the policy allows immediate delivery of everything"""
+        return self.quiet_hours is None and not self.min_interval and not self.max_per_day
+
+    def to_dict(self) -> dict[str, Any]:
+        data: dict[str, Any] = {}
+        if self.quiet_hours is not None:
+            data["quiet_hours"] = format_quiet_hours(self.quiet_hours)
+        if self.min_interval:
+            data["min_interval"] = self.min_interval
+        if self.max_per_day:
+            data["max_per_day"] = self.max_per_day
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "DeliveryPolicy":
+        quiet_hours = data.get("quiet_hours")
+        policy = cls(
+            parse_quiet_hours(quiet_hours) if quiet_hours else None,
+            float(data.get("min_interval", 0)),
+            int(data.get("max_per_day", 0)),
+        )
+        policy.validate()
+        return policy
+
+    def describe(self) -> str:
+        """Human-readable summary"""
+        parts = []
+        if self.quiet_hours is not None:
+            parts.append(f"免打扰 {format_quiet_hours(self.quiet_hours)}")
+        if self.min_interval:
+            parts.append(f"至少间隔 {self.min_interval / 60:g} 分钟")
+        if self.max_per_day:
+            parts.append(f"每日最多 {self.max_per_day} 条")
+        return "，".join(parts) or "立即推送"
+
+    def next_allowed(self, now: datetime, last_sent: float | None, sent_today: int) -> datetime:
+        """
+        Earliest time a message may be sent
+        Args:
+            now: Current time (timezone-aware)
+            last_sent: Timestamp of the last message sent, if any
+            sent_today: Messages sent on the day of `now`
+        Returns:
+            `now` if the message may be sent immediately
+        """
+        allowed = now
+        if self.min_interval and last_sent is not None:
+            # Clamp so that a policy that slipped past validation cannot overflow the datetime range
+            interval = min(self.min_interval, MAX_MIN_INTERVAL) if math.isfinite(self.min_interval) else 0
+            allowed = max(allowed, datetime.fromtimestamp(last_sent, now.tzinfo) + timedelta(seconds=interval))
+        if self.max_per_day and sent_today >= self.max_per_day:
+            midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            allowed = max(allowed, midnight + timedelta(days=1))
+        if self.quiet_hours is not None:
+            start, end = self.quiet_hours
+            minute = allowed.hour * 60 + allowed.minute
+            quiet = start <= minute < end if start < end else minute >= start or minute < end
+            if quiet:
+                day = allowed.replace(hour=0, minute=0, second=0, microsecond=0)
+                if start > end and minute >= start:
+                    day += timedelta(days=1)
+                allowed = day + timedelta(minutes=end)
+        return allowed
+
+
+class Dispatcher:
+    """Apply delivery policies and hold deferred notifications in time buckets"""
+
+    def __init__(self, timezone: tzinfo, resolution: float):
+        self.timezone = timezone
+        self.resolution = max(1.0, resolution)
+        self.preferences_file = plugin_config.delivery_preferences_file
+        # {"users": {user_id: DeliveryPolicy}, "groups": {group_id: DeliveryPolicy}}
+        self.preferences: dict[str, dict[str, DeliveryPolicy]] = {"users": {}, "groups": {}}
+        self.policies: dict[str, DeliveryPolicy] = {}  # {subscriber_id: policy}, users and groups merged
+        self.sent: dict[str, tuple[float, int, int]] = {}  # {subscriber_id: (last sent, day ordinal, sent that day)}
+        self.pending: dict[str, list[Any]] = {}  # {subscriber_id: [held notifications]}
+        self.due: dict[str, int] = {}  # {subscriber_id: bucket}
+        self.buckets: dict[int, set[str]] = {}  # {bucket: subscribers due in it}
+        self._bucket_heap: list[int] = []
+
+    def __len__(self) -> int:
+        """Number of held notifications"""
+        return sum(len(messages) for messages in self.pending.values())
+
+    def get_pending_file(self) -> Path:
+        """Get the deferred delivery file path"""
+        return plugin_config.cache_dir / f"pending_deliveries{get_cache_suffix()}"
+
+    def load_preferences(self):
+        """Load delivery preferences from file"""
+        try:
+            if self.preferences_file.exists():
+                with open(self.preferences_file, encoding="utf-8") as f:
+                    data = json.load(f)
+                self.preferences = {"users": {}, "groups": {}}
+                for target, policies in self.preferences.items():
+                    for member, policy in data.get(target, {}).items():
+                        try:
+                            policies[member] = DeliveryPolicy.from_dict(policy)
+                        except (ValueError, TypeError) as e:
+                            logger.warning(f"忽略 {member} 的无效推送设置: {e}")
+                logger.info(f"已加载 {sum(map(len, self.preferences.values()))} 个推送设置")
+        except Exception as e:
+            logger.error(f"加载推送设置失败: {e}")
+        self._merge_policies()
+
+    def save_preferences(self):
+        """Save delivery preferences to file"""
+        try:
+            self.preferences_file.parent.mkdir(parents=True, exist_ok=True)
+            data = {
+                target: {member: policy.to_dict() for member, policy in policies.items()}
+                for target, policies in self.preferences.items()
+            }
+            with open(self.preferences_file, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            logger.debug("推送设置已保存")
+        except Exception as e:
+            logger.error(f"保存推送设置失败: {e}")
+
+    def _merge_policies(self):
+        # Notifications address subscribers by id only, as get_subscribers does
+        self.policies = {**self.preferences["users"], **self.preferences["groups"]}
+
+    def get_policy(self, target_id: str, is_group: bool = False) -> DeliveryPolicy:
+        """Get a user's/group's delivery policy"""
+        return self.preferences["groups" if is_group else "users"].get(str(target_id)) or DeliveryPolicy()
+
+    def set_policy(self, target_id: str, policy: DeliveryPolicy, is_group: bool = False):
+        """
+        Set a user's/group's delivery policy; a default policy removes the preference
+        Held notifications are released once the new policy allows it
+        """
+        policies = self.preferences["groups" if is_group else "users"]
+        if policy.is_default():
+            policies.pop(str(target_id), None)
+        else:
+            policies[str(target_id)] = policy
+        self._merge_policies()
+        self.save_preferences()
+        if str(target_id) in self.pending:
+            self._schedule(str(target_id), self._now())
+
+    def _now(self) -> datetime:
+        return datetime.now(self.timezone)
+
+    def _bucket(self, when: datetime) -> int:
+        # Round up so a subscriber is never released before it is allowed
+        return -int(-when.timestamp() // self.resolution)
+
+    def _next_allowed(self, key: str, now: datetime) -> datetime:
+        policy = self.policies.get(key)
+        if policy is None:
+            return now
+        last_sent, day, count = self.sent.get(key, (None, 0, 0))
+        return policy.next_allowed(now, last_sent, count if day == now.toordinal() else 0)
+
+    def _record_sent(self, key: str, now: datetime):
+        if key not in self.policies:
+            return
+        _, day, count = self.sent.get(key, (None, 0, 0))
+        today = now.toordinal()
+        self.sent[key] = (now.timestamp(), today, count + 1 if day == today else 1)
+
+    def _schedule(self, key: str, now: datetime):
+        bucket = self._bucket(self._next_allowed(key, now))
+        previous = self.due.get(key)
+        if previous == bucket:
+            return
+        if previous is not None:
+            self.buckets[previous].discard(key)
+        self.due[key] = bucket
+        if bucket not in self.buckets:
+            self.buckets[bucket] = set()
+            heapq.heappush(self._bucket_heap, bucket)
+        self.buckets[bucket].add(key)
+
+    def route(self, subscriber_id: Member, message: Any, now: datetime | None = None) -> bool:
+        """
+        Decide whether a notification may be sent to a subscriber now
+        Args:
+            subscriber_id: Subscriber ID
+            message: Notification
+            now: Current time, defaults to now in the scheduler's timezone
+        Returns:
+            True if the notification should be sent now (and is counted as sent), False if it was held
+        """
+        key = str(subscriber_id)
+        if key not in self.policies and key not in self.pending:
+            return True
+        now = now or self._now()
+        # Keep order: once something is held, later notifications wait for the same batch
+        if key not in self.pending and self._next_allowed(key, now) <= now:
+            self._record_sent(key, now)
+            return True
+        self.pending.setdefault(key, []).append(message)
+        self._schedule(key, now)
+        return False
+
+    def release_due(self, now: datetime | None = None) -> list[tuple[str, str]]:
+        """
+        Take the held notifications that may now be sent
+        Args:
+            now: Current time, defaults to now in the scheduler's timezone
+        Returns:
+            [(subscriber_id, batched message)] for every subscriber released
+        """
+        now = now or self._now()
+        current = int(now.timestamp() // self.resolution)
+        released = []
+        while self._bucket_heap and self._bucket_heap[0] <= current:
+            bucket = heapq.heappop(self._bucket_heap)
+            for key in self.buckets.pop(bucket, ()):
+                del self.due[key]
+                # Rechecked: the policy may have changed, or a day limit may need another day
+                if self._next_allowed(key, now) > now:
+                    self._schedule(key, now)
+                    continue
+                messages = self.pending.pop(key)
+                self._record_sent(key, now)
+                released.append((key, BATCH_SEPARATOR.join(map(str, messages))))
+        return released
+
+    def save_pending(self) -> bool:
+        """Write held notifications, storing each distinct message once"""
+        pending_file = self.get_pending_file()
+        try:
+            if not self.pending:
+                pending_file.unlink(missing_ok=True)
+                return True
+            messages: dict[str, int] = {}
+            held = {
+                key: [messages.setdefault(str(message), len(messages)) for message in queued]
+                for key, queued in self.pending.items()
+            }
+            data = {"messages": list(messages), "pending": held, "sent": self.sent}
+            write_atomic(pending_file, encode_data(data))
+            logger.info(f"已保存 {len(self.pending)} 个订阅者的 {len(self)} 条待推送通知")
+            return True
+        except Exception as e:
+            logger.error(f"保存待推送通知失败: {e}")
+            return False
+
+    def load_pending(self):
+        """Restore held notifications written at the last shutdown"""
+        pending_file = self.get_pending_file()
+        try:
+            if not pending_file.exists():
+                return
+            data = decode_data(pending_file.read_bytes())
+            pending_file.unlink(missing_ok=True)
+        except Exception as e:
+            logger.warning(f"加载待推送通知失败: {e}")
+            return
+        messages = data.get("messages", [])
+        self.sent.update({key: tuple(value) for key, value in data.get("sent", {}).items()})
+        now = self._now()
+        for key, indexes in data.get("pending", {}).items():
+            self.pending.setdefault(key, []).extend(messages[index] for index in indexes)
+            self._schedule(key, now)
+        if self.pending:
+            logger.info(f"已恢复 {len(self.pending)} 个订阅者的 {len(self)} 条待推送通知")
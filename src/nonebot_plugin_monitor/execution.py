@@ -0,0 +1,118 @@
+"""Execution strategies for site callbacks
+
+Site compare/format callbacks may be async functions, plain functions run on
+the event loop, or plain functions offloaded to a worker thread or to a
+process pool shared by all sites. Offloading keeps expensive parsing and
+rendering from blocking command handling on the bot's event loop.
+
+Pool workers are started with `forkserver` (or `spawn` where it is not
+available) rather than forked from the bot process, whose HTTP client,
+scheduler and worker threads may hold locks at fork time. Callbacks reach the
+workers by reference and are imported there, so every worker initializes
+NoneBot and loads this plugin once when it starts (see `worker.py`, skipped
+when the bot's `__main__` already did it); this costs roughly as much as the
+plugin's own import time per worker, paid on the first process call. A pool
+whose workers died is replaced on the next call.
+"""
+
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+import inspect
+import multiprocessing
+import os
+from pathlib import Path
+import runpy
+from typing import Any
+
+from nonebot import logger
+
+from .config import plugin_config
+
+_process_pool: ProcessPoolExecutor | None = None
+
+
+# Run by path in every pool worker before any callback is unpickled
+WORKER_BOOTSTRAP = Path(__file__).with_name("worker.py")
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Get the process pool shared by all sites, creating it on first use"""
+    global _process_pool
+    if _process_pool is None:
+        from . import sites
+
+        workers = plugin_config.process_pool_workers or os.cpu_count() or 1
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _process_pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(method),
+            initializer=runpy.run_path,
+            # Workers need the extra site directories appended to the package path by `load_site_modules`
+            initargs=(str(WORKER_BOOTSTRAP), {"SITE_DIRS": list(sites.__path__)}, "__monitor_worker__"),
+        )
+        logger.info(f"已创建站点进程池，共 {workers} 个进程 ({method})")
+    return _process_pool
+
+
+def shutdown_process_pool():
+    """Shut down the shared process pool if it was created"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+        logger.info("站点进程池已关闭")
+
+
+def restart_process_pool():
+    """Replace the shared pool with fresh workers on next use; calls already running finish in the old one
+
+    Workers keep the site modules they imported, so this is needed after reloading a module they run.
+    """
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False)
+        _process_pool = None
+        logger.info("站点进程池将在下次使用时以新代码重建")
+
+
+def get_execution_mode(func: Callable, default: str = "inline") -> str:
+    """Get how a callback should be executed: "async", "inline", "thread" or "process" """
+    if inspect.iscoroutinefunction(func):
+        return "async"
+    return getattr(func, "__site_execution__", default)
+
+
+async def call_site_func(func: Callable, *args: Any, default: str = "inline") -> Any:
+    """
+    Call a site callback with the execution strategy it declares
+    Args:
+        func: Callback to call
+        *args: Arguments passed to the callback
+        default: Execution mode for callbacks that do not declare one (the site's `execution`)
+    Returns:
+        The callback's result
+    """
+    mode = get_execution_mode(func, default)
+    if mode == "async":
+        return await func(*args)
+    if mode == "thread":
+        return await asyncio.to_thread(func, *args)
+    if mode == "process":
+        loop = asyncio.get_running_loop()
+        pool = get_process_pool()
+        try:
+            return await loop.run_in_executor(pool, partial(func, *args))
+        except BrokenProcessPool:
+            # Another call may already have replaced the broken pool
+            if pool is _process_pool:
+                logger.error("站点进程池的工作进程异常退出，将在下次使用时重建")
+                restart_process_pool()
+            raise
+
+    result = func(*args)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
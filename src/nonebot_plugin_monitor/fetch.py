@@ -0,0 +1,405 @@
+"""Streaming HTTP helpers for site modules
+
+`response.json()` buffers the whole body and builds the complete object tree
+before a site module can look at a single item. The helpers here read the body
+in chunks, enforce a maximum body size and decode the items of a JSON array
+incrementally, so a check can stop as soon as it has the first N items.
+
+Requests made without an explicit client share one connection-pooled client,
+so consecutive checks of a site reuse their connection. The origins it has
+talked to are remembered so a restart can re-open those connections early.
+"""
+
+import asyncio
+import codecs
+from collections.abc import AsyncIterator, Sequence
+import json
+import re
+from typing import Any
+
+import httpx
+
+from .config import plugin_config
+
+_INCOMPLETE = object()
+
+# Characters that matter when looking for the end of a JSON string, object or array
+_STRUCTURAL = re.compile(r'["\[\]{}]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+_shared_client: httpx.AsyncClient | None = None
+_shared_client_loop: asyncio.AbstractEventLoop | None = None
+
+# Origins (scheme://host:port) requested through the shared client
+known_origins: set[str] = set()
+
+
+class ResponseTooLargeError(Exception):
+    """Raised when a response body exceeds the configured size limit"""
+
+    def __init__(self, url: str, limit: int):
+        super().__init__(f"Response from {url} exceeds {limit} bytes")
+        self.url = url
+        self.limit = limit
+
+
+class _IncrementalArrayDecoder:
+    """Incrementally decode the items of a JSON array located at `path`
+
+    `path` is a dotted list of object keys leading to the array, e.g.
+    "data.list" for `{"data": {"list": [...]}}`, or a sequence of keys for
+    keys that contain a dot. An empty path means the document itself is the
+    array. Sibling values that are not on the path are
+    decoded and discarded; only the current item is ever held in memory.
+
+    A string, object or array split across chunks is only decoded once its
+    closing character has arrived. Until then its chunks are collected and
+    only the newly arrived text is scanned, so a large item costs linear time
+    however many chunks it spans.
+    """
+
+    def __init__(self, path: str | Sequence[str] = ""):
+        self._path = [key for key in path.split(".") if key] if isinstance(path, str) else list(path)
+        self._depth = 0
+        self._state = "value"
+        self._buf = ""
+        self._pos = 0
+        self._key: str | None = None
+        self._decoder = json.JSONDecoder()
+        self._pending: list[str] = []  # Chunks of a value whose end has not arrived yet
+        self._scan_depth = 0
+        self._scan_in_string = False
+        self._scan_escaped = False  # The previous chunk ended with a backslash inside a string
+        self.done = False
+
+    def feed(self, text: str, final: bool = False) -> list[Any]:
+        """Feed more text and return the items completed by it"""
+        if self._pending:
+            self._pending.append(text)
+            if self._scan_end(text, 0) is None and not final:
+                return []
+            # The value is complete: decode it (and whatever follows) from one buffer
+            self._buf = "".join(self._pending)
+            self._pending = []
+        else:
+            self._buf = self._buf[self._pos :] + text
+        self._pos = 0
+        items: list[Any] = []
+
+        while not self.done:
+            self._skip_whitespace()
+            if self._pos >= len(self._buf):
+                break
+
+            char = self._buf[self._pos]
+            state = self._state
+
+            if state == "value":
+                expected = "[" if self._depth == len(self._path) else "{"
+                if char != expected:
+                    raise ValueError(f"Expected '{expected}' at path {'.'.join(self._path[: self._depth]) or '<root>'}")
+                self._pos += 1
+                self._state = "first_item" if expected == "[" else "first_key"
+            elif state in ("first_key", "key"):
+                if char == "}" and state == "first_key":
+                    self._pos += 1
+                    self.done = True  # Path not found in this object
+                    break
+                if char != '"':
+                    raise ValueError("Expected string key in object")
+                decoded = self._decode(final)
+                if decoded is _INCOMPLETE:
+                    break
+                self._key = decoded
+                self._state = "colon"
+            elif state == "colon":
+                if char != ":":
+                    raise ValueError("Expected ':' after object key")
+                self._pos += 1
+                if self._key == self._path[self._depth]:
+                    self._depth += 1
+                    self._state = "value"
+                else:
+                    self._state = "skip"
+            elif state == "skip":
+                if self._decode(final) is _INCOMPLETE:
+                    break
+                self._state = "key_sep"
+            elif state == "key_sep":
+                self._pos += 1
+                if char == "}":
+                    self.done = True  # Path not found in this object
+                elif char == ",":
+                    self._state = "key"
+                else:
+                    raise ValueError("Expected ',' or '}' in object")
+            elif state in ("first_item", "item"):
+                if char == "]" and state == "first_item":
+                    self._pos += 1
+                    self.done = True
+                    break
+                item = self._decode(final)
+                if item is _INCOMPLETE:
+                    break
+                items.append(item)
+                self._state = "item_sep"
+            elif state == "item_sep":
+                self._pos += 1
+                if char == "]":
+                    self.done = True
+                elif char == ",":
+                    self._state = "item"
+                else:
+                    raise ValueError("Expected ',' or ']' in array")
+
+        if final and not self.done:
+            raise ValueError("Unexpected end of JSON document")
+        return items
+
+    def _skip_whitespace(self):
+        while self._pos < len(self._buf) and self._buf[self._pos] in " \t\r\n":
+            self._pos += 1
+
+    def _scan_end(self, text: str, start: int) -> int | None:
+        """
+        Continue scanning a string, object or array for its end
+        Returns:
+            Index just past the value's end in `text`, or None if it is not in `text`
+        """
+        position = start
+        if self._scan_escaped:
+            self._scan_escaped = False
+            position += 1
+        while True:
+            pattern = _STRING_SPECIAL if self._scan_in_string else _STRUCTURAL
+            match = pattern.search(text, position)
+            if match is None:
+                return None
+            char = match.group()
+            position = match.end()
+            if self._scan_in_string:
+                if char == "\\":
+                    if position >= len(text):
+                        self._scan_escaped = True
+                        return None
+                    position += 1
+                    continue
+                self._scan_in_string = False
+                if self._scan_depth == 0:
+                    return position
+            elif char == '"':
+                self._scan_in_string = True
+            elif char in "[{":
+                self._scan_depth += 1
+            else:
+                self._scan_depth -= 1
+                if self._scan_depth == 0:
+                    return position
+
+    def _decode(self, final: bool) -> Any:
+        """Decode one value at the current position, or return `_INCOMPLETE` if more data is needed"""
+        if not final and self._buf[self._pos] in '"[{':
+            self._scan_depth = 0
+            self._scan_in_string = False
+            self._scan_escaped = False
+            if self._scan_end(self._buf, self._pos) is None:
+                # Collect chunks until the value's end arrives instead of re-decoding it every time
+                self._pending = [self._buf[self._pos :]]
+                self._buf = ""
+                self._pos = 0
+                return _INCOMPLETE
+        try:
+            value, end = self._decoder.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return _INCOMPLETE
+        # A number that touches the end of the buffer (or stops at a partial fraction/exponent) may still be growing
+        if not final and self._buf[self._pos] not in '"[{' and (end == len(self._buf) or self._buf[end] in ".eE+-"):
+            return _INCOMPLETE
+        self._pos = end
+        return value
+
+
+def get_shared_client() -> httpx.AsyncClient:
+    """Get the connection-pooled client used when a fetch does not pass its own"""
+    global _shared_client, _shared_client_loop
+    loop = asyncio.get_running_loop()
+    if _shared_client is None or _shared_client.is_closed or _shared_client_loop is not loop:
+        _shared_client = httpx.AsyncClient(timeout=plugin_config.fetch_timeout)
+        _shared_client_loop = loop
+    return _shared_client
+
+
+async def close_shared_client():
+    """Close the shared client if it was created"""
+    global _shared_client, _shared_client_loop
+    if _shared_client is not None:
+        if _shared_client_loop is asyncio.get_running_loop():
+            await _shared_client.aclose()
+        _shared_client = None
+        _shared_client_loop = None
+
+
+def _origin(url: str) -> str:
+    parsed = httpx.URL(url)
+    return f"{parsed.scheme}://{parsed.netloc.decode('ascii')}"
+
+
+async def warm_connections(origins: list[str], concurrency: int) -> int:
+    """
+    Open pooled connections to previously used origins with HEAD requests
+    Args:
+        origins: Origins to connect to
+        concurrency: Maximum concurrent requests
+    Returns:
+        Number of origins that answered
+    """
+    client = get_shared_client()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def warm(origin: str) -> bool:
+        async with semaphore:
+            try:
+                await client.head(origin)
+            except httpx.HTTPError:
+                return False
+            known_origins.add(origin)
+            return True
+
+    return sum(await asyncio.gather(*(warm(origin) for origin in origins)))
+
+
+async def _iter_body(
+    url: str,
+    method: str,
+    max_bytes: int,
+    client: httpx.AsyncClient | None,
+    request_kwargs: dict[str, Any],
+) -> AsyncIterator[bytes]:
+    """Yield the response body in chunks, enforcing the size limit"""
+    if client is None:
+        client = get_shared_client()
+        known_origins.add(_origin(url))
+    async with client.stream(method, url, **request_kwargs) as response:
+        response.raise_for_status()
+        try:
+            declared = int(response.headers.get("content-length", ""))
+        except ValueError:
+            declared = None  # Missing or malformed; the streamed size is still enforced
+        if declared is not None and declared > max_bytes:
+            raise ResponseTooLargeError(url, max_bytes)
+
+        received = 0
+        async for chunk in response.aiter_bytes():
+            received += len(chunk)
+            if received > max_bytes:
+                raise ResponseTooLargeError(url, max_bytes)
+            yield chunk
+
+
+async def fetch_bytes(
+    url: str,
+    *,
+    method: str = "GET",
+    max_bytes: int | None = None,
+    client: httpx.AsyncClient | None = None,
+    **request_kwargs: Any,
+) -> bytes:
+    """Fetch a response body, refusing bodies larger than `max_bytes`
+
+    Args:
+        url: URL to fetch
+        method: HTTP method
+        max_bytes: Maximum body size, defaults to `fetch_max_body_size`
+        client: Optional client; the shared pooled client is used otherwise
+        **request_kwargs: Extra arguments passed to `client.stream`
+    Returns:
+        The raw response body
+    """
+    limit = plugin_config.fetch_max_body_size if max_bytes is None else max_bytes
+    chunks = [chunk async for chunk in _iter_body(url, method, limit, client, request_kwargs)]
+    return b"".join(chunks)
+
+
+async def iter_json_items(
+    url: str,
+    *,
+    path: str | Sequence[str] = "",
+    limit: int | None = None,
+    method: str = "GET",
+    max_bytes: int | None = None,
+    client: httpx.AsyncClient | None = None,
+    **request_kwargs: Any,
+) -> AsyncIterator[Any]:
+    """Stream the items of a JSON array from a URL
+
+    The connection is closed as soon as `limit` items have been produced, so
+    the rest of the body is never downloaded or decoded.
+
+    Args:
+        url: URL to fetch
+        path: Dotted key path to the array, e.g. "data.list", or a sequence of keys;
+            empty for a top-level array
+        limit: Stop after this many items
+        method: HTTP method
+        max_bytes: Maximum body size, defaults to `fetch_max_body_size`
+        client: Optional client; the shared pooled client is used otherwise
+        **request_kwargs: Extra arguments passed to `client.stream`
+    """
+    if limit is not None and limit <= 0:
+        return
+
+    size_limit = plugin_config.fetch_max_body_size if max_bytes is None else max_bytes
+    decoder = _IncrementalArrayDecoder(path)
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    produced = 0
+
+    body = _iter_body(url, method, size_limit, client, request_kwargs)
+    try:
+        async for chunk in body:
+            for item in decoder.feed(text_decoder.decode(chunk)):
+                yield item
+                produced += 1
+                if limit is not None and produced >= limit:
+                    return
+            if decoder.done:
+                return
+        for item in decoder.feed(text_decoder.decode(b"", final=True), final=True):
+            yield item
+            produced += 1
+            if limit is not None and produced >= limit:
+                return
+    finally:
+        await body.aclose()
+
+
+async def fetch_json_items(
+    url: str,
+    *,
+    path: str | Sequence[str] = "",
+    limit: int | None = None,
+    method: str = "GET",
+    max_bytes: int | None = None,
+    client: httpx.AsyncClient | None = None,
+    **request_kwargs: Any,
+) -> list[Any]:
+    """Fetch up to `limit` items of a JSON array from a URL
+
+    See `iter_json_items` for the arguments.
+
+    Returns:
+        List of decoded items
+    """
+    return [
+        item
+        async for item in iter_json_items(
+            url,
+            path=path,
+            limit=limit,
+            method=method,
+            max_bytes=max_bytes,
+            client=client,
+            **request_kwargs,
+        )
+    ]
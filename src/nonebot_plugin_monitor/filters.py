@@ -0,0 +1,164 @@
+"""Keyword filters for subscriptions
+
+A subscriber with filters on a site is only notified of updates whose message
+matches at least one of them; subscribers without filters get every update.
+A filter is either a keyword (case-insensitive substring) or a regular
+expression written as `/pattern/`.
+
+All keywords on a site are compiled into one Aho-Corasick automaton, so a
+message is scanned once no matter how many keywords or subscribers there are.
+All regular expressions on a site are combined into one alternation used as a
+single-pass prefilter; only when it matches are the individual expressions
+evaluated, once per distinct expression. Expressions that cannot be combined
+(inline global flags, capture groups, whose numbers and backreferences would
+shift inside the alternation) make the site fall back to evaluating every
+expression on its own.
+
+Regular expressions come from any subscriber and run on the event loop for
+every update, so they are limited in length and may not nest quantifiers
+(the usual source of catastrophic backtracking).
+"""
+
+from collections import deque
+from collections.abc import Iterable
+import re
+
+from nonebot import logger
+
+from .subscribers import Member
+
+# Longest accepted filter, in characters
+MAX_FILTER_LENGTH = 100
+
+# A quantified group that itself contains a quantifier, e.g. (a+)+ or (\w*x)*
+_NESTED_QUANTIFIER = re.compile(r"\((?:[^()\\]|\\.)*[*+}](?:[^()\\]|\\.)*\)(?:[*+?]|\{\d)")
+
+
+def parse_filter(pattern: str) -> str:
+    """
+    Validate and normalize a filter
+    Args:
+        pattern: Keyword, or regular expression written as `/pattern/`
+    Returns:
+        The normalized filter (keywords lowercased)
+    Raises:
+        ValueError: If the filter is empty, too long, or not an accepted regular expression
+    """
+    pattern = pattern.strip()
+    if len(pattern) > MAX_FILTER_LENGTH:
+        raise ValueError(f"过滤规则不能超过 {MAX_FILTER_LENGTH} 个字符")
+    if is_regex_filter(pattern):
+        try:
+            re.compile(pattern[1:-1])
+        except re.error as e:
+            raise ValueError(f"无效的正则表达式 {pattern}: {e}") from e
+        if _NESTED_QUANTIFIER.search(pattern[1:-1]):
+            raise ValueError(f"正则表达式 {pattern} 含有嵌套的重复，可能导致匹配过慢")
+        return pattern
+    if not pattern:
+        raise ValueError("过滤关键词不能为空")
+    return pattern.lower()
+
+
+def is_regex_filter(pattern: str) -> bool:
+    """Whether a filter is a `/pattern/` regular expression"""
+    return len(pattern) > 2 and pattern.startswith("/") and pattern.endswith("/")
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton finding every keyword in a text in one pass"""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.goto: list[dict[str, int]] = [{}]
+        self.outputs: list[list[str]] = [[]]
+        for keyword in keywords:
+            state = 0
+            for char in keyword:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.outputs.append([])
+                state = next_state
+            self.outputs[state].append(keyword)
+
+        # Failure links in breadth-first order; a state's outputs include those of its failure state
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.outputs[next_state] += self.outputs[self.fail[next_state]]
+
+    def search(self, text: str) -> set[str]:
+        """Keywords occurring in a text (the text should already be lowercased)"""
+        found: set[str] = set()
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+
+class FilterMatcher:
+    """All filters of one site, compiled for matching messages against every subscriber at once"""
+
+    def __init__(self, filters: dict[str, list[str]]):
+        """
+        Args:
+            filters: {subscriber_id: [filters]} for subscribers with filters
+        """
+        self.filtered = set(filters)
+        self.keyword_members: dict[str, set[str]] = {}
+        self.regex_members: dict[str, set[str]] = {}
+        for member, patterns in filters.items():
+            for pattern in patterns:
+                owners = self.regex_members if is_regex_filter(pattern) else self.keyword_members
+                owners.setdefault(pattern, set()).add(member)
+
+        self.automaton = KeywordAutomaton(self.keyword_members)
+        self.regexes: dict[str, re.Pattern] = {}
+        for pattern in self.regex_members:
+            try:
+                self.regexes[pattern] = re.compile(pattern[1:-1], re.IGNORECASE)
+            except re.error as e:
+                logger.warning(f"忽略无效的过滤规则 {pattern}: {e}")
+        self.combined_regex = None
+        # Wrapping renumbers capture groups, so a numbered backreference would point at another group
+        if self.regexes and not any(regex.groups for regex in self.regexes.values()):
+            try:
+                self.combined_regex = re.compile(
+                    "|".join(f"(?:{pattern[1:-1]})" for pattern in self.regexes), re.IGNORECASE
+                )
+            except re.error:
+                # Expressions that only compile on their own are each evaluated without a prefilter
+                pass
+
+    def matching_members(self, text: str) -> set[str]:
+        """Subscribers with filters that match a message"""
+        members: set[str] = set()
+        for keyword in self.automaton.search(text.lower()):
+            members |= self.keyword_members[keyword]
+        if self.regexes and (self.combined_regex is None or self.combined_regex.search(text)):
+            for pattern, regex in self.regexes.items():
+                if not self.regex_members[pattern] <= members and regex.search(text):
+                    members |= self.regex_members[pattern]
+        return members
+
+    def select(self, subscribers: list[Member], text: str) -> list[Member]:
+        """Subscribers that should receive a message, in their original order"""
+        if not self.filtered:
+            return subscribers
+        matched = self.matching_members(text)
+        return [member for member in subscribers if str(member) not in self.filtered or str(member) in matched]
@@ -1,9 +1,24 @@
+from pathlib import Path
+import re
+import time
+
 from nonebot import on_command
 from nonebot.adapters import Bot, Event
+from nonebot.permission import SUPERUSER
 from nonebot_plugin_uninfo import Uninfo
 
+from .delivery import DeliveryPolicy, parse_quiet_hours
+from .listing import subscription_list
 from .manager import subscription_manager
-from .scheduler import scheduler_instance
+from .scheduler import (
+    CHECK_CANCELLED,
+    CHECK_ERROR,
+    CHECK_SEEDED,
+    CHECK_UNCHANGED,
+    CHECK_UNREGISTERED,
+    CHECK_UPDATED,
+    scheduler_instance,
+)
 
 # 订阅相关命令处理器
 subscribe_cmd = on_command("订阅", priority=5)
@@ -11,6 +26,39 @@ unsubscribe_cmd = on_command("取消订阅", priority=5)
 list_subscriptions_cmd = on_command("订阅列表", priority=5)
 subscribe_all_cmd = on_command("订阅全部", priority=5)
 unsubscribe_all_cmd = on_command("取消订阅全部", priority=5)
+filter_cmd = on_command("订阅过滤", priority=5)
+unfilter_cmd = on_command("取消订阅过滤", priority=5)
+delivery_cmd = on_command("推送设置", priority=5)
+
+# 管理命令
+check_now_cmd = on_command("立即检查", permission=SUPERUSER, priority=5)
+pipeline_status_cmd = on_command("检查队列", permission=SUPERUSER, priority=5)
+seed_cmd = on_command("建立基线", permission=SUPERUSER, priority=5)
+import_subscriptions_cmd = on_command("导入订阅", permission=SUPERUSER, priority=5)
+export_subscriptions_cmd = on_command("导出订阅", permission=SUPERUSER, priority=5)
+
+CHECK_RESULT_TEXT = {
+    CHECK_UPDATED: "有更新",
+    CHECK_UNCHANGED: "无更新",
+    CHECK_SEEDED: "已建立基线",
+    CHECK_ERROR: "检查失败",
+    CHECK_UNREGISTERED: "未知站点",
+    CHECK_CANCELLED: "已取消",
+}
+
+
+def split_site_names(args: str) -> list[str]:
+    """Split space- or comma-separated display names, keeping their order and dropping duplicates"""
+    # A display name that itself contains spaces is kept whole
+    if args in scheduler_instance.display_name_to_site_name or args in scheduler_instance.site_configs:
+        return [args]
+    return list(dict.fromkeys(name for name in re.split(r"[\s,，]+", args) if name))
+
+
+def to_site_name(name: str) -> str:
+    """Internal site name of a display name, 全部 included"""
+    site_name = scheduler_instance.get_site_name_by_display_name(name)
+    return "all" if site_name == "全部" else site_name
 
 
 @subscribe_cmd.handle()
@@ -39,16 +87,30 @@ async def handle_subscribe(bot: Bot, event: Event, uninfo: Uninfo):
         target_id = str(event.get_user_id())
         target_type = "用户"
 
-    # Convert display name to internal site name
-    site_name = scheduler_instance.get_site_name_by_display_name(args)
+    # Space- or comma-separated display names, converted to internal site names
+    names = split_site_names(args)
+    if len(names) == 1:
+        args = names[0]
+        site_name = scheduler_instance.get_site_name_by_display_name(args)
 
-    # 订阅站点
-    success = subscription_manager.subscribe(target_id, site_name, is_group)
+        # 订阅站点
+        success = subscription_manager.subscribe(target_id, site_name, is_group)
 
-    if success:
-        await subscribe_cmd.finish(f"{target_type} {target_id} 已订阅 {args}")
-    else:
-        await subscribe_cmd.finish(f"{target_type} {target_id} 订阅 {args} 失败")
+        if success:
+            await subscribe_cmd.finish(f"{target_type} {target_id} 已订阅 {args}")
+        else:
+            await subscribe_cmd.finish(f"{target_type} {target_id} 订阅 {args} 失败")
+        return
+
+    site_names = {name: to_site_name(name) for name in names}
+    subscribed = subscription_manager.subscribe_many(target_id, list(site_names.values()), is_group)
+    added = [name for name, site_name in site_names.items() if site_name in subscribed]
+    skipped = [name for name in names if name not in added]
+
+    message = f"{target_type} {target_id} 已订阅 {'、'.join(added)}" if added else f"{target_type} {target_id} 订阅失败"
+    if skipped:
+        message += f"\n已订阅或订阅失败: {'、'.join(skipped)}"
+    await subscribe_cmd.finish(message)
 
 
 @unsubscribe_cmd.handle()
@@ -77,16 +139,33 @@ async def handle_unsubscribe(bot: Bot, event: Event, uninfo: Uninfo):
         target_id = str(event.get_user_id())
         target_type = "用户"
 
-    # Convert display name to internal site name
-    site_name = scheduler_instance.get_site_name_by_display_name(args)
+    # Space- or comma-separated display names, converted to internal site names
+    names = split_site_names(args)
+    if len(names) == 1:
+        args = names[0]
+        site_name = scheduler_instance.get_site_name_by_display_name(args)
 
-    # 取消订阅站点
-    success = subscription_manager.unsubscribe(target_id, site_name, is_group)
+        # 取消订阅站点
+        success = subscription_manager.unsubscribe(target_id, site_name, is_group)
 
-    if success:
-        await unsubscribe_cmd.finish(f"{target_type} {target_id} 已取消订阅 {args}")
+        if success:
+            await unsubscribe_cmd.finish(f"{target_type} {target_id} 已取消订阅 {args}")
+        else:
+            await unsubscribe_cmd.finish(f"{target_type} {target_id} 未订阅 {args} 或取消订阅失败")
+        return
+
+    site_names = {name: to_site_name(name) for name in names}
+    removed = subscription_manager.unsubscribe_many(target_id, list(site_names.values()), is_group)
+    done = [name for name, site_name in site_names.items() if site_name in removed]
+    skipped = [name for name in names if name not in done]
+
+    if done:
+        message = f"{target_type} {target_id} 已取消订阅 {'、'.join(done)}"
     else:
-        await unsubscribe_cmd.finish(f"{target_type} {target_id} 未订阅 {args} 或取消订阅失败")
+        message = f"{target_type} {target_id} 取消订阅失败"
+    if skipped:
+        message += f"\n未订阅或取消订阅失败: {'、'.join(skipped)}"
+    await unsubscribe_cmd.finish(message)
 
 
 @list_subscriptions_cmd.handle()
@@ -100,49 +179,8 @@ async def handle_list_subscriptions(bot: Bot, event: Event, uninfo: Uninfo):
     else:
         target_id = str(event.get_user_id())
 
-    # 获取用户的订阅
-    user_subscriptions = subscription_manager.get_subscriptions(target_id, is_group)
-
-    # 获取所有可用的站点
-    available_sites = list(scheduler_instance.site_configs.keys())
-
-    # 创建消息
-    if not available_sites:
-        message = "暂无可用的订阅源"
-    else:
-        message = "订阅列表:\n"
-
-        # 显示已订阅的站点
-        if user_subscriptions:
-            message += "已订阅:\n"
-            for site in user_subscriptions:
-                if site == "全部":
-                    message += f"✓ {site} - 接收所有站点的通知\n"
-                elif site in scheduler_instance.site_configs:
-                    display_name = scheduler_instance.site_configs[site].display_name()
-                    description = scheduler_instance.site_configs[site].description()
-                    message += f"✓ {display_name} - {description}\n"
-                else:
-                    message += f"✓ {site} - (描述不可用)\n"
-            message += "\n"
-
-        # 显示未订阅的站点
-        unsubscribed_sites = [site for site in available_sites if site not in user_subscriptions and site != "all"]
-        # Add "全部" to unsubscribed list if not subscribed
-        if "全部" not in user_subscriptions:
-            unsubscribed_sites.append("全部")
-
-        if unsubscribed_sites:
-            message += "未订阅:\n"
-            for site in unsubscribed_sites:
-                if site == "全部":
-                    message += f"○ {site} - 接收所有站点的通知\n"
-                elif site in scheduler_instance.site_configs:
-                    display_name = scheduler_instance.site_configs[site].display_name()
-                    description = scheduler_instance.site_configs[site].description()
-                    message += f"○ {display_name} - {description}\n"
-                else:
-                    message += f"○ {site} - (描述不可用)\n"
+    # 渲染订阅列表 (命中缓存时无需重新生成)
+    message = subscription_list.render(target_id, is_group)
 
     await list_subscriptions_cmd.finish(message)
 
@@ -189,3 +227,232 @@ async def handle_unsubscribe_all(bot: Bot, event: Event, uninfo: Uninfo):
         await unsubscribe_all_cmd.finish(f"{target_type} {target_id} 已取消订阅全部站点")
     else:
         await unsubscribe_all_cmd.finish(f"{target_type} {target_id} 未订阅全部站点或取消订阅失败")
+
+
+@filter_cmd.handle()
+async def handle_filter(bot: Bot, event: Event, uninfo: Uninfo):
+    """处理订阅过滤命令: /订阅过滤 <网站名> [关键词或 /正则/ ...]"""
+    args = command_args(event, "订阅过滤").split()
+    if not args:
+        await filter_cmd.finish("请指定网站名称和过滤关键词，例如: /订阅过滤 <网站名> 关键词 /正则/")
+        return
+
+    # 获取用户/群组ID
+    is_group = False
+    if hasattr(event, "group_id") and event.group_id:
+        target_id = str(event.group_id)
+        is_group = True
+        target_type = "群组"
+    else:
+        target_id = str(event.get_user_id())
+        target_type = "用户"
+
+    display_name, patterns = args[0], args[1:]
+    site_name = to_site_name(display_name)
+    if not patterns:
+        filters = subscription_manager.get_filters(target_id, site_name, is_group)
+        if filters:
+            await filter_cmd.finish(f"{display_name} 的过滤规则: {'、'.join(filters)}")
+        else:
+            await filter_cmd.finish(f"{display_name} 未设置过滤规则，将接收全部更新")
+        return
+
+    try:
+        added = subscription_manager.add_filters(target_id, site_name, patterns, is_group)
+    except ValueError as e:
+        await filter_cmd.finish(str(e))
+        return
+    if added is None:
+        await filter_cmd.finish(f"{target_type} {target_id} 未订阅 {display_name}")
+    else:
+        filters = subscription_manager.get_filters(target_id, site_name, is_group)
+        await filter_cmd.finish(f"{display_name} 仅推送匹配以下规则的更新: {'、'.join(filters)}")
+
+
+@unfilter_cmd.handle()
+async def handle_unfilter(bot: Bot, event: Event, uninfo: Uninfo):
+    """处理取消订阅过滤命令: /取消订阅过滤 <网站名> [关键词 ...]，不指定关键词时清除全部规则"""
+    args = command_args(event, "取消订阅过滤").split()
+    if not args:
+        await unfilter_cmd.finish("请指定网站名称")
+        return
+
+    # 获取用户/群组ID
+    is_group = False
+    if hasattr(event, "group_id") and event.group_id:
+        target_id = str(event.group_id)
+        is_group = True
+    else:
+        target_id = str(event.get_user_id())
+
+    display_name, patterns = args[0], args[1:]
+    removed = subscription_manager.remove_filters(target_id, to_site_name(display_name), patterns or None, is_group)
+    if removed:
+        await unfilter_cmd.finish(f"已删除 {display_name} 的 {removed} 个过滤规则")
+    else:
+        await unfilter_cmd.finish(f"{display_name} 没有匹配的过滤规则")
+
+
+@delivery_cmd.handle()
+async def handle_delivery(bot: Bot, event: Event, uninfo: Uninfo):
+    """处理推送设置命令: /推送设置 [免打扰 HH:MM-HH:MM | 间隔 <分钟> | 每日上限 <条数> | 清除]"""
+    args = command_args(event, "推送设置").split()
+
+    # 获取用户/群组ID
+    is_group = False
+    if hasattr(event, "group_id") and event.group_id:
+        target_id = str(event.group_id)
+        is_group = True
+        target_type = "群组"
+    else:
+        target_id = str(event.get_user_id())
+        target_type = "用户"
+
+    dispatcher = scheduler_instance.dispatcher
+    current = dispatcher.get_policy(target_id, is_group)
+    if not args:
+        await delivery_cmd.finish(f"{target_type} {target_id} 的推送设置: {current.describe()}")
+        return
+
+    # Edit a copy: the stored policy is live and must only change once the new value is valid
+    policy = DeliveryPolicy(current.quiet_hours, current.min_interval, current.max_per_day)
+
+    option, value = args[0], args[1] if len(args) > 1 else ""
+    try:
+        if option == "清除":
+            policy = DeliveryPolicy()
+        elif option == "免打扰":
+            policy.quiet_hours = parse_quiet_hours(value) if value not in ("", "关闭") else None
+        elif option == "间隔":
+            policy.min_interval = float(value) * 60 if value else 0
+        elif option == "每日上限":
+            policy.max_per_day = int(value) if value else 0
+        else:
+            await delivery_cmd.finish("用法: /推送设置 [免打扰 HH:MM-HH:MM | 间隔 <分钟> | 每日上限 <条数> | 清除]")
+            return
+        policy.validate()
+    except ValueError as e:
+        await delivery_cmd.finish(f"无效的推送设置: {e}")
+        return
+
+    dispatcher.set_policy(target_id, policy, is_group)
+    await delivery_cmd.finish(f"{target_type} {target_id} 的推送设置已更新: {policy.describe()}")
+
+
+@check_now_cmd.handle()
+async def handle_check_now(bot: Bot, event: Event):
+    """处理立即检查命令 (管理员)"""
+    # Extract site names from command arguments (remove command itself)
+    message = str(event.get_message()).strip()
+    if message.startswith("/立即检查"):
+        args = message[5:].strip()
+    elif message.startswith("立即检查"):
+        args = message[4:].strip()
+    else:
+        args = message
+
+    # No arguments means all sites; otherwise space- or comma-separated display names
+    site_names = None
+    if args:
+        site_names = [scheduler_instance.get_site_name_by_display_name(name) for name in split_site_names(args)]
+        if "all" in site_names:
+            site_names = None
+
+    start = time.perf_counter()
+    results = await scheduler_instance.check_sites(site_names)
+    total_elapsed = time.perf_counter() - start
+    if not results:
+        await check_now_cmd.finish("暂无可检查的站点")
+        return
+
+    message = "检查结果:\n"
+    counts = dict.fromkeys(CHECK_RESULT_TEXT, 0)
+    for site_name, result, elapsed, coalesced in results:
+        counts[result] += 1
+        site_config = scheduler_instance.site_configs.get(site_name)
+        display_name = site_config.display_name() if site_config else site_name
+        joined = " (合并进行中的检查)" if coalesced else ""
+        message += f"{display_name}: {CHECK_RESULT_TEXT[result]} {elapsed:.2f}s{joined}\n"
+
+    failed = counts[CHECK_ERROR] + counts[CHECK_UNREGISTERED] + counts[CHECK_CANCELLED]
+    message += (
+        f"\n共检查 {len(results)} 个站点: {counts[CHECK_UPDATED]} 个有更新, {counts[CHECK_UNCHANGED]} 个无更新, "
+        f"{counts[CHECK_SEEDED]} 个建立基线, {failed} 个失败, 总耗时 {total_elapsed:.2f}s"
+    )
+    await check_now_cmd.finish(message)
+
+
+@seed_cmd.handle()
+async def handle_seed(bot: Bot, event: Event):
+    """处理建立基线命令 (管理员)"""
+    args = command_args(event, "建立基线")
+    site_names = None
+    if args:
+        site_names = [scheduler_instance.get_site_name_by_display_name(name) for name in split_site_names(args)]
+        if "all" in site_names:
+            site_names = None
+
+    start = time.perf_counter()
+    results = await scheduler_instance.seed_sites(site_names)
+    total_elapsed = time.perf_counter() - start
+    if not results:
+        await seed_cmd.finish("所有站点均已有缓存，无需建立基线")
+        return
+
+    message = "建立基线结果:\n"
+    seeded = 0
+    for site_name, result, elapsed, _ in results:
+        seeded += result == CHECK_SEEDED
+        site_config = scheduler_instance.site_configs.get(site_name)
+        display_name = site_config.display_name() if site_config else site_name
+        message += f"{display_name}: {CHECK_RESULT_TEXT[result]} {elapsed:.2f}s\n"
+    message += f"\n共 {len(results)} 个站点: {seeded} 个已建立基线, 总耗时 {total_elapsed:.2f}s"
+    await seed_cmd.finish(message)
+
+
+@pipeline_status_cmd.handle()
+async def handle_pipeline_status(bot: Bot, event: Event):
+    """处理检查队列状态命令 (管理员)"""
+    message = "检查流水线状态:\n"
+    for stage_name, stats in scheduler_instance.pipeline.stats().items():
+        message += (
+            f"{stage_name}: 排队 {stats['queued']}/{stats['capacity']}, 处理中 {stats['busy']}/{stats['workers']}, "
+            f"已完成 {stats['processed']}, 失败 {stats['failed']}\n"
+        )
+    message += f"进行中的站点检查: {len(scheduler_instance.running_checks)}"
+    for site_name, task in scheduler_instance.stream_tasks.items():
+        message += f"\n流式站点 {site_name}: {task.stream.status()}"
+    await pipeline_status_cmd.finish(message)
+
+
+def command_args(event: Event, command: str) -> str:
+    """Message text after the command name"""
+    message = str(event.get_message()).strip()
+    return message.removeprefix("/").removeprefix(command).strip()
+
+
+@import_subscriptions_cmd.handle()
+async def handle_import_subscriptions(bot: Bot, event: Event):
+    """处理导入订阅命令 (管理员)"""
+    args = command_args(event, "导入订阅")
+    if not args:
+        await import_subscriptions_cmd.finish("请指定要导入的订阅文件路径")
+        return
+
+    added = subscription_manager.import_subscriptions_file(Path(args))
+    if added is None:
+        await import_subscriptions_cmd.finish(f"读取订阅文件 {args} 失败")
+    else:
+        await import_subscriptions_cmd.finish(f"已导入 {added} 个订阅")
+
+
+@export_subscriptions_cmd.handle()
+async def handle_export_subscriptions(bot: Bot, event: Event):
+    """处理导出订阅命令 (管理员)"""
+    args = command_args(event, "导出订阅")
+    file_path = Path(args) if args else subscription_manager.data_file.with_name("subscriptions_export.json")
+
+    if subscription_manager.export_subscriptions_file(file_path):
+        await export_subscriptions_cmd.finish(f"订阅已导出到 {file_path}")
+    else:
+        await export_subscriptions_cmd.finish("导出订阅失败")
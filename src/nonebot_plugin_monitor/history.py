@@ -0,0 +1,249 @@
+"""Bounded per-site snapshot history
+
+Every detected update is appended as a new version. Versions are stored as
+deltas against the most recent base snapshot, and a fresh base is written
+every `history_base_interval` versions, so any version is rebuilt by applying
+a single delta to its base. Old versions are dropped by count
+(`history_max_entries`) and age (`history_max_age`); when a base is dropped,
+the first remaining version of its group becomes the new base.
+
+Delta format (nested, JSON/msgpack friendly):
+    ["s"]                         unchanged
+    ["=", value]                  replaced by value
+    ["d", {key: delta}, [keys]]   dict with changed keys and removed keys
+    ["l", [["c", i, j] | ["i", [items]]]]  list built from base slices and inserted items
+"""
+
+import copy
+from difflib import SequenceMatcher
+import json
+import time
+from typing import Any
+
+from nonebot import logger
+
+from .cache import decode_data, encode_data, get_cache_suffix, write_atomic
+from .config import plugin_config
+
+_SAME = ["s"]
+
+
+def _fingerprint(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def make_delta(old: Any, new: Any) -> list:
+    """Compute a delta that turns `old` into `new`"""
+    if type(old) is type(new) and old == new:
+        return _SAME
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = {}
+        for key, value in new.items():
+            if key not in old:
+                changes[key] = ["=", value]
+                continue
+            sub = make_delta(old[key], value)
+            if sub is not _SAME:
+                changes[key] = sub
+        removed = [key for key in old if key not in new]
+        return ["d", changes, removed]
+
+    if isinstance(old, list) and isinstance(new, list):
+        matcher = SequenceMatcher(
+            None,
+            [_fingerprint(item) for item in old],
+            [_fingerprint(item) for item in new],
+            autojunk=False,
+        )
+        ops: list[list] = []
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                ops.append(["c", i1, i2])
+            elif tag in ("replace", "insert"):
+                ops.append(["i", new[j1:j2]])
+        return ["l", ops]
+
+    return ["=", new]
+
+
+def apply_delta(base: Any, delta: list) -> Any:
+    """Apply a delta produced by `make_delta` to `base`"""
+    tag = delta[0]
+    if tag == "s":
+        return base
+    if tag == "=":
+        return delta[1]
+    if tag == "d":
+        result = dict(base)
+        for key in delta[2]:
+            result.pop(key, None)
+        for key, sub in delta[1].items():
+            result[key] = apply_delta(base.get(key), sub)
+        return result
+    if tag == "l":
+        result = []
+        for op in delta[1]:
+            if op[0] == "c":
+                result.extend(base[op[1] : op[2]])
+            else:
+                result.extend(op[1])
+        return result
+    raise ValueError(f"Unknown delta tag: {tag}")
+
+
+class SnapshotHistory:
+    """Delta-encoded history of one site's snapshots"""
+
+    def __init__(
+        self,
+        site_name: str,
+        max_entries: int | None = None,
+        max_age: float | None = None,
+        base_interval: int | None = None,
+    ):
+        self.site_name = site_name
+        self.max_entries = plugin_config.history_max_entries if max_entries is None else max_entries
+        self.max_age = plugin_config.history_max_age if max_age is None else max_age
+        self.base_interval = max(1, plugin_config.history_base_interval if base_interval is None else base_interval)
+        self.data_file = plugin_config.cache_dir / f"{site_name}_history{get_cache_suffix()}"
+        # [{"version": int, "timestamp": float, "base": snapshot} | {..., "delta": delta}]
+        self.entries: list[dict[str, Any]] = []
+        self._loaded = False
+
+    def load(self):
+        """Load history from disk (once)"""
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            if self.data_file.exists():
+                self.entries = decode_data(self.data_file.read_bytes()).get("entries", [])
+        except Exception as e:
+            logger.warning(f"加载站点 {self.site_name} 的历史快照失败: {e}")
+            self.entries = []
+
+    def save(self):
+        """Write history to disk"""
+        try:
+            write_atomic(self.data_file, encode_data({"entries": self.entries}))
+        except Exception as e:
+            logger.error(f"保存站点 {self.site_name} 的历史快照失败: {e}")
+
+    def _base_index(self, index: int) -> int:
+        while "base" not in self.entries[index]:
+            index -= 1
+        return index
+
+    def _snapshot_at(self, index: int) -> Any:
+        entry = self.entries[index]
+        if "base" in entry:
+            return entry["base"]
+        return apply_delta(self.entries[self._base_index(index)]["base"], entry["delta"])
+
+    def append(self, snapshot: Any, timestamp: float | None = None) -> int:
+        """
+        Append a snapshot as the next version
+        Args:
+            snapshot: Snapshot data
+            timestamp: Snapshot time, defaults to now
+        Returns:
+            The new version number
+        """
+        self.load()
+        timestamp = time.time() if timestamp is None else timestamp
+        version = self.entries[-1]["version"] + 1 if self.entries else 1
+        entry: dict[str, Any] = {"version": version, "timestamp": timestamp}
+
+        if not self.entries or len(self.entries) - self._base_index(len(self.entries) - 1) >= self.base_interval:
+            entry["base"] = copy.deepcopy(snapshot)
+        else:
+            base = self.entries[self._base_index(len(self.entries) - 1)]["base"]
+            entry["delta"] = copy.deepcopy(make_delta(base, snapshot))
+        self.entries.append(entry)
+
+        self.prune(now=timestamp)
+        self.save()
+        return version
+
+    def prune(self, now: float | None = None):
+        """Drop versions beyond the count and age limits, rebasing the oldest kept group"""
+        now = time.time() if now is None else now
+        drop = 0
+        if self.max_entries > 0:
+            drop = max(drop, len(self.entries) - self.max_entries)
+        if self.max_age > 0:
+            # Always keep the newest version
+            while drop < len(self.entries) - 1 and self.entries[drop]["timestamp"] < now - self.max_age:
+                drop += 1
+        if drop <= 0:
+            return
+
+        first = self.entries[drop]
+        if "delta" in first:
+            base = self.entries[self._base_index(drop)]["base"]
+            new_base = apply_delta(base, first.pop("delta"))
+            first["base"] = new_base
+            for entry in self.entries[drop + 1 :]:
+                if "base" in entry:
+                    break
+                entry["delta"] = make_delta(new_base, apply_delta(base, entry["delta"]))
+        del self.entries[:drop]
+
+    def versions(self) -> list[tuple[int, float]]:
+        """List stored (version, timestamp) pairs, oldest first"""
+        self.load()
+        return [(entry["version"], entry["timestamp"]) for entry in self.entries]
+
+    def get(self, version: int) -> Any:
+        """
+        Reconstruct a stored version
+        Raises:
+            KeyError: If the version is not (or no longer) stored
+        """
+        self.load()
+        if not self.entries:
+            raise KeyError(version)
+        index = version - self.entries[0]["version"]
+        if index < 0 or index >= len(self.entries):
+            raise KeyError(version)
+        return copy.deepcopy(self._snapshot_at(index))
+
+    def latest(self) -> Any:
+        """Get the newest stored snapshot, or None if empty"""
+        self.load()
+        return copy.deepcopy(self._snapshot_at(len(self.entries) - 1)) if self.entries else None
+
+    def since(self, timestamp: float) -> list[tuple[int, float, Any]]:
+        """Get all (version, timestamp, snapshot) recorded after `timestamp`"""
+        self.load()
+        return [
+            (entry["version"], entry["timestamp"], copy.deepcopy(self._snapshot_at(index)))
+            for index, entry in enumerate(self.entries)
+            if entry["timestamp"] > timestamp
+        ]
+
+
+_histories: dict[str, SnapshotHistory] = {}
+
+
+def get_history(site_name: str) -> SnapshotHistory:
+    """Get the history store for a site"""
+    if site_name not in _histories:
+        _histories[site_name] = SnapshotHistory(site_name)
+    return _histories[site_name]
+
+
+def record_snapshot(site_name: str, snapshot: Any) -> int | None:
+    """
+    Record a snapshot in the site's history if history is enabled
+    Returns:
+        The new version number, or None if history is disabled or recording failed
+    """
+    if plugin_config.history_max_entries <= 0:
+        return None
+    try:
+        return get_history(site_name).append(snapshot)
+    except Exception as e:
+        logger.error(f"记录站点 {site_name} 的历史快照失败: {e}")
+        return None
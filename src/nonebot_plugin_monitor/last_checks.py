@@ -0,0 +1,80 @@
+"""Persisted time of each site's last successful check
+
+APScheduler jobs live in memory only, so runs that fell into a downtime window
+are lost. Recording when each site was last checked successfully lets the
+scheduler find overdue sites on startup and catch them up. Timestamps are
+written in batches a few seconds after a check rather than once per check.
+"""
+
+import asyncio
+import json
+from pathlib import Path
+import time
+
+from nonebot import logger
+
+from .cache import write_atomic
+from .config import plugin_config
+
+# Seconds to wait after a check before writing, batching the checks that finish together
+FLUSH_DELAY = 5.0
+
+
+class LastCheckStore:
+    """Last successful check timestamps, loaded on first use"""
+
+    def __init__(self):
+        self.timestamps: dict[str, float] | None = None  # {site_name: unix timestamp}
+        self._dirty = False
+        self._flush_handle: asyncio.TimerHandle | None = None
+
+    def get_file(self) -> Path:
+        """Get the timestamp file path"""
+        return plugin_config.cache_dir / "last_checks.json"
+
+    def _load(self) -> dict[str, float]:
+        if self.timestamps is None:
+            self.timestamps = {}
+            try:
+                last_checks_file = self.get_file()
+                if last_checks_file.exists():
+                    self.timestamps = json.loads(last_checks_file.read_text(encoding="utf-8"))
+            except Exception as e:
+                logger.warning(f"加载站点上次检查时间失败: {e}")
+        return self.timestamps
+
+    def get(self, site_name: str) -> float | None:
+        """Get when a site was last checked successfully"""
+        return self._load().get(site_name)
+
+    def record(self, site_name: str, timestamp: float | None = None):
+        """Record a successful check and schedule a write"""
+        self._load()[site_name] = time.time() if timestamp is None else timestamp
+        self._dirty = True
+        if self._flush_handle is None:
+            try:
+                # Resolve the file now, the cache directory may have changed by the time the write runs
+                self._flush_handle = asyncio.get_running_loop().call_later(FLUSH_DELAY, self.flush, self.get_file())
+            except RuntimeError:
+                self.flush()
+
+    def flush(self, last_checks_file: Path | None = None) -> bool:
+        """
+        Write pending timestamps
+        Args:
+            last_checks_file: Where to write, the current timestamp file by default
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._dirty or self.timestamps is None:
+            return True
+        try:
+            write_atomic(
+                last_checks_file or self.get_file(), json.dumps(self.timestamps, ensure_ascii=False).encode("utf-8")
+            )
+            self._dirty = False
+            return True
+        except Exception as e:
+            logger.error(f"保存站点上次检查时间失败: {e}")
+            return False
@@ -0,0 +1,102 @@
+"""Cached rendering of the 订阅列表 reply
+
+The catalog part (one `display name - description` line per site) only changes
+when sites are registered, reloaded or removed, so it is rendered once per
+`Scheduler.catalog_version`. Each user's or group's reply is cached together
+with the catalog version and the target's `SubscriptionManager.view_version`,
+and is rebuilt only when one of them changes; a repeated list command is a
+dictionary lookup.
+"""
+
+from collections import OrderedDict
+
+from .manager import subscription_manager
+from .scheduler import scheduler_instance
+
+ALL_SITES_LINE = "全部 - 接收所有站点的通知"
+
+# Cached replies kept at most, least recently used dropped first
+MAX_CACHED_VIEWS = 4096
+
+
+class SubscriptionListRenderer:
+    """Render and cache subscription list replies"""
+
+    def __init__(self):
+        self.catalog_version = -1
+        self.site_lines: dict[str, str] = {}  # {site_name: "display name - description"}
+        self.views: OrderedDict[tuple[bool, str], tuple[tuple[int, int, int], str]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def refresh_catalog(self) -> dict[str, str]:
+        """Render the catalog lines again if the set of sites changed"""
+        if self.catalog_version != scheduler_instance.catalog_version:
+            self.site_lines = {
+                site_name: f"{site_config.display_name()} - {site_config.description()}"
+                for site_name, site_config in scheduler_instance.site_configs.items()
+                if site_name != "all"
+            }
+            self.catalog_version = scheduler_instance.catalog_version
+            self.views.clear()
+        return self.site_lines
+
+    def _site_line(self, site_name: str) -> str:
+        if site_name == "全部":
+            return ALL_SITES_LINE
+        return self.site_lines.get(site_name, f"{site_name} - (描述不可用)")
+
+    def _build(self, target_id: str, is_group: bool) -> str:
+        if not scheduler_instance.site_configs:
+            return "暂无可用的订阅源"
+
+        subscribed = subscription_manager.get_subscriptions(target_id, is_group)
+        subscribed_set = set(subscribed)
+        lines = ["订阅列表:"]
+
+        # 显示已订阅的站点
+        if subscribed:
+            lines.append("已订阅:")
+            lines.extend(f"✓ {self._site_line(site_name)}" for site_name in subscribed)
+            lines.append("")
+
+        # 显示未订阅的站点
+        unsubscribed = [site_name for site_name in self.site_lines if site_name not in subscribed_set]
+        # Add "全部" to unsubscribed list if not subscribed
+        if "全部" not in subscribed_set:
+            unsubscribed.append("全部")
+        if unsubscribed:
+            lines.append("未订阅:")
+            lines.extend(f"○ {self._site_line(site_name)}" for site_name in unsubscribed)
+
+        return "\n".join(lines) + "\n"
+
+    def render(self, target_id: str, is_group: bool = False) -> str:
+        """
+        Subscription list reply for a user or group
+        Args:
+            target_id: User or group ID
+            is_group: Whether the ID is a group ID (True) or user ID (False)
+        Returns:
+            The reply text, from cache unless the sites or the target's subscriptions changed
+        """
+        self.refresh_catalog()
+        key = (is_group, target_id)
+        version = (self.catalog_version, *subscription_manager.view_version(target_id, is_group))
+        cached = self.views.get(key)
+        if cached is not None and cached[0] == version:
+            self.hits += 1
+            self.views.move_to_end(key)
+            return cached[1]
+
+        self.misses += 1
+        text = self._build(target_id, is_group)
+        self.views[key] = (version, text)
+        self.views.move_to_end(key)
+        if len(self.views) > MAX_CACHED_VIEWS:
+            self.views.popitem(last=False)
+        return text
+
+
+# Create global subscription list renderer instance
+subscription_list = SubscriptionListRenderer()
@@ -1,8 +1,12 @@
 import json
+from pathlib import Path
 
 from nonebot import logger
 
 from .config import plugin_config
+from .filters import FilterMatcher, parse_filter
+from .shards import SubscriptionShards
+from .subscribers import Member, SubscriberSet
 
 
 class SubscriptionManager:
@@ -11,20 +15,59 @@ class SubscriptionManager:
     def __init__(self):
         """Initialize subscription manager"""
         self.data_file = plugin_config.subscriptions_data_file
-        # New structure: {site_name: {"users": [user_ids], "groups": [group_ids]}}
-        self.subscriptions: dict[str, dict[str, list[str]]] = {}
+        # New structure: {site_name: {"users": SubscriberSet, "groups": SubscriberSet}}
+        # Stored on disk as {site_name: {"users": [user_ids], "groups": [group_ids]}}
+        # With sharded storage this is a SubscriptionShards mapping loading each site on first access
+        self.subscriptions: dict[str, dict[str, SubscriberSet]] | SubscriptionShards = {}
+        # Change counters for cached per-target views: bumped per target on every change,
+        # and globally whenever subscriptions are replaced wholesale
+        self.generation = 0
+        self.target_versions: dict[tuple[str, str], int] = {}
+        # Keyword filters: {site_name: {"users": {user_id: [filters]}, "groups": {group_id: [filters]}}}
+        self.filters_file = plugin_config.subscription_filters_file
+        self.filters: dict[str, dict[str, dict[str, list[str]]]] = {}
+        self._matchers: dict[str, FilterMatcher] = {}  # {site_name: compiled filters of the site and 全部}
 
-    async def initialize(self):
-        """Initialize subscription manager"""
-        self.load_subscriptions()
+    async def initialize(self, subscriptions: dict[str, dict[str, list[str]]] | None = None):
+        """
+        Initialize subscription manager
+        Args:
+            subscriptions: Subscriptions restored from a state snapshot; loaded from file if None
+        """
+        if subscriptions is None:
+            self.load_subscriptions()
+        else:
+            self.subscriptions = self._from_dict(subscriptions)
+            self.generation += 1
+            logger.info(f"已从状态快照恢复 {len(self.subscriptions)} 个站点的订阅")
+        self.load_filters()
         logger.info("订阅管理器初始化完成")
 
+    @staticmethod
+    def _from_dict(data: dict[str, dict[str, list[str]]]) -> dict[str, dict[str, SubscriberSet]]:
+        """Build compact subscriber sets from the stored lists"""
+        return {
+            site_name: {target: SubscriberSet(site_data.get(target, [])) for target in ("users", "groups")}
+            for site_name, site_data in data.items()
+        }
+
+    def export_subscriptions(self) -> dict[str, dict[str, list[str]]]:
+        """All subscriptions as plain lists of string ids, the stored format"""
+        return {
+            site_name: {target: members.to_list() for target, members in site_data.items()}
+            for site_name, site_data in self.subscriptions.items()
+        }
+
     def load_subscriptions(self):
         """Load subscriptions from file"""
+        self.generation += 1
+        if plugin_config.subscription_storage == "sharded":
+            self.load_shards()
+            return
         try:
             if self.data_file.exists():
                 with open(self.data_file, encoding="utf-8") as f:
-                    self.subscriptions = json.load(f)
+                    self.subscriptions = self._from_dict(json.load(f))
                 # Count total subscriptions for logging
                 total_subs = sum(
                     len(site_data.get("users", [])) + len(site_data.get("groups", []))
@@ -39,18 +82,98 @@ class SubscriptionManager:
             logger.error(f"加载订阅数据失败: {e}")
             self.subscriptions = {}
 
+    def load_shards(self):
+        """Open per-site subscription shards, migrating the single subscription file on first use"""
+        shard_dir = plugin_config.subscriptions_shard_dir
+        try:
+            if not shard_dir.exists() and self.data_file.exists():
+                with open(self.data_file, encoding="utf-8") as f:
+                    self.subscriptions = SubscriptionShards.create(shard_dir, self._from_dict(json.load(f)))
+                logger.info(f"已将 {self.data_file.name} 拆分为 {len(self.subscriptions)} 个站点订阅分片")
+            else:
+                self.subscriptions = SubscriptionShards(shard_dir)
+                logger.info(f"发现 {len(self.subscriptions)} 个站点的订阅分片，将在首次访问时加载")
+        except Exception as e:
+            logger.error(f"加载订阅分片失败: {e}")
+            self.subscriptions = SubscriptionShards(shard_dir)
+
+    def _record_change(self, site_name: str, target_list: str, user_id: str, subscribed: bool):
+        """Tell sharded storage which shard and index entry changed"""
+        if isinstance(self.subscriptions, SubscriptionShards):
+            self.subscriptions.record_change(site_name, target_list, user_id, subscribed)
+
     def save_subscriptions(self):
         """Save subscriptions to file"""
+        if isinstance(self.subscriptions, SubscriptionShards):
+            try:
+                self.subscriptions.flush()
+            except Exception as e:
+                logger.error(f"保存订阅分片失败: {e}")
+            return
         try:
             # Ensure directory exists
             self.data_file.parent.mkdir(parents=True, exist_ok=True)
 
             with open(self.data_file, "w", encoding="utf-8") as f:
-                json.dump(self.subscriptions, f, ensure_ascii=False, indent=2)
+                json.dump(self.export_subscriptions(), f, ensure_ascii=False, indent=2)
             logger.debug("订阅数据已保存")
         except Exception as e:
             logger.error(f"保存订阅数据失败: {e}")
 
+    def _apply(self, user_id: str, site_name: str, is_group: bool, subscribed: bool) -> bool:
+        """
+        Add or remove one subscription in memory without saving
+        Returns:
+            True if the subscription changed
+        """
+        target_list = "groups" if is_group else "users"
+        if subscribed:
+            # Initialize site in subscriptions if it doesn't exist
+            if site_name not in self.subscriptions:
+                self.subscriptions[site_name] = {"users": SubscriberSet(), "groups": SubscriberSet()}
+            if not self.subscriptions[site_name][target_list].add(user_id):
+                return False
+        else:
+            if site_name not in self.subscriptions or not self.subscriptions[site_name][target_list].discard(user_id):
+                return False
+            # Clean up empty site entries (but don't clean up "all" site)
+            if (
+                site_name != "all"
+                and not self.subscriptions[site_name]["users"]
+                and not self.subscriptions[site_name]["groups"]
+            ):
+                del self.subscriptions[site_name]
+        self._record_change(site_name, target_list, user_id, subscribed)
+        key = (target_list, str(user_id))
+        self.target_versions[key] = self.target_versions.get(key, 0) + 1
+        return True
+
+    def _apply_many(self, changes: list[tuple[str, str, bool]], subscribed: bool) -> list[tuple[str, str, bool]]:
+        """
+        Apply several changes as one transaction with a single save
+        Args:
+            changes: (user_id, site_name, is_group) for each subscription
+            subscribed: True to subscribe, False to unsubscribe
+        Returns:
+            The changes that took effect; none if any change failed
+        """
+        applied = []
+        try:
+            for user_id, site_name, is_group in changes:
+                site_name = "all" if site_name == "全部" else site_name
+                if self._apply(user_id, site_name, is_group, subscribed):
+                    applied.append((user_id, site_name, is_group))
+        except Exception as e:
+            logger.error(f"批量{'订阅' if subscribed else '取消订阅'}失败，已回滚: {e}")
+            for user_id, site_name, is_group in reversed(applied):
+                self._apply(user_id, site_name, is_group, not subscribed)
+            return []
+        if applied:
+            self.save_subscriptions()
+            if not subscribed:
+                self._drop_filters(applied)
+        return applied
+
     def subscribe(self, user_id: str, site_name: str, is_group: bool = False) -> bool:
         """
         Subscribe user/group to a site
@@ -66,25 +189,15 @@ class SubscriptionManager:
             if site_name == "全部":
                 site_name = "all"
 
-            # Initialize site in subscriptions if it doesn't exist
-            if site_name not in self.subscriptions:
-                self.subscriptions[site_name] = {"users": [], "groups": []}
-
-            # Determine target list based on whether it's a group or user
-            target_list = "groups" if is_group else "users"
+            target_type = "群组" if is_group else "用户"
+            site_display_name = "全部" if site_name == "all" else site_name
 
-            # Check if already subscribed
-            if user_id in self.subscriptions[site_name][target_list]:
-                target_type = "群组" if is_group else "用户"
-                site_display_name = "全部" if site_name == "all" else site_name
+            # Add subscription unless already subscribed
+            if not self._apply(user_id, site_name, is_group, True):
                 logger.info(f"{target_type} {user_id} 已经订阅了 {site_display_name}")
                 return False
 
-            # Add subscription
-            self.subscriptions[site_name][target_list].append(user_id)
             self.save_subscriptions()
-            target_type = "群组" if is_group else "用户"
-            site_display_name = "全部" if site_name == "all" else site_name
             logger.info(f"{target_type} {user_id} 订阅了 {site_display_name}")
             return True
         except Exception as e:
@@ -106,34 +219,245 @@ class SubscriptionManager:
             if site_name == "全部":
                 site_name = "all"
 
-            # Check if site exists and user/group is subscribed
-            if site_name in self.subscriptions:
-                target_list = "groups" if is_group else "users"
-                if user_id in self.subscriptions[site_name][target_list]:
-                    self.subscriptions[site_name][target_list].remove(user_id)
-
-                    # Clean up empty site entries (but don't clean up "all" site)
-                    if (
-                        site_name != "all"
-                        and not self.subscriptions[site_name]["users"]
-                        and not self.subscriptions[site_name]["groups"]
-                    ):
-                        del self.subscriptions[site_name]
-
-                    self.save_subscriptions()
-                    target_type = "群组" if is_group else "用户"
-                    site_display_name = "全部" if site_name == "all" else site_name
-                    logger.info(f"{target_type} {user_id} 取消订阅了 {site_display_name}")
-                    return True
-
             target_type = "群组" if is_group else "用户"
             site_display_name = "全部" if site_name == "all" else site_name
+
+            if self._apply(user_id, site_name, is_group, False):
+                self.save_subscriptions()
+                self._drop_filters([(user_id, site_name, is_group)])
+                logger.info(f"{target_type} {user_id} 取消订阅了 {site_display_name}")
+                return True
+
             logger.info(f"{target_type} {user_id} 未订阅 {site_display_name}")
             return False
         except Exception as e:
             logger.error(f"取消订阅失败: {e}")
             return False
 
+    def subscribe_many(self, user_id: str, site_names: list[str], is_group: bool = False) -> list[str]:
+        """
+        Subscribe user/group to several sites with a single save
+        Args:
+            user_id: User or group ID
+            site_names: Site names to subscribe to
+            is_group: Whether the ID is a group ID (True) or user ID (False)
+        Returns:
+            Site names newly subscribed ("all" for 全部); already subscribed sites are skipped
+        """
+        applied = self._apply_many([(user_id, site_name, is_group) for site_name in site_names], True)
+        if applied:
+            target_type = "群组" if is_group else "用户"
+            logger.info(f"{target_type} {user_id} 订阅了 {len(applied)} 个站点")
+        return [site_name for _, site_name, _ in applied]
+
+    def unsubscribe_many(self, user_id: str, site_names: list[str], is_group: bool = False) -> list[str]:
+        """
+        Unsubscribe user/group from several sites with a single save
+        Args:
+            user_id: User or group ID
+            site_names: Site names to unsubscribe from
+            is_group: Whether the ID is a group ID (True) or user ID (False)
+        Returns:
+            Site names actually unsubscribed ("all" for 全部)
+        """
+        applied = self._apply_many([(user_id, site_name, is_group) for site_name in site_names], False)
+        if applied:
+            target_type = "群组" if is_group else "用户"
+            logger.info(f"{target_type} {user_id} 取消订阅了 {len(applied)} 个站点")
+        return [site_name for _, site_name, _ in applied]
+
+    def import_subscriptions(self, data: dict[str, dict[str, list[str]]]) -> int:
+        """
+        Merge exported subscriptions (the stored format) with a single save
+        Args:
+            data: {site_name: {"users": [user_ids], "groups": [group_ids]}}
+        Returns:
+            Number of subscriptions added
+        """
+        changes = [
+            (str(member), site_name, target == "groups")
+            for site_name, site_data in data.items()
+            for target in ("users", "groups")
+            for member in site_data.get(target, [])
+        ]
+        applied = self._apply_many(changes, True)
+        logger.info(f"已导入 {len(applied)} 个订阅 (共 {len(changes)} 条)")
+        return len(applied)
+
+    def import_subscriptions_file(self, file_path: Path) -> int | None:
+        """
+        Merge subscriptions from an exported JSON file
+        Returns:
+            Number of subscriptions added, or None if the file could not be read
+        """
+        try:
+            with open(file_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error(f"读取订阅导入文件失败: {e}")
+            return None
+        return self.import_subscriptions(data)
+
+    def export_subscriptions_file(self, file_path: Path) -> bool:
+        """Write all subscriptions to a JSON file in the stored format"""
+        try:
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(file_path, "w", encoding="utf-8") as f:
+                json.dump(self.export_subscriptions(), f, ensure_ascii=False, indent=2)
+            logger.info(f"订阅已导出到 {file_path}")
+            return True
+        except Exception as e:
+            logger.error(f"导出订阅失败: {e}")
+            return False
+
+    def load_filters(self):
+        """Load keyword filters from file"""
+        self._matchers.clear()
+        try:
+            if self.filters_file.exists():
+                with open(self.filters_file, encoding="utf-8") as f:
+                    self.filters = json.load(f)
+                logger.info(f"已加载 {len(self.filters)} 个站点的订阅过滤规则")
+            else:
+                self.filters = {}
+        except Exception as e:
+            logger.error(f"加载订阅过滤规则失败: {e}")
+            self.filters = {}
+
+    def save_filters(self):
+        """Save keyword filters to file"""
+        try:
+            self.filters_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.filters_file, "w", encoding="utf-8") as f:
+                json.dump(self.filters, f, ensure_ascii=False, indent=2)
+            logger.debug("订阅过滤规则已保存")
+        except Exception as e:
+            logger.error(f"保存订阅过滤规则失败: {e}")
+
+    def _invalidate_matchers(self, site_name: str):
+        """Drop compiled filters affected by a change to a site's filters"""
+        if site_name == "all":
+            self._matchers.clear()
+        else:
+            self._matchers.pop(site_name, None)
+
+    def _drop_filters(self, changes: list[tuple[str, str, bool]]):
+        """Remove the filters of subscriptions that were cancelled"""
+        dropped = False
+        for user_id, site_name, is_group in changes:
+            site_filters = self.filters.get(site_name, {})
+            if site_filters.get("groups" if is_group else "users", {}).pop(str(user_id), None) is not None:
+                self._invalidate_matchers(site_name)
+                dropped = True
+        if dropped:
+            self.save_filters()
+
+    def get_filters(self, user_id: str, site_name: str, is_group: bool = False) -> list[str]:
+        """
+        Get the keyword filters of a subscription
+        Args:
+            user_id: User or group ID
+            site_name: Site name
+            is_group: Whether the ID is a group ID (True) or user ID (False)
+        Returns:
+            Filters of the subscription; empty if every update is delivered
+        """
+        site_name = "all" if site_name == "全部" else site_name
+        return list(self.filters.get(site_name, {}).get("groups" if is_group else "users", {}).get(str(user_id), []))
+
+    def add_filters(
+        self, user_id: str, site_name: str, patterns: list[str], is_group: bool = False
+    ) -> list[str] | None:
+        """
+        Add keyword filters to a subscription
+        Args:
+            user_id: User or group ID
+            site_name: Subscribed site name
+            patterns: Keywords, or regular expressions written as `/pattern/`
+            is_group: Whether the ID is a group ID (True) or user ID (False)
+        Returns:
+            Filters newly added, or None if the user/group is not subscribed to the site
+        Raises:
+            ValueError: If a filter is not valid
+        """
+        site_name = "all" if site_name == "全部" else site_name
+        target_list = "groups" if is_group else "users"
+        if user_id not in self.subscriptions.get(site_name, {}).get(target_list, ()):
+            return None
+
+        normalized = [parse_filter(pattern) for pattern in patterns]
+        existing = self.filters.setdefault(site_name, {}).setdefault(target_list, {}).setdefault(str(user_id), [])
+        added = [pattern for pattern in dict.fromkeys(normalized) if pattern not in existing]
+        existing.extend(added)
+        if added:
+            self._invalidate_matchers(site_name)
+            self.save_filters()
+            target_type = "群组" if is_group else "用户"
+            logger.info(f"{target_type} {user_id} 为 {site_name} 添加了 {len(added)} 个过滤规则")
+        return added
+
+    def remove_filters(
+        self, user_id: str, site_name: str, patterns: list[str] | None = None, is_group: bool = False
+    ) -> int:
+        """
+        Remove keyword filters from a subscription
+        Args:
+            user_id: User or group ID
+            site_name: Site name
+            patterns: Filters to remove; all filters of the subscription if None
+            is_group: Whether the ID is a group ID (True) or user ID (False)
+        Returns:
+            Number of filters removed
+        """
+        site_name = "all" if site_name == "全部" else site_name
+        target_filters = self.filters.get(site_name, {}).get("groups" if is_group else "users", {})
+        existing = target_filters.get(str(user_id), [])
+        if patterns is None:
+            removed = len(existing)
+            existing = []
+        else:
+            to_remove = {
+                pattern.strip() if pattern.strip().startswith("/") else pattern.strip().lower() for pattern in patterns
+            }
+            kept = [pattern for pattern in existing if pattern not in to_remove]
+            removed = len(existing) - len(kept)
+            existing = kept
+        if not removed:
+            return 0
+
+        if existing:
+            target_filters[str(user_id)] = existing
+        else:
+            target_filters.pop(str(user_id), None)
+        self._invalidate_matchers(site_name)
+        self.save_filters()
+        return removed
+
+    def filter_subscribers(self, site_name: str, subscribers: list[Member], message: str) -> list[Member]:
+        """
+        Drop subscribers whose filters do not match an update
+        Args:
+            site_name: Site name
+            subscribers: Subscribers as returned by get_subscribers
+            message: Formatted update message
+        Returns:
+            Subscribers that should be notified, in their original order
+        """
+        matcher = self._matchers.get(site_name)
+        if matcher is None:
+            # Filters set on 全部 apply to every site; both user and group filters are keyed by id
+            merged: dict[str, list[str]] = {}
+            for name in dict.fromkeys((site_name, "all")):
+                for target_filters in self.filters.get(name, {}).values():
+                    for member, patterns in target_filters.items():
+                        merged.setdefault(member, []).extend(patterns)
+            matcher = self._matchers[site_name] = FilterMatcher(merged)
+        return matcher.select(subscribers, message)
+
+    def view_version(self, user_id: str, is_group: bool = False) -> tuple[int, int]:
+        """Version of a user's/group's subscriptions; changes whenever they may have changed"""
+        return self.generation, self.target_versions.get(("groups" if is_group else "users", str(user_id)), 0)
+
     def get_subscriptions(self, user_id: str, is_group: bool = False) -> list[str]:
         """
         Get user/group subscriptions
@@ -146,45 +470,45 @@ class SubscriptionManager:
         subscriptions = []
         target_list = "groups" if is_group else "users"
 
-        for site_name, site_data in self.subscriptions.items():
-            if user_id in site_data.get(target_list, []):
-                # Convert "all" back to "全部" for display
-                if site_name == "all":
-                    subscriptions.append("全部")
-                else:
-                    subscriptions.append(site_name)
+        # Sharded storage answers from its index without loading every site
+        if isinstance(self.subscriptions, SubscriptionShards):
+            site_names = self.subscriptions.sites_of(target_list, user_id)
+        else:
+            site_names = [
+                site_name
+                for site_name, site_data in self.subscriptions.items()
+                if user_id in site_data.get(target_list, ())
+            ]
+
+        for site_name in site_names:
+            # Convert "all" back to "全部" for display
+            if site_name == "all":
+                subscriptions.append("全部")
+            else:
+                subscriptions.append(site_name)
 
         return subscriptions
 
-    def get_subscribers(self, site_name: str) -> list[str]:
+    def get_subscribers(self, site_name: str) -> list[Member]:
         """
         Get all subscribers for a site
         Args:
             site_name: Site name
         Returns:
-            List of user/group IDs subscribed to the site
+            List of user/group IDs subscribed to the site or to "全部" (all sites), without
+            duplicates; numeric IDs are returned as int
         """
-        subscribers = []
-
-        # Add subscribers for the specific site
-        if site_name in self.subscriptions:
-            site_data = self.subscriptions[site_name]
-            # Add all users
-            subscribers.extend(site_data.get("users", []))
-            # Add all groups
-            subscribers.extend(site_data.get("groups", []))
-
-        # Add subscribers who subscribed to "全部" (all sites)
-        if "all" in self.subscriptions:
-            all_data = self.subscriptions["all"]
-            # Add all users who subscribed to all
-            subscribers.extend(all_data.get("users", []))
-            # Add all groups who subscribed to all
-            subscribers.extend(all_data.get("groups", []))
+        empty = SubscriberSet()
+        site_data = self.subscriptions.get(site_name, {})
+        all_data = self.subscriptions.get("all", {}) if site_name != "all" else {}
 
-        return subscribers
+        # Users first, then groups, each merged with the subscribers of "全部"
+        return [
+            *SubscriberSet.union(site_data.get("users", empty), all_data.get("users", empty)),
+            *SubscriberSet.union(site_data.get("groups", empty), all_data.get("groups", empty)),
+        ]
 
-    def get_all_subscriptions(self) -> dict[str, dict[str, list[str]]]:
+    def get_all_subscriptions(self) -> dict[str, dict[str, SubscriberSet]]:
         """
         Get all subscriptions
         Returns:
@@ -0,0 +1,150 @@
+"""Staged processing pipeline connected by bounded queues
+
+Each stage has its own queue and worker count. A worker takes a job from its
+stage's queue, runs the stage handler and puts the job on the next stage's
+queue, waiting when that queue is full. This backpressure bounds the work in
+progress, and each stage only holds a worker for as long as its own step
+takes. Throughput is limited by the slowest stage, not by the sum of all stages.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from nonebot import logger
+
+# Stage handler: processes a job and returns True to pass it on, False when the job is finished
+StageHandler = Callable[[Any], Awaitable[bool]]
+
+
+def _worker_cancelled() -> bool:
+    """Whether the current worker task is being cancelled, as opposed to a handler raising CancelledError"""
+    cancelling = getattr(asyncio.current_task(), "cancelling", None)
+    # Python 3.10 cannot tell the two apart; treat it as the worker being stopped
+    return cancelling is None or cancelling() > 0
+
+
+class Stage:
+    """One pipeline stage with its queue and workers"""
+
+    def __init__(self, name: str, handler: StageHandler, workers: int, queue_size: int):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.queue: asyncio.Queue[tuple[Any, asyncio.Future]] = asyncio.Queue(queue_size)
+        self.busy = 0
+        self.processed = 0
+        self.failed = 0
+
+
+class Pipeline:
+    """A chain of stages processing jobs in order"""
+
+    def __init__(self, name: str, stages: list[tuple[str, StageHandler, int]], queue_size: int):
+        """
+        Args:
+            name: Pipeline name for logging
+            stages: (stage_name, handler, worker_count) in processing order
+            queue_size: Capacity of each stage's input queue
+        """
+        self.name = name
+        self.stages = [Stage(stage_name, handler, workers, queue_size) for stage_name, handler, workers in stages]
+        self._tasks: list[asyncio.Task] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def start(self):
+        """Start the stage workers on the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        self._loop = loop
+        self._tasks = []
+        for index, stage in enumerate(self.stages):
+            stage.queue = asyncio.Queue(stage.queue_size)
+            for worker in range(stage.workers):
+                task = asyncio.create_task(self._worker(index), name=f"{self.name}-{stage.name}-{worker}")
+                self._tasks.append(task)
+        logger.debug(f"流水线 {self.name} 已启动: {', '.join(f'{s.name}×{s.workers}' for s in self.stages)}")
+
+    async def stop(self):
+        """Stop all workers and cancel queued and running jobs"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for stage in self.stages:
+            while not stage.queue.empty():
+                _, future = stage.queue.get_nowait()
+                future.cancel()
+
+    async def submit(self, job: Any, stage: str | None = None) -> Any:
+        """
+        Submit a job and wait until a stage finishes it
+        Args:
+            job: Job to process
+            stage: Name of the stage to start at (e.g. to resume a job), defaults to the first
+        Returns:
+            The job after its last stage
+        Raises:
+            Exception: Whatever the failing stage handler raised
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        first = next(index for index, candidate in enumerate(self.stages) if candidate.name == stage) if stage else 0
+        await self.stages[first].queue.put((job, future))
+        return await future
+
+    async def _worker(self, index: int):
+        stage = self.stages[index]
+        next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        while True:
+            job, future = await stage.queue.get()
+            stage.busy += 1
+            try:
+                if future.done():
+                    continue
+                try:
+                    passed_on = await stage.handler(job)
+                except asyncio.CancelledError as e:
+                    if _worker_cancelled():
+                        # Pipeline stopped mid-job: release the submitter
+                        future.cancel()
+                        raise
+                    # The handler itself raised it: fail this job only and keep serving
+                    stage.failed += 1
+                    if not future.done():
+                        future.set_exception(e)
+                    continue
+                except Exception as e:
+                    stage.failed += 1
+                    if not future.done():
+                        future.set_exception(e)
+                    continue
+                stage.processed += 1
+                if passed_on and next_stage is not None:
+                    try:
+                        # Blocks while the next stage is saturated (backpressure)
+                        await next_stage.queue.put((job, future))
+                    except asyncio.CancelledError:
+                        future.cancel()
+                        raise
+                elif not future.done():
+                    future.set_result(job)
+            finally:
+                stage.busy -= 1
+                stage.queue.task_done()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Per-stage queue depth and counters"""
+        return {
+            stage.name: {
+                "queued": stage.queue.qsize(),
+                "capacity": stage.queue_size,
+                "workers": stage.workers,
+                "busy": stage.busy,
+                "processed": stage.processed,
+                "failed": stage.failed,
+            }
+            for stage in self.stages
+        }
@@ -0,0 +1,133 @@
+"""Push ingestion endpoint
+
+Sites listed in `push_sites` can be updated by their upstream instead of only
+by polling. The upstream POSTs `{"site": <site_name>, "data": <latest data>}`
+to `push_path` on the NoneBot ASGI server, where the data has the shape the
+site's fetch (and parse) would return. The request is signed with
+HMAC-SHA256 over `<timestamp>.<body>` using `push_secret`:
+
+    X-Monitor-Timestamp: <unix seconds>
+    X-Monitor-Signature: sha256=<hex digest>
+
+Requests older than `push_max_skew` seconds are rejected, and a signature is
+only accepted once within that window, so a captured request cannot be replayed.
+
+Accepted data goes straight to the compare → format → deliver stages of the
+check pipeline, and the site's polling job only runs every
+`push_poll_interval` seconds as a safety net.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+from typing import Any
+
+from nonebot import logger
+from nonebot.drivers import URL, ASGIMixin, Driver, HTTPServerSetup, Request, Response
+
+from .config import plugin_config
+from .scheduler import scheduler_instance
+
+SIGNATURE_HEADER = "X-Monitor-Signature"
+TIMESTAMP_HEADER = "X-Monitor-Timestamp"
+
+# Keep references to ingestion tasks so they are not garbage collected
+_ingest_tasks: set[asyncio.Task] = set()
+# Signatures accepted within the skew window, with the time they stop being valid anyway
+_seen_signatures: dict[str, float] = {}
+
+
+def sign_payload(secret: str, timestamp: str, body: bytes) -> str:
+    """Signature header value for a push request body"""
+    digest = hmac.new(secret.encode(), timestamp.encode() + b"." + body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+def verify_signature(secret: str, timestamp: str | None, signature: str | None, body: bytes) -> bool:
+    """Whether a push request is signed with the secret and recent enough not to be a replay"""
+    if not secret or not timestamp or not signature:
+        return False
+    try:
+        if abs(time.time() - float(timestamp)) > plugin_config.push_max_skew:
+            return False
+    except ValueError:
+        return False
+    return hmac.compare_digest(sign_payload(secret, timestamp, body), signature)
+
+
+def _is_replay(timestamp: str, signature: str) -> bool:
+    """Whether a verified signature was already accepted; otherwise remember it until it expires"""
+    now = time.time()
+    for seen, expires in list(_seen_signatures.items()):
+        if expires < now:
+            del _seen_signatures[seen]
+    if signature in _seen_signatures:
+        return True
+    _seen_signatures[signature] = float(timestamp) + plugin_config.push_max_skew
+    return False
+
+
+def _json_response(status_code: int, data: dict[str, Any]) -> Response:
+    return Response(
+        status_code,
+        headers={"Content-Type": "application/json"},
+        content=json.dumps(data, ensure_ascii=False),
+    )
+
+
+async def handle_push(request: Request) -> Response:
+    """Accept a signed push for a site and run it through the check pipeline in the background"""
+    body = request.content or b""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    if not verify_signature(
+        plugin_config.push_secret,
+        request.headers.get(TIMESTAMP_HEADER),
+        request.headers.get(SIGNATURE_HEADER),
+        body,
+    ):
+        logger.warning("拒绝签名无效或已过期的推送请求")
+        return _json_response(401, {"error": "invalid signature"})
+    if _is_replay(request.headers[TIMESTAMP_HEADER], request.headers[SIGNATURE_HEADER]):
+        logger.warning("拒绝重复的推送请求")
+        return _json_response(409, {"error": "duplicate request"})
+
+    try:
+        payload = json.loads(body)
+        site_name = payload["site"]
+        data = payload["data"]
+    except (ValueError, KeyError, TypeError):
+        return _json_response(400, {"error": 'expected {"site": ..., "data": ...}'})
+    if not isinstance(site_name, str):
+        return _json_response(400, {"error": "site must be a string"})
+
+    if site_name not in plugin_config.push_sites or site_name not in scheduler_instance.site_configs:
+        logger.warning(f"拒绝未启用推送的站点 {site_name} 的推送请求")
+        return _json_response(404, {"error": f"site {site_name} does not accept pushes"})
+
+    # Acknowledge right away; delivery to many subscribers may take longer than the caller waits
+    _ingest_tasks.add(task := asyncio.create_task(scheduler_instance.ingest_push(site_name, data)))
+    task.add_done_callback(_ingest_tasks.discard)
+    logger.info(f"收到站点 {site_name} 的推送")
+    return _json_response(202, {"accepted": True})
+
+
+def setup_push_endpoint(driver: Driver) -> bool:
+    """
+    Register the push route on the driver's ASGI server
+    Returns:
+        True if the route was registered
+    """
+    if not plugin_config.push_secret:
+        logger.error("未配置 push_secret，推送接收未启用")
+        return False
+    if not isinstance(driver, ASGIMixin):
+        logger.error(f"驱动器 {driver.type} 不支持 HTTP 服务，推送接收未启用")
+        return False
+    driver.setup_http_server(
+        HTTPServerSetup(URL(plugin_config.push_path), "POST", "nonebot_plugin_monitor_push", handle_push)
+    )
+    logger.info(f"推送接收已启用: POST {plugin_config.push_path} (站点: {', '.join(plugin_config.push_sites)})")
+    return True
@@ -0,0 +1,160 @@
+"""Site manifest for lazy site module loading
+
+When a site module is imported, its name, display name, description and
+schedule are recorded in a manifest in the cache directory together with the
+module file's size and modification time. On the next start, unchanged modules
+are registered from the manifest without being imported; the module itself is
+imported on its first check or by the background warm-up task.
+
+Display name, description and schedule are therefore read once per module
+version; modules computing them dynamically should not rely on lazy loading.
+
+Sites shipped by other distributions are discovered through the
+`nonebot_plugin_monitor.sites` entry point group. Scanning installed
+distribution metadata is slow on large environments, so the discovered entry
+points are cached together with the modification times of the `sys.path`
+directories, which change whenever a distribution is installed or removed.
+Their manifest entries are additionally keyed by the distribution version.
+"""
+
+from importlib.metadata import entry_points
+import json
+import os
+from pathlib import Path
+import sys
+from typing import Any
+
+from nonebot import logger
+
+from .cache import file_signature, write_atomic
+from .config import plugin_config
+from .sites import SiteConfig
+
+
+def get_manifest_file() -> Path:
+    """Get the site manifest file path"""
+    return plugin_config.cache_dir / "site_manifest.json"
+
+
+def load_manifest() -> dict[str, dict[str, Any]]:
+    """Load the site manifest: {site_name: entry}"""
+    manifest_file = get_manifest_file()
+    try:
+        if manifest_file.exists():
+            return json.loads(manifest_file.read_text(encoding="utf-8"))
+    except Exception as e:
+        logger.warning(f"加载站点清单失败: {e}")
+    return {}
+
+
+def save_manifest(manifest: dict[str, dict[str, Any]]):
+    """Write the site manifest"""
+    try:
+        write_atomic(get_manifest_file(), json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+    except Exception as e:
+        logger.error(f"保存站点清单失败: {e}")
+
+
+def get_discovery_file() -> Path:
+    """Get the entry point discovery cache file path"""
+    return plugin_config.cache_dir / "site_entry_points.json"
+
+
+def environment_signature() -> dict[str, int]:
+    """Modification times of the sys.path directories, changed by installing or removing distributions"""
+    signature = {}
+    for entry in sys.path:
+        try:
+            signature[entry] = os.stat(entry or ".").st_mtime_ns
+        except OSError:
+            continue
+    return signature
+
+
+def discover_entry_points(group: str) -> list[dict[str, str]]:
+    """
+    Find site entry points, reusing the cached result while the environment is unchanged
+    Args:
+        group: Entry point group
+    Returns:
+        [{"name", "value", "dist", "version"}] for each entry point
+    """
+    discovery_file = get_discovery_file()
+    environment = environment_signature()
+    try:
+        if discovery_file.exists():
+            cached = json.loads(discovery_file.read_text(encoding="utf-8"))
+            if cached.get("group") == group and cached.get("environment") == environment:
+                return cached["entry_points"]
+    except Exception as e:
+        logger.warning(f"加载入口点缓存失败: {e}")
+
+    found = [
+        {
+            "name": entry_point.name,
+            "value": entry_point.value,
+            "dist": entry_point.dist.name if entry_point.dist else "",
+            "version": entry_point.dist.version if entry_point.dist else "",
+        }
+        for entry_point in entry_points(group=group)
+    ]
+    try:
+        data = {"group": group, "environment": environment, "entry_points": found}
+        write_atomic(discovery_file, json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8"))
+    except Exception as e:
+        logger.error(f"保存入口点缓存失败: {e}")
+    return found
+
+
+def make_manifest_entry(file_path: Path, site_config: SiteConfig) -> dict[str, Any]:
+    """Build a manifest entry for an imported site"""
+    return {
+        **file_signature(file_path),
+        "display_name": site_config.display_name(),
+        "description": site_config.description(),
+        "schedule": site_config.schedule(),
+        "source": site_config.source,
+        "stream": site_config.stream is not None,
+    }
+
+
+def manifest_entry_matches(entry: dict[str, Any] | None, file_path: Path) -> bool:
+    """Whether a manifest entry still describes the module file on disk"""
+    if not entry:
+        return False
+    signature = file_signature(file_path)
+    return entry.get("size") == signature["size"] and entry.get("mtime_ns") == signature["mtime_ns"]
+
+
+def entry_point_entry_matches(entry: dict[str, Any] | None, entry_point: dict[str, str]) -> bool:
+    """Whether a manifest entry still describes the installed version of an entry point site"""
+    if not entry or entry.get("entry_point") != entry_point["value"] or entry.get("version") != entry_point["version"]:
+        return False
+    # Editable installs change code without changing the version
+    try:
+        return manifest_entry_matches(entry, Path(entry["path"]))
+    except (KeyError, OSError):
+        return False
+
+
+class LazySiteConfig:
+    """Placeholder for a site whose module has not been imported yet
+
+    Offers the metadata needed for listing and scheduling; the scheduler swaps
+    it for the real SiteConfig when the module is imported.
+    """
+
+    def __init__(self, name: str, entry: dict[str, Any]):
+        self.name = name
+        self.entry = entry
+        self.source: str | None = entry.get("source")
+        self.stream = None  # Streams are started once the module is imported
+
+    def display_name(self) -> str:
+        return self.entry["display_name"]
+
+    def description(self) -> str:
+        return self.entry["description"]
+
+    def schedule(self) -> str:
+        return self.entry["schedule"]
@@ -1,66 +1,580 @@
+import asyncio
+from collections.abc import Coroutine
+from datetime import datetime, timedelta
 import importlib
+from importlib.metadata import EntryPoint
 from pathlib import Path
+import sys
+import time
+from typing import Any
 
+from apscheduler.triggers.cron import CronTrigger
 from nonebot import get_bot, logger, require
 
+from . import sites as sites_package
 from .cache import load_cache, save_cache
+from .checkpoint import save_checkpoint, take_checkpoint
+from .config import plugin_config
+from .declarative import DEFINITION_SUFFIXES, load_definition
+from .dedup import RecentFingerprints
+from .delivery import Dispatcher
+from .execution import call_site_func, restart_process_pool
+from .history import record_snapshot
+from .last_checks import LastCheckStore
 from .manager import subscription_manager
-from .sites import SiteConfig
+from .pipeline import Pipeline
+from .registry import (
+    LazySiteConfig,
+    discover_entry_points,
+    entry_point_entry_matches,
+    load_manifest,
+    make_manifest_entry,
+    manifest_entry_matches,
+    save_manifest,
+)
+from .sites import NOTHING_FETCHED, SiteConfig
+from .sources import sources
+from .streaming import run_stream
+from .watcher import SiteWatcher
 
 # 导入 nonebot 的调度器
 scheduler = require("nonebot_plugin_apscheduler").scheduler
 
+# 站点检查结果
+CHECK_UPDATED = "updated"
+CHECK_UNCHANGED = "unchanged"
+CHECK_ERROR = "error"
+CHECK_UNREGISTERED = "unregistered"
+CHECK_CANCELLED = "cancelled"
+CHECK_SEEDED = "seeded"  # No cache yet: the latest data became the baseline and nothing was sent
+
+
+def next_run_after(schedule: str, previous: datetime) -> datetime | None:
+    """
+    When a site schedule fires next after a given time
+    Args:
+        schedule: Site schedule ("interval:<seconds>" or a 5-field cron expression)
+        previous: Time to start from (timezone aware)
+    Returns:
+        Next run time, or None if the schedule never fires again
+    Raises:
+        ValueError: If the schedule is invalid
+    """
+    if schedule.startswith("interval:"):
+        return previous + timedelta(seconds=int(schedule.split(":")[1]))
+
+    cron_parts = schedule.split()
+    if len(cron_parts) != 5:
+        raise ValueError(f"Invalid cron expression: {schedule}")
+    minute, hour, day, month, day_of_week = cron_parts
+    trigger = CronTrigger(
+        minute=minute, hour=hour, day=day, month=month, day_of_week=day_of_week, timezone=scheduler.timezone
+    )
+    return trigger.get_next_fire_time(None, previous + timedelta(microseconds=1))
+
+
+class SiteCheck:
+    """State of one site check as it moves through the check pipeline"""
+
+    __slots__ = (
+        "cached_data",
+        "delivered",
+        "latest_data",
+        "notification",
+        "result",
+        "seed",
+        "site_config",
+        "site_name",
+        "stage",
+        "subscribers",
+    )
+
+    def __init__(self, site_name: str, site_config: SiteConfig):
+        self.site_name = site_name
+        self.site_config = site_config
+        self.stage = "fetch"  # Stage the check is in
+        self.cached_data: Any = None
+        self.latest_data: Any = None
+        self.notification: str = ""
+        self.subscribers: list[int | str] = []
+        self.delivered: list[int | str] = []  # Subscribers already notified
+        self.result: str = CHECK_ERROR
+        self.seed = False  # Only establish a baseline when there is no cache
+
+    def to_checkpoint(self) -> dict[str, Any]:
+        """Serialize an update that has not been fully delivered"""
+        return {
+            "site_name": self.site_name,
+            "stage": self.stage,
+            "latest_data": self.latest_data,
+            "notification": self.notification,
+            "subscribers": self.subscribers,
+            "delivered": self.delivered,
+        }
+
+    @classmethod
+    def from_checkpoint(cls, entry: dict[str, Any]) -> "SiteCheck":
+        """Rebuild a checkpointed check; its site config is set when it resumes"""
+        check = cls(entry["site_name"], None)  # type: ignore[arg-type]
+        check.stage = entry["stage"]
+        check.latest_data = entry["latest_data"]
+        check.notification = entry["notification"]
+        check.subscribers = entry["subscribers"]
+        check.delivered = entry["delivered"]
+        return check
+
+
+# Marks a check that fetches its data, as opposed to one processing pushed data
+NOT_PUSHED = object()
+
 
 class Scheduler:
     def __init__(self):
         """初始化 Scheduler 类
         - 管理网站订阅检查任务
         """
-        self.site_configs: dict[str, SiteConfig] = {}  # {site_name: site_config}
+        self.site_configs: dict[str, SiteConfig | LazySiteConfig] = {}  # {site_name: site_config}
         self.display_name_to_site_name: dict[str, str] = {}  # {display_name: site_name}
+        self.running_checks: dict[str, asyncio.Task] = {}  # {site_name: in-flight check task}
+        self.active_checks: dict[str, SiteCheck] = {}  # {site_name: check being processed by the pipeline}
+        self.pending_resumes: dict[str, SiteCheck] = {}  # {site_name: check checkpointed at the last shutdown}
+        self.accepting_checks = True  # False once shutdown has started
+        self.last_checks = LastCheckStore()  # Last successful check of each site, persisted for catch-up
+        self.caught_up = False  # Whether missed checks were caught up after this start
+        self.sites_dir = Path(__file__).parent / "sites"
+        self.manifest: dict[str, dict[str, Any]] = {}  # Site manifest for lazy loading
+        self.site_files: dict[Path, str] = {}  # {site file: site_name}
+        self.entry_points: dict[str, dict[str, str]] = {}  # {site_name: entry point of an external site}
+        self._import_locks: dict[str, asyncio.Lock] = {}
+        self.resume_times: dict[str, float] = {}  # {site_name: next run timestamp restored from a state snapshot}
+        self.catalog_version = 0  # Incremented whenever the set of sites or their names change
+        self.stream_tasks: dict[str, asyncio.Task] = {}  # {site_name: task holding the site's stream connection}
+        self.streaming = False  # Whether streams are started (once a bot is connected)
+        # Fingerprints of recent notifications for cross-site near-duplicate suppression
+        self.recent_fingerprints = (
+            RecentFingerprints(
+                plugin_config.dedup_window, plugin_config.dedup_max_entries, plugin_config.dedup_max_distance
+            )
+            if plugin_config.cross_site_dedup
+            else None
+        )
+        # Delivery preferences and notifications held until a subscriber may receive them
+        self.dispatcher = Dispatcher(scheduler.timezone, plugin_config.delivery_dispatch_interval)
+        # fetch → diff → render → deliver, each stage with its own workers and bounded queue
+        self.pipeline = Pipeline(
+            "site_check",
+            [
+                ("fetch", self._stage_fetch, plugin_config.pipeline_fetch_workers),
+                ("diff", self._stage_diff, plugin_config.pipeline_diff_workers),
+                ("render", self._stage_render, plugin_config.pipeline_render_workers),
+                ("deliver", self._stage_deliver, plugin_config.pipeline_deliver_workers),
+            ],
+            queue_size=plugin_config.pipeline_queue_size,
+        )
+
+    def get_site_dirs(self) -> list[Path]:
+        """Built-in sites directory followed by the configured extra directories"""
+        site_dirs = [self.sites_dir]
+        for extra_dir in plugin_config.extra_site_dirs:
+            extra_dir = extra_dir.expanduser().resolve()
+            if not extra_dir.is_dir():
+                logger.warning(f"额外站点目录不存在: {extra_dir}")
+                continue
+            if extra_dir not in site_dirs:
+                site_dirs.append(extra_dir)
+        return site_dirs
 
     def load_site_modules(self):
-        """Load all site subscription modules using functional approach"""
-        sites_dir = Path(__file__).parent / "sites"
+        """Load all site subscription modules using functional approach
+
+        Site modules and definitions are read from the built-in sites directory, then
+        from `extra_site_dirs`, then from entry points of installed distributions; the
+        first site with a given name wins. Extra directories are appended to the
+        `sites` package path, so their modules are imported exactly like built-in ones.
+
+        With `lazy_site_loading`, modules unchanged since they were last imported are
+        registered from the site manifest and imported later (see `warm_up_sites`).
+        """
         loaded_sites = []
+        start = time.perf_counter()
+        manifest = load_manifest() if plugin_config.lazy_site_loading else {}
+        self.manifest = manifest
+        lazy_count = 0
 
-        # Get all Python files in sites directory except template.py and __init__.py
-        for file_path in sites_dir.glob("*.py"):
-            if file_path.name in ["__init__.py", "template.py"]:
-                continue
+        site_dirs = self.get_site_dirs()
+        for site_dir in site_dirs[1:]:
+            if str(site_dir) not in sites_package.__path__:
+                sites_package.__path__.append(str(site_dir))
 
-            site_name = file_path.stem
-            try:
-                # Import the site module using relative import that works in different plugin directories
-                module = importlib.import_module(f".sites.{site_name}", package=__package__)
-                logger.debug(f"成功导入站点模块: {site_name}")
+        def register(site_name: str, site_config: SiteConfig | LazySiteConfig, origin: str) -> bool:
+            if site_name in self.site_configs:
+                logger.warning(f"站点 {origin} 与已加载的站点 {site_name} 重名，已跳过")
+                return False
+            self.register_site(site_name, site_config)
+            loaded_sites.append(site_name)
+            return True
 
-                # Look for the 'site' attribute which should be a SiteConfig
-                if hasattr(module, "site") and isinstance(module.site, SiteConfig):
-                    # Register with scheduler
-                    self.site_configs[site_name] = module.site
+        # Get all Python files in the site directories except template.py and __init__.py
+        for site_dir in site_dirs:
+            for file_path in sorted(site_dir.glob("*.py")):
+                if file_path.name in ["__init__.py", "template.py"]:
+                    continue
 
-                    # Map display name to site name
-                    display_name = module.site.display_name()
-                    self.display_name_to_site_name[display_name] = site_name
+                site_name = file_path.stem
+                if site_name in self.site_configs:
+                    logger.warning(f"站点模块 {file_path} 与已加载的站点 {site_name} 重名，已跳过")
+                    continue
+                if plugin_config.lazy_site_loading and manifest_entry_matches(manifest.get(site_name), file_path):
+                    register(site_name, LazySiteConfig(site_name, manifest[site_name]), str(file_path))
+                    self.site_files[file_path] = site_name
+                    lazy_count += 1
+                    continue
 
-                    # Start scheduling for this site
-                    self.start_site_scheduling(site_name)
+                site_config = self._import_site(site_name)
+                if site_config is not None and register(site_name, site_config, str(file_path)):
+                    self.site_files[file_path] = site_name
 
-                    loaded_sites.append(site_name)
-                    logger.info(f"成功加载站点模块: {site_name} (显示名称: {display_name})")
-                else:
-                    logger.warning(f"站点模块 {site_name} 中未找到有效的 SiteConfig")
+        # Declarative site definitions (TOML/YAML), compiled once at load
+        for site_dir in site_dirs:
+            for file_path in sorted(site_dir.iterdir()):
+                if file_path.suffix not in DEFINITION_SUFFIXES or file_path.stem == "template":
+                    continue
+                try:
+                    site_config = load_definition(file_path)
+                    if register(site_config.name, site_config, str(file_path)):
+                        self.site_files[file_path] = site_config.name
+                except Exception as e:
+                    logger.error(f"加载站点定义 {file_path.name} 失败: {e}")
 
-            except Exception as e:
-                logger.error(f"加载站点模块 {site_name} 失败: {e}")
+        # Sites provided by installed distributions
+        self.entry_points = {}
+        for entry_point in discover_entry_points(plugin_config.site_entry_point_group):
+            site_name = entry_point["name"]
+            origin = f"{entry_point['value']} ({entry_point['dist']} {entry_point['version']})"
+            if site_name in self.site_configs:
+                logger.warning(f"外部站点 {origin} 与已加载的站点 {site_name} 重名，已跳过")
+                continue
+            self.entry_points[site_name] = entry_point
+            if plugin_config.lazy_site_loading and entry_point_entry_matches(manifest.get(site_name), entry_point):
+                register(site_name, LazySiteConfig(site_name, manifest[site_name]), origin)
+                lazy_count += 1
+                continue
+
+            site_config = self._import_site(site_name)
+            if site_config is not None:
+                register(site_name, site_config, origin)
 
         # Add "全部" to display name mapping
         self.display_name_to_site_name["全部"] = "all"
 
+        if plugin_config.lazy_site_loading:
+            save_manifest(self.manifest)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
         logger.info(f"已加载 {len(loaded_sites)} 个站点模块: {', '.join(loaded_sites) if loaded_sites else '无'}")
+        logger.info(f"站点加载耗时 {elapsed_ms:.1f}ms，其中 {lazy_count} 个站点延迟导入")
         return loaded_sites
 
+    def _import_site(self, site_name: str, reload: bool = False) -> SiteConfig | None:
+        """
+        Import a site module and record it in the site manifest
+        Args:
+            site_name: Name of the site module
+            reload: Re-execute an already imported module; its previous state is
+                restored if the new code fails to import or has no valid SiteConfig
+        Returns:
+            The module's SiteConfig, or None if it could not be loaded
+        """
+        if site_name in self.entry_points:
+            return self._import_entry_point(site_name, self.entry_points[site_name])
+
+        module_name = f"{__package__}.sites.{site_name}"
+        previous = sys.modules.get(module_name) if reload else None
+        saved_namespace = dict(previous.__dict__) if previous is not None else None
+        # Re-executing the module may replace the shared sources it registers
+        saved_sources = dict(sources)
+
+        def rollback():
+            if previous is not None and saved_namespace is not None:
+                previous.__dict__.clear()
+                previous.__dict__.update(saved_namespace)
+                sys.modules[module_name] = previous
+                sources.clear()
+                sources.update(saved_sources)
+                logger.warning(f"站点模块 {site_name} 已回滚到重新加载前的版本")
+
+        start = time.perf_counter()
+        try:
+            if previous is not None:
+                importlib.invalidate_caches()
+                module = importlib.reload(previous)
+            else:
+                # Import the site module using relative import that works in different plugin directories
+                module = importlib.import_module(f".sites.{site_name}", package=__package__)
+        except Exception as e:
+            logger.error(f"加载站点模块 {site_name} 失败: {e}")
+            rollback()
+            return None
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.debug(f"成功导入站点模块: {site_name} ({elapsed_ms:.1f}ms)")
+
+        # Look for the 'site' attribute which should be a SiteConfig
+        if not (hasattr(module, "site") and isinstance(module.site, SiteConfig)):
+            logger.warning(f"站点模块 {site_name} 中未找到有效的 SiteConfig")
+            rollback()
+            return None
+
+        if plugin_config.lazy_site_loading and module.__file__:
+            try:
+                self.manifest[site_name] = make_manifest_entry(Path(module.__file__), module.site)
+            except Exception as e:
+                logger.warning(f"记录站点 {site_name} 的清单信息失败: {e}")
+        return module.site
+
+    def _import_entry_point(self, site_name: str, entry_point: dict[str, str]) -> SiteConfig | None:
+        """
+        Import a site provided by an installed distribution
+        Args:
+            site_name: Entry point name, used as the site name
+            entry_point: Discovered entry point, pointing to a SiteConfig or a module with a `site` attribute
+        Returns:
+            The site's SiteConfig, or None if it could not be loaded
+        """
+        loader = EntryPoint(site_name, entry_point["value"], plugin_config.site_entry_point_group)
+        start = time.perf_counter()
+        try:
+            loaded = loader.load()
+        except Exception as e:
+            logger.error(f"加载外部站点 {site_name} ({entry_point['value']}) 失败: {e}")
+            return None
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.debug(f"成功导入外部站点: {site_name} ({elapsed_ms:.1f}ms)")
+
+        site_config = getattr(loaded, "site", loaded)
+        if not isinstance(site_config, SiteConfig):
+            logger.warning(f"外部站点 {site_name} ({entry_point['value']}) 不是有效的 SiteConfig")
+            return None
+
+        module_file = getattr(sys.modules.get(loader.module), "__file__", None)
+        if plugin_config.lazy_site_loading and module_file:
+            try:
+                self.manifest[site_name] = {
+                    **make_manifest_entry(Path(module_file), site_config),
+                    "entry_point": entry_point["value"],
+                    "version": entry_point["version"],
+                    "path": module_file,
+                }
+            except Exception as e:
+                logger.warning(f"记录站点 {site_name} 的清单信息失败: {e}")
+        return site_config
+
+    async def ensure_site_loaded(self, site_name: str) -> SiteConfig | None:
+        """
+        Import a lazily registered site if needed
+        Args:
+            site_name: Name of the site
+        Returns:
+            The site's SiteConfig, or None if the site is unknown or failed to import
+        """
+        site_config = self.site_configs.get(site_name)
+        if not isinstance(site_config, LazySiteConfig):
+            return site_config
+
+        lock = self._import_locks.setdefault(site_name, asyncio.Lock())
+        async with lock:
+            site_config = self.site_configs.get(site_name)
+            if not isinstance(site_config, LazySiteConfig):
+                return site_config
+
+            # Import off the event loop so a heavy module does not block other work
+            loaded = await asyncio.to_thread(self._import_site, site_name)
+            if loaded is None:
+                return None
+
+            old_display_name = site_config.display_name()
+            self.site_configs[site_name] = loaded
+            self.catalog_version += 1
+            display_name = loaded.display_name()
+            if display_name != old_display_name:
+                self.display_name_to_site_name.pop(old_display_name, None)
+                self.display_name_to_site_name[display_name] = site_name
+            if loaded.schedule() != site_config.schedule():
+                self.start_site_scheduling(site_name)
+            self.sync_stream(site_name)
+            save_manifest(self.manifest)
+            return loaded
+
+    async def warm_up_sites(self):
+        """Import all lazily registered sites in the background"""
+        lazy_sites = [name for name, config in self.site_configs.items() if isinstance(config, LazySiteConfig)]
+        if not lazy_sites:
+            return
+
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(max(1, plugin_config.site_import_concurrency))
+
+        async def load(site_name: str):
+            async with semaphore:
+                await self.ensure_site_loaded(site_name)
+
+        await asyncio.gather(*(load(site_name) for site_name in lazy_sites))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"后台预热完成: {len(lazy_sites)} 个站点模块，耗时 {elapsed_ms:.1f}ms")
+
+    def register_site(self, site_name: str, site_config: SiteConfig | LazySiteConfig):
+        """
+        Register a loaded site and start its scheduling
+        Args:
+            site_name: Name of the site
+            site_config: The site's configuration
+        """
+        # Drop the display name of the version being replaced
+        if site_name in self.site_configs:
+            old_display_name = self.site_configs[site_name].display_name()
+            if self.display_name_to_site_name.get(old_display_name) == site_name:
+                del self.display_name_to_site_name[old_display_name]
+
+        # Register with scheduler
+        self.site_configs[site_name] = site_config
+        self.catalog_version += 1
+
+        # Map display name to site name
+        display_name = site_config.display_name()
+        self.display_name_to_site_name[display_name] = site_name
+
+        # Start scheduling for this site
+        self.start_site_scheduling(site_name)
+        self.sync_stream(site_name)
+
+        logger.info(f"成功加载站点模块: {site_name} (显示名称: {display_name})")
+        if site_config.source:
+            logger.debug(f"站点 {site_name} 使用共享数据源: {site_config.source}")
+
+    async def reload_site_file(self, file_path: Path) -> bool:
+        """
+        Load or reload a site from a changed module or definition file
+
+        The new version replaces the old one atomically: its job is rescheduled with
+        `replace_existing`, caches are kept, and in-flight checks finish with the old
+        version. If loading fails, the old version stays active.
+        Args:
+            file_path: Changed site module or definition file
+        Returns:
+            True if the site was (re)loaded
+        """
+        if file_path.suffix == ".py":
+            site_name = file_path.stem
+            reload = not isinstance(self.site_configs.get(site_name), LazySiteConfig)
+            site_config = await asyncio.to_thread(self._import_site, site_name, reload)
+            # Pool workers still hold the module version they imported
+            if reload and site_config is not None and site_config.uses_process_pool():
+                restart_process_pool()
+        else:
+            try:
+                site_config = load_definition(file_path)
+            except Exception as e:
+                logger.error(f"加载站点定义 {file_path.name} 失败: {e}")
+                return False
+            site_name = site_config.name
+        if site_config is None:
+            return False
+
+        # A definition whose name changed replaces the site it used to define
+        previous_name = self.site_files.get(file_path)
+        if previous_name is not None and previous_name != site_name:
+            self.unregister_site(previous_name)
+        self.register_site(site_name, site_config)
+        self.site_files[file_path] = site_name
+        if plugin_config.lazy_site_loading:
+            save_manifest(self.manifest)
+        logger.success(f"站点 {site_name} 已热重载")
+        return True
+
+    def remove_site_file(self, file_path: Path):
+        """
+        Unload the site defined by a removed file
+        Args:
+            file_path: Removed site module or definition file
+        """
+        site_name = self.site_files.pop(file_path, None)
+        if site_name is not None:
+            self.unregister_site(site_name)
+
+    def unregister_site(self, site_name: str):
+        """
+        Remove a site and its scheduled job (its cache is kept)
+        Args:
+            site_name: Name of the site
+        """
+        site_config = self.site_configs.pop(site_name, None)
+        if site_config is None:
+            return
+        self.catalog_version += 1
+        display_name = site_config.display_name()
+        if self.display_name_to_site_name.get(display_name) == site_name:
+            del self.display_name_to_site_name[display_name]
+        self.manifest.pop(site_name, None)
+        if scheduler.get_job(f"site_check_{site_name}"):
+            scheduler.remove_job(f"site_check_{site_name}")
+        self.sync_stream(site_name)
+        logger.info(f"站点 {site_name} 已卸载")
+
+    def sync_stream(self, site_name: str):
+        """Start, restart or stop a site's stream connection to match its current config"""
+        site_config = self.site_configs.get(site_name)
+        stream = getattr(site_config, "stream", None)
+        task = self.stream_tasks.get(site_name)
+        if task is not None and getattr(task, "stream", None) is stream:
+            return
+        if task is not None:
+            task.cancel()
+            del self.stream_tasks[site_name]
+        if stream is None or not self.streaming:
+            return
+
+        async def on_event(data: Any):
+            await self.ingest_push(site_name, data)
+
+        task = asyncio.create_task(run_stream(site_name, stream, on_event))
+        task.stream = stream  # type: ignore[attr-defined]
+        self.stream_tasks[site_name] = task
+
+    async def start_streams(self):
+        """Open the stream connections of all streaming sites, importing lazily registered ones"""
+        self.streaming = True
+        for site_name, site_config in list(self.site_configs.items()):
+            if isinstance(site_config, LazySiteConfig):
+                if site_config.entry.get("stream"):
+                    await self.ensure_site_loaded(site_name)
+            else:
+                self.sync_stream(site_name)
+        if self.stream_tasks:
+            logger.info(f"已启动 {len(self.stream_tasks)} 个流式数据源: {', '.join(self.stream_tasks)}")
+
+    async def stop_streams(self):
+        """Close all stream connections"""
+        self.streaming = False
+        tasks = list(self.stream_tasks.values())
+        self.stream_tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def watch_sites(self):
+        """Watch the site directories and hot reload changed sites until cancelled"""
+        await asyncio.gather(
+            *(
+                SiteWatcher(self, site_dir, plugin_config.site_reload_interval).run()
+                for site_dir in self.get_site_dirs()
+            )
+        )
+
+    def get_schedule(self, site_name: str) -> str:
+        """Schedule of a site's polling job; sites accepting pushes are only polled as a safety net"""
+        if site_name in plugin_config.push_sites and plugin_config.push_ingestion:
+            return f"interval:{plugin_config.push_poll_interval}"
+        return self.site_configs[site_name].schedule()
+
     def start_site_scheduling(self, site_name: str):
         """
         Start scheduling for a specific site
@@ -71,14 +585,19 @@ class Scheduler:
             logger.error(f"站点 {site_name} 未注册")
             return
 
-        site_config = self.site_configs[site_name]
         try:
             # Get schedule from site
-            schedule = site_config.schedule()
+            schedule = self.get_schedule(site_name)
 
             # Create job ID
             job_id = f"site_check_{site_name}"
 
+            # Keep the cadence of the previous run instead of restarting the interval
+            job_options: dict[str, Any] = {}
+            resume_time = self.resume_times.pop(site_name, None)
+            if resume_time is not None and resume_time > time.time():
+                job_options["next_run_time"] = datetime.fromtimestamp(resume_time).astimezone()
+
             # Check if schedule is a special debug interval (starts with "interval:")
             if schedule.startswith("interval:"):
                 # Parse interval (e.g., "interval:10" for 10 seconds)
@@ -89,8 +608,10 @@ class Scheduler:
                     self.check_site_updates,
                     "interval",
                     id=job_id,
+                    replace_existing=True,
                     seconds=interval_seconds,
                     args=[site_name],
+                    **job_options,
                 )
 
                 logger.info(f"已为站点 {site_name} 启动调试任务: 每 {interval_seconds} 秒")
@@ -108,69 +629,383 @@ class Scheduler:
                     self.check_site_updates,
                     "cron",
                     id=job_id,
+                    replace_existing=True,
                     minute=minute,
                     hour=hour,
                     day=day,
                     month=month,
                     day_of_week=day_of_week,
                     args=[site_name],
+                    **job_options,
                 )
 
                 logger.info(f"已为站点 {site_name} 启动定时任务: {schedule}")
         except Exception as e:
             logger.error(f"为站点 {site_name} 启动定时任务失败: {e}")
 
-    async def check_site_updates(self, site_name: str):
+    async def check_site_updates(self, site_name: str, seed: bool = False) -> str:
+        """
+        Check for updates from a specific site, joining the in-flight check if there is one
+        Args:
+            site_name: Name of the site to check
+            seed: Only establish a baseline if the site has no cache, even when `seed_missing_cache` is off.
+                A check already in flight is joined, and the site is seeded after it if it left no cache
+        Returns:
+            Check result (CHECK_UPDATED, CHECK_UNCHANGED, CHECK_SEEDED, CHECK_ERROR, CHECK_UNREGISTERED
+            or CHECK_CANCELLED)
+        """
+        task = self.running_checks.get(site_name)
+        if task is None:
+            if not self.accepting_checks:
+                logger.debug(f"插件正在关闭，跳过站点 {site_name} 的检查")
+                return CHECK_CANCELLED
+            task = self._start_check(site_name, self._check_site_updates(site_name, seed=seed))
+        else:
+            logger.debug(f"站点 {site_name} 正在检查中，等待当前检查完成")
+            if seed:
+                # The in-flight check may not be seeding: wait for it, then seed if there is still no cache
+                result = await asyncio.shield(task)
+                if load_cache(site_name) is not None:
+                    return result
+                return await self.check_site_updates(site_name, seed)
+        # Shield so that a cancelled caller does not cancel the check shared with others
+        return await asyncio.shield(task)
+
+    def _start_check(self, site_name: str, check: Coroutine[Any, Any, str]) -> asyncio.Task:
+        """Run a check as the site's in-flight check"""
+        task = asyncio.create_task(check)
+        self.running_checks[site_name] = task
+
+        def _forget(done: asyncio.Task):
+            if self.running_checks.get(site_name) is done:
+                del self.running_checks[site_name]
+
+        task.add_done_callback(_forget)
+        return task
+
+    async def ingest_push(self, site_name: str, data: Any) -> str:
         """
-        Check for updates from a specific site using functional approach
+        Process data pushed by a site's upstream as if it had just been fetched
+        Args:
+            site_name: Name of the site
+            data: Latest data, as the site's fetch (and parse) would return it
+        Returns:
+            Check result
+        """
+        # Pushes never join a poll in flight: they wait for it and then compare against its result.
+        # An update left undelivered at the last shutdown is finished first
+        resumed = False
+        while True:
+            if (task := self.running_checks.get(site_name)) is not None:
+                await asyncio.wait([task])
+            elif site_name in self.pending_resumes and not resumed:
+                resumed = True
+                await self.check_site_updates(site_name)
+            else:
+                break
+        if not self.accepting_checks:
+            return CHECK_CANCELLED
+        return await asyncio.shield(self._start_check(site_name, self._check_site_updates(site_name, data)))
+
+    async def _check_site_updates(self, site_name: str, pushed_data: Any = NOT_PUSHED, seed: bool = False) -> str:
+        """
+        Check for updates from a specific site by running it through the check pipeline
         Args:
             site_name: Name of the site to check
+            pushed_data: Data pushed by the site's upstream; it replaces the fetch stage
+            seed: Only establish a baseline if the site has no cache
+        Returns:
+            Check result
         """
         if site_name not in self.site_configs:
             logger.error(f"站点 {site_name} 未注册")
-            return
+            return CHECK_UNREGISTERED
+
+        site_config = await self.ensure_site_loaded(site_name)
+        if site_config is None:
+            logger.error(f"站点 {site_name} 的模块导入失败，跳过本次检查")
+            return CHECK_ERROR
+
+        # Finish the update left undelivered at the last shutdown before looking for new ones
+        check = self.pending_resumes.pop(site_name, None) if pushed_data is NOT_PUSHED else None
+        if check is not None:
+            check.site_config = site_config
+            logger.info(f"继续站点 {site_name} 上次关闭时未完成的推送")
+        else:
+            check = SiteCheck(site_name, site_config)
+            # Pushed data is a discrete event and always delivered; fetched data on a cold cache is
+            # the site's whole current content and only becomes the baseline
+            check.seed = seed or (pushed_data is NOT_PUSHED and plugin_config.seed_missing_cache)
+            if pushed_data is not NOT_PUSHED:
+                check.cached_data = load_cache(site_name)
+                check.latest_data = pushed_data
+                check.stage = "diff"
 
-        site_config = self.site_configs[site_name]
+        self.active_checks[site_name] = check
         try:
-            logger.debug(f"开始检查站点 {site_name} 的更新")
+            check = await self.pipeline.submit(check, check.stage)
+            if check.result in (CHECK_UPDATED, CHECK_UNCHANGED, CHECK_SEEDED):
+                self.last_checks.record(site_name)
+            return check.result
+        except Exception as e:
+            logger.error(f"检查站点 {site_name} 更新时出错: {e}")
+            return CHECK_ERROR
+        finally:
+            if self.active_checks.get(site_name) is check:
+                del self.active_checks[site_name]
 
-            # Load cached data using cache module
-            cached_data = load_cache(site_name)
+    async def _stage_fetch(self, check: SiteCheck) -> bool:
+        """Pipeline stage: load the cache and fetch the latest data"""
+        check.stage = "fetch"
+        site_config = check.site_config
+        logger.debug(f"开始检查站点 {check.site_name} 的更新")
 
-            # Fetch latest data using site's fetch function
-            latest_data = await site_config.fetch()
+        # Load cached data using cache module
+        check.cached_data = load_cache(check.site_name)
 
-            # Check for updates using site's compare function
-            if site_config.compare(cached_data, latest_data):
-                logger.info(f"站点 {site_name} 检测到更新")
+        # Fetch latest data using site's fetch function
+        check.latest_data = await site_config.fetch()
+        if check.latest_data is NOTHING_FETCHED:
+            logger.debug(f"站点 {check.site_name} 暂无可比较的数据")
+            check.result = CHECK_UNCHANGED
+            return False
 
-                # Format notification using site's format function
-                notification = site_config.format(latest_data)
+        # Pipeline mode: parse the raw response off the event loop
+        if site_config.parse is not None:
+            check.latest_data = await call_site_func(site_config.parse, check.latest_data, default="process")
+        return True
 
-                # Get subscribers
-                subscribers = subscription_manager.get_subscribers(site_name)
+    async def _stage_diff(self, check: SiteCheck) -> bool:
+        """Pipeline stage: compare cached and latest data"""
+        check.stage = "diff"
+        site_config = check.site_config
+        if check.seed and check.cached_data is None:
+            # Cold cache: record the baseline (cache, history, and any seen keys kept in the data) silently
+            save_cache(check.site_name, check.latest_data)
+            record_snapshot(check.site_name, check.latest_data)
+            logger.info(f"站点 {check.site_name} 没有缓存，已建立基线，本次不发送通知")
+            check.result = CHECK_SEEDED
+            return False
 
-                # Send notifications to all subscribers
-                if subscribers:
-                    await self._send_notifications(subscribers, notification)
-                else:
-                    logger.debug(f"站点 {site_name} 没有订阅者")
+        # Check for updates using site's compare function
+        if await call_site_func(
+            site_config.compare, check.cached_data, check.latest_data, default=site_config.execution
+        ):
+            logger.info(f"站点 {check.site_name} 检测到更新")
+            return True
 
-                # Save new data to cache using cache module
-                save_cache(site_name, latest_data)
+        logger.debug(f"站点 {check.site_name} 无更新")
+        check.result = CHECK_UNCHANGED
+        return False
+
+    async def _stage_render(self, check: SiteCheck) -> bool:
+        """Pipeline stage: format the notification and resolve subscribers"""
+        check.stage = "render"
+        site_config = check.site_config
+        # Format notification using site's format function
+        check.notification = await call_site_func(site_config.format, check.latest_data, default=site_config.execution)
+
+        # Get subscribers, skipping those whose keyword filters do not match this update
+        subscribers = subscription_manager.get_subscribers(check.site_name)
+        message = str(check.notification)
+        check.subscribers = subscription_manager.filter_subscribers(check.site_name, subscribers, message)
+        if len(check.subscribers) < len(subscribers):
+            logger.debug(f"站点 {check.site_name} 有 {len(subscribers) - len(check.subscribers)} 个订阅者被关键词过滤")
+
+        # Skip subscribers who just received a near-duplicate from another site; the deliver stage
+        # records who was actually sent this one
+        if self.recent_fingerprints is not None and check.subscribers:
+            selected = self.recent_fingerprints.select(check.site_name, message, check.subscribers)
+            skipped = len(check.subscribers) - len(selected)
+            if skipped:
+                logger.info(f"站点 {check.site_name} 的更新与其他站点近期通知相似，跳过 {skipped} 个订阅者")
+            check.subscribers = selected
+        return True
+
+    async def _stage_deliver(self, check: SiteCheck) -> bool:
+        """Pipeline stage: send notifications and persist the new data"""
+        check.stage = "deliver"
+        # Send notifications to all subscribers, recording progress so a shutdown can resume the fan-out
+        if check.subscribers:
+            delivered = set(check.delivered)
+            sent: list[int | str] = []
+            for subscriber_id in check.subscribers:
+                if subscriber_id in delivered:
+                    continue
+                # Held notifications are sent later by dispatch_deferred
+                if self.dispatcher.route(subscriber_id, check.notification):
+                    sent += await self._send_notifications([subscriber_id], check.notification)
+                check.delivered.append(subscriber_id)
+            if self.recent_fingerprints is not None:
+                self.recent_fingerprints.record(check.site_name, str(check.notification), sent)
+        else:
+            logger.debug(f"站点 {check.site_name} 没有订阅者")
+
+        # Save new data to cache using cache module
+        save_cache(check.site_name, check.latest_data)
+
+        # Keep the snapshot in the site's history
+        record_snapshot(check.site_name, check.latest_data)
+        check.result = CHECK_UPDATED
+        return False
+
+    async def check_sites(
+        self, site_names: list[str] | None = None, concurrency: int | None = None, seed: bool = False
+    ) -> list[tuple[str, str, float, bool]]:
+        """
+        Check several sites now, outside their schedules
+        Args:
+            site_names: Sites to check, defaults to all loaded sites
+            concurrency: Maximum concurrent checks, defaults to `check_concurrency`
+            seed: Only establish baselines for sites without a cache
+        Returns:
+            List of (site_name, result, elapsed_seconds, coalesced) in the given order;
+            coalesced is True when the site was already being checked and the run was joined
+        """
+        if site_names is None:
+            site_names = list(self.site_configs)
+        semaphore = asyncio.Semaphore(max(1, concurrency or plugin_config.check_concurrency))
+
+        async def run(site_name: str) -> tuple[str, str, float, bool]:
+            coalesced = site_name in self.running_checks
+            start = time.perf_counter()
+            if coalesced:
+                # Joining an in-flight run does not take a concurrency slot
+                result = await self.check_site_updates(site_name, seed)
             else:
-                logger.debug(f"站点 {site_name} 无更新")
+                async with semaphore:
+                    coalesced = site_name in self.running_checks
+                    result = await self.check_site_updates(site_name, seed)
+            return site_name, result, time.perf_counter() - start, coalesced
 
-        except Exception as e:
-            logger.error(f"检查站点 {site_name} 更新时出错: {e}")
+        return list(await asyncio.gather(*(run(site_name) for site_name in dict.fromkeys(site_names))))
+
+    async def seed_sites(
+        self, site_names: list[str] | None = None, concurrency: int | None = None
+    ) -> list[tuple[str, str, float, bool]]:
+        """
+        Establish baselines for sites that have no cache yet, in parallel, without notifying anyone
+        Args:
+            site_names: Sites to seed, defaults to all registered sites
+            concurrency: Maximum concurrent fetches, defaults to `check_concurrency`
+        Returns:
+            Results as returned by `check_sites`, for the sites that had no cache
+        """
+        if site_names is None:
+            site_names = list(self.site_configs)
+        missing = [site_name for site_name in site_names if load_cache(site_name) is None]
+        if not missing:
+            return []
+        logger.info(f"开始为 {len(missing)} 个没有缓存的站点建立基线: {', '.join(missing)}")
+        return await self.check_sites(missing, concurrency, seed=True)
+
+    def load_checkpoint(self):
+        """Queue the checks left unfinished at the last shutdown; each resumes on its site's next check"""
+        for entry in take_checkpoint():
+            try:
+                check = SiteCheck.from_checkpoint(entry)
+            except (KeyError, TypeError) as e:
+                logger.warning(f"忽略无效的检查点: {e}")
+                continue
+            self.pending_resumes[check.site_name] = check
+        if self.pending_resumes:
+            logger.info(f"有 {len(self.pending_resumes)} 个站点的推送将在恢复后继续: {', '.join(self.pending_resumes)}")
+
+    async def resume_pending_checks(self):
+        """Resume checkpointed checks now (e.g. once a bot is connected)"""
+        if self.pending_resumes:
+            await self.check_sites(list(self.pending_resumes))
+
+    def find_overdue_sites(self, now: float | None = None) -> list[str]:
+        """
+        Find sites whose schedule fired since their last successful check (e.g. while the bot was down)
+        Args:
+            now: Current unix timestamp, defaults to the current time
+        Returns:
+            Overdue site names, most overdue first; sites never checked are not included
+        """
+        current = datetime.fromtimestamp(time.time() if now is None else now).astimezone()
+        overdue = []
+        for site_name in self.site_configs:
+            last_check = self.last_checks.get(site_name)
+            if last_check is None:
+                continue
+            try:
+                due = next_run_after(self.get_schedule(site_name), datetime.fromtimestamp(last_check).astimezone())
+            except Exception as e:
+                logger.warning(f"无法计算站点 {site_name} 的下次检查时间: {e}")
+                continue
+            if due is not None and due <= current:
+                overdue.append((due, site_name))
+        return [site_name for _, site_name in sorted(overdue)]
+
+    async def catch_up_missed_checks(self):
+        """Check overdue sites now, at most `catch_up_concurrency` at a time"""
+        overdue = self.find_overdue_sites()
+        if not overdue:
+            return
+        logger.info(f"有 {len(overdue)} 个站点在停机期间错过了检查，开始补检: {', '.join(overdue)}")
+        start = time.perf_counter()
+        results = await self.check_sites(overdue, plugin_config.catch_up_concurrency)
+        updated = sum(result == CHECK_UPDATED for _, result, _, _ in results)
+        logger.info(f"补检完成: {len(results)} 个站点，{updated} 个有更新，耗时 {time.perf_counter() - start:.2f}s")
+
+    async def catch_up_after_restart(self):
+        """Once per start: resume checkpointed fan-outs, then catch up checks missed while down"""
+        if self.caught_up:
+            return
+        self.caught_up = True
+        await self.resume_pending_checks()
+        if plugin_config.catch_up_missed_checks:
+            await self.catch_up_missed_checks()
+
+    async def shutdown(self, timeout: float):
+        """
+        Stop scheduling, drain in-flight checks and checkpoint what did not finish
+        Args:
+            timeout: Seconds to wait for in-flight checks before cancelling them
+        """
+        self.accepting_checks = False
+        for job in scheduler.get_jobs():
+            if job.id.startswith("site_check_"):
+                job.pause()
+        await self.stop_streams()
+
+        running = list(self.running_checks.values())
+        if running:
+            logger.info(f"等待 {len(running)} 个进行中的站点检查完成 (最多 {timeout} 秒)")
+            _, pending = await asyncio.wait(running, timeout=timeout)
+            if pending:
+                logger.warning(f"{len(pending)} 个站点检查未能在 {timeout} 秒内完成，已中止")
+        candidates = [*self.active_checks.values(), *self.pending_resumes.values()]
+        await self.pipeline.stop()
+
+        # Updates already detected are resumed on the next start; checks that had not got that far simply rerun
+        unfinished = [
+            check for check in candidates if check.stage in ("render", "deliver") and check.result != CHECK_UPDATED
+        ]
+        save_checkpoint([check.to_checkpoint() for check in unfinished])
+        self.last_checks.flush()
+        self.dispatcher.save_pending()
+
+    async def dispatch_deferred(self):
+        """Scheduled job: send the held notifications whose subscribers may receive them now"""
+        released = self.dispatcher.release_due()
+        for subscriber_id, message in released:
+            await self._send_notifications([subscriber_id], message)
+        if released:
+            logger.info(f"已向 {len(released)} 个订阅者推送延迟的通知")
 
-    async def _send_notifications(self, subscribers: list[str], message: str):
+    async def _send_notifications(self, subscribers: list[int | str], message: str) -> list[int | str]:
         """
         Send notifications to subscribers
         Args:
-            subscribers: List of subscriber IDs
+            subscribers: List of subscriber IDs (numeric IDs as int, as returned by get_subscribers)
             message: Notification message
+        Returns:
+            Subscribers the notification was sent to
         """
+        sent: list[int | str] = []
         try:
             bot = get_bot()
             for subscriber_id in subscribers:
@@ -178,17 +1013,20 @@ class Scheduler:
                     # Try to send as group message first
                     await bot.send_group_msg(group_id=int(subscriber_id), message=message)
                     logger.debug(f"已向群组 {subscriber_id} 发送通知")
+                    sent.append(subscriber_id)
                 except ValueError:
                     # If not a valid group ID, try as private message
                     try:
                         await bot.send_private_msg(user_id=int(subscriber_id), message=message)
                         logger.debug(f"已向用户 {subscriber_id} 发送通知")
+                        sent.append(subscriber_id)
                     except Exception as e:
                         logger.error(f"向订阅者 {subscriber_id} 发送通知失败: {e}")
                 except Exception as e:
                     logger.error(f"向订阅者 {subscriber_id} 发送通知失败: {e}")
         except Exception as e:
             logger.error(f"发送通知时出错: {e}")
+        return sent
 
     def get_site_name_by_display_name(self, display_name: str) -> str:
         """Get internal site name by display name"""
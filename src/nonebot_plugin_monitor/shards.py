@@ -0,0 +1,181 @@
+"""Per-site sharded subscription storage
+
+With `subscription_storage = "sharded"`, subscriptions are kept in one file
+per site (`<site>.json`, holding `{"users": [...], "groups": [...]}`) instead of
+a single `subscriptions.json`. A shard is read on first access and only
+changed shards are rewritten, so startup cost and write volume depend on the
+sites actually touched rather than on the total number of subscriptions. Site
+names come from user commands, so they are percent-encoded into a single file
+name and can never point outside the directory.
+
+Looking up the sites a user or group subscribes to would otherwise need every
+shard; a reverse index `{target: {id: [sites]}}` answers it instead. The index
+is itself split into buckets by id (`_index/<bucket>.json`), loaded and written
+independently like the site shards.
+"""
+
+from collections.abc import Iterator, MutableMapping
+import json
+from pathlib import Path
+from urllib.parse import quote, unquote
+import zlib
+
+from nonebot import logger
+
+from .cache import write_atomic
+from .subscribers import SubscriberSet
+
+INDEX_BUCKETS = 256
+TARGETS = ("users", "groups")
+
+SiteSubscriptions = dict[str, SubscriberSet]
+
+
+def _read_json(path: Path) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_json(path: Path, data: dict):
+    write_atomic(path, json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8"))
+
+
+def shard_file_name(site_name: str) -> str:
+    """File name of a site's shard; every character that could act as a path separator is encoded"""
+    name = quote(site_name, safe="")
+    # "." and ".." are not encoded by quote but must not become a file stem on their own
+    if name.strip(".") == "":
+        name = name.replace(".", "%2E")
+    return f"{name}.json"
+
+
+def index_bucket(member: int | str) -> int:
+    """Index bucket of a user or group id"""
+    text = str(member)
+    if text.isascii() and text.isdigit():
+        return int(text) % INDEX_BUCKETS
+    return zlib.crc32(text.encode()) % INDEX_BUCKETS
+
+
+class SubscriptionShards(MutableMapping[str, SiteSubscriptions]):
+    """Site subscriptions backed by lazily loaded per-site files
+
+    Behaves like the `{site_name: {"users": SubscriberSet, "groups": SubscriberSet}}`
+    dict used by the single-file storage. Changes must be reported with
+    `record_change` and are written by `flush`.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.index_directory = directory / "_index"
+        self._loaded: dict[str, SiteSubscriptions] = {}
+        self._site_names = {unquote(path.stem) for path in directory.glob("*.json")} if directory.exists() else set()
+        self._index: dict[int, dict[str, dict[str, list[str]]]] = {}
+        self._dirty_sites: set[str] = set()
+        self._dirty_buckets: set[int] = set()
+
+    def _shard_file(self, site_name: str) -> Path:
+        return self.directory / shard_file_name(site_name)
+
+    def __getitem__(self, site_name: str) -> SiteSubscriptions:
+        if site_name not in self._loaded:
+            if site_name not in self._site_names:
+                raise KeyError(site_name)
+            try:
+                data = _read_json(self._shard_file(site_name))
+            except Exception as e:
+                logger.error(f"加载站点 {site_name} 的订阅分片失败: {e}")
+                data = {}
+            self._loaded[site_name] = {target: SubscriberSet(data.get(target, [])) for target in TARGETS}
+        return self._loaded[site_name]
+
+    def __setitem__(self, site_name: str, site_data: SiteSubscriptions):
+        self._loaded[site_name] = site_data
+        self._site_names.add(site_name)
+        self._dirty_sites.add(site_name)
+
+    def __delitem__(self, site_name: str):
+        if site_name not in self._site_names:
+            raise KeyError(site_name)
+        self._site_names.discard(site_name)
+        self._loaded.pop(site_name, None)
+        self._dirty_sites.add(site_name)
+
+    def __contains__(self, site_name: object) -> bool:
+        return site_name in self._site_names
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(sorted(self._site_names))
+
+    def __len__(self) -> int:
+        return len(self._site_names)
+
+    @property
+    def loaded_count(self) -> int:
+        """Number of shards read so far"""
+        return len(self._loaded)
+
+    def _bucket(self, bucket: int) -> dict[str, dict[str, list[str]]]:
+        if bucket not in self._index:
+            bucket_file = self.index_directory / f"{bucket:02x}.json"
+            data: dict[str, dict[str, list[str]]] = {}
+            try:
+                if bucket_file.exists():
+                    data = _read_json(bucket_file)
+            except Exception as e:
+                logger.error(f"加载订阅索引 {bucket_file.name} 失败: {e}")
+            self._index[bucket] = {target: data.get(target, {}) for target in TARGETS}
+        return self._index[bucket]
+
+    def record_change(self, site_name: str, target: str, member: int | str, subscribed: bool):
+        """
+        Record a subscribe/unsubscribe so the site shard and the index are written on flush
+        Args:
+            site_name: Site whose subscribers changed
+            target: "users" or "groups"
+            member: User or group id
+            subscribed: True if subscribed, False if unsubscribed
+        """
+        self._dirty_sites.add(site_name)
+        bucket = index_bucket(member)
+        entries = self._bucket(bucket)[target]
+        sites = entries.setdefault(str(member), [])
+        if subscribed and site_name not in sites:
+            sites.append(site_name)
+        elif not subscribed and site_name in sites:
+            sites.remove(site_name)
+            if not sites:
+                del entries[str(member)]
+        self._dirty_buckets.add(bucket)
+
+    def sites_of(self, target: str, member: int | str) -> list[str]:
+        """Sites a user or group subscribes to, from the index"""
+        return list(self._bucket(index_bucket(member))[target].get(str(member), []))
+
+    def flush(self):
+        """Write changed shards and index buckets"""
+        for site_name in sorted(self._dirty_sites):
+            shard_file = self._shard_file(site_name)
+            if site_name in self._site_names:
+                site_data = self[site_name]
+                _write_json(shard_file, {target: site_data[target].to_list() for target in TARGETS})
+            else:
+                shard_file.unlink(missing_ok=True)
+        for bucket in sorted(self._dirty_buckets):
+            _write_json(self.index_directory / f"{bucket:02x}.json", self._index[bucket])
+        if self._dirty_sites or self._dirty_buckets:
+            logger.debug(f"已写入 {len(self._dirty_sites)} 个订阅分片, {len(self._dirty_buckets)} 个索引分片")
+        self._dirty_sites.clear()
+        self._dirty_buckets.clear()
+
+    @classmethod
+    def create(cls, directory: Path, subscriptions: dict[str, SiteSubscriptions]) -> "SubscriptionShards":
+        """Write existing subscriptions as shards with a full index (migration from a single file)"""
+        shards = cls(directory)
+        for site_name, site_data in subscriptions.items():
+            shards[site_name] = site_data
+            for target in TARGETS:
+                for member in site_data[target]:
+                    shards.record_change(site_name, target, member, True)
+        shards.flush()
+        return shards
@@ -3,6 +3,8 @@
 from collections.abc import Callable
 from typing import Any
 
+from ..streaming import StreamSource as StreamSource
+
 # Define function types
 FetchFunc = Callable[[], Any]
 CompareFunc = Callable[[Any, Any], bool]
@@ -10,6 +12,29 @@ FormatFunc = Callable[[Any], str]
 ScheduleFunc = Callable[[], str]
 DescriptionFunc = Callable[[], str]
 DisplayNameFunc = Callable[[], str]
+SelectFunc = Callable[[Any], Any]
+ParseFunc = Callable[[bytes], Any]
+
+# Returned by a fetch that has no data to compare yet (a stream with no event and no cache)
+NOTHING_FETCHED = object()
+
+# How compare/format callbacks are executed: on the event loop, in a thread, or in the shared process pool
+EXECUTION_MODES = ("inline", "thread", "process")
+
+
+def run_in_thread(func: Callable) -> Callable:
+    """Mark a compare/format callback to run in a worker thread (blocking I/O, C extensions releasing the GIL)"""
+    func.__site_execution__ = "thread"
+    return func
+
+
+def run_in_process(func: Callable) -> Callable:
+    """Mark a compare/format callback to run in the shared process pool (CPU-bound parsing)
+
+    The function must be defined at module top level and its arguments and result must be picklable.
+    """
+    func.__site_execution__ = "process"
+    return func
 
 
 class SiteConfig:
@@ -18,17 +43,72 @@ class SiteConfig:
     def __init__(
         self,
         name: str,
-        fetch_func: FetchFunc,
+        fetch_func: FetchFunc | None,
         compare_func: CompareFunc,
         format_func: FormatFunc,
         description_func: DescriptionFunc,
         schedule_func: ScheduleFunc,
         display_name_func: DisplayNameFunc = None,
+        source: str | None = None,
+        select_func: SelectFunc | None = None,
+        execution: str = "inline",
+        parse_func: ParseFunc | None = None,
+        stream: StreamSource | None = None,
     ):
+        if fetch_func is None and source is None and stream is None:
+            raise ValueError(f"Site {name} needs fetch_func or source, or a stream")
+        if fetch_func is not None and source is not None:
+            raise ValueError(f"Site {name} takes either fetch_func or source, not both")
+        if select_func is not None and source is None:
+            raise ValueError(f"Site {name} has select_func but no source to select from")
+        if execution not in EXECUTION_MODES:
+            raise ValueError(f"Site {name} has invalid execution mode: {execution}")
+
         self.name = name
-        self.fetch = fetch_func
+        # Name of a shared source (see `register_source`) fetched in place of a fetch_func
+        self.source = source
+        # Derives this site's data from the shared source's data (e.g. filters a feed)
+        self.select = select_func
+        # Persistent SSE/WebSocket connection delivering events as they are published
+        self.stream = stream
+        if fetch_func is not None:
+            self.fetch = fetch_func
+        elif source is not None:
+            self.fetch = self._fetch_from_source
+        else:
+            self.fetch = self._fetch_from_stream
+        # Pipeline mode: fetch returns raw bytes and parse turns them into data in the shared
+        # process pool (unless marked with run_in_thread). It must be a top-level function
+        # returning plain picklable data (dicts, lists, tuples, str, numbers)
+        self.parse = parse_func
         self.compare = compare_func
         self.format = format_func
         self.description = description_func
         self.schedule = schedule_func
         self.display_name = display_name_func or description_func
+        # Default execution mode for compare/format callbacks not marked with run_in_thread/run_in_process
+        self.execution = execution
+
+    def uses_process_pool(self) -> bool:
+        """Whether any of the site's parse/compare/format callbacks runs in the shared process pool"""
+        from ..execution import get_execution_mode
+
+        if self.parse is not None and get_execution_mode(self.parse, "process") == "process":
+            return True
+        return any(get_execution_mode(func, self.execution) == "process" for func in (self.compare, self.format))
+
+    async def _fetch_from_source(self) -> Any:
+        """Fetch through the shared source and apply the site's selector"""
+        from ..sources import get_source
+
+        data = await get_source(self.source).fetch()
+        return self.select(data) if self.select else data
+
+    async def _fetch_from_stream(self) -> Any:
+        """Stream-only sites: the last event received (or the cache), so polling finds nothing new"""
+        from ..cache import load_cache
+
+        if self.stream.latest is not None:
+            return self.stream.latest
+        cached = load_cache(self.name)
+        return NOTHING_FETCHED if cached is None else cached
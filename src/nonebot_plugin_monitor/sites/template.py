@@ -6,7 +6,22 @@ To create a new site subscription:
 1. Copy this file and rename it (e.g., github.py, bilibili.py, etc.)
 2. Implement the required functions
 3. Create a SiteConfig instance with your functions
-4. Restart the bot to load the new site
+4. Save it in the sites directory. With `site_hot_reload` enabled it is loaded,
+   and reloaded on every later change, without restarting the bot; otherwise
+   restart the bot to load it
+
+Sites that read the same upstream (e.g. filtered views of one feed) should
+share it instead of fetching it separately:
+    register_source("example_feed", fetch_template_data)
+    site = SiteConfig(name=..., fetch_func=None, source="example_feed", select_func=lambda data: ..., ...)
+
+compare/format run on the bot's event loop by default. Expensive callbacks can
+be async, or be decorated with @run_in_thread / @run_in_process (top-level
+functions with picklable arguments only) so they do not block other commands.
+
+For CPU-heavy parsing of large pages, let fetch return raw bytes (e.g. with
+`fetch_bytes` from `..fetch`) and pass a top-level `parse_func(raw) -> data`
+to SiteConfig; it runs in the shared process pool and should return plain data.
 """
 
 from typing import Any
@@ -19,6 +34,11 @@ from . import SiteConfig
 async def fetch_template_data():
     """
     Fetch latest content from the source
+
+    For large JSON lists, prefer `fetch_json_items` from `..fetch`, which
+    enforces a body size limit and only decodes the first N items:
+        items = await fetch_json_items("https://api.example.com/latest", path="data.list", limit=20)
+
     Returns:
         Latest data from the source (e.g., dict, list, etc.)
     """
@@ -0,0 +1,112 @@
+"""Shared upstream sources
+
+Several logical sites can be built on top of the same upstream endpoint. A
+site declares the named source it reads from instead of fetching the URL
+itself; the source is fetched at most once per tick no matter how many sites
+use it. Concurrent callers share the in-flight request, and callers arriving
+within `ttl` seconds of a completed fetch reuse its result.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+import time
+from typing import Any
+
+from nonebot import logger
+
+from .config import plugin_config
+
+SourceFetchFunc = Callable[[], Awaitable[Any]]
+
+
+class SharedSource:
+    """A named upstream fetched once and fanned out to every site using it"""
+
+    def __init__(self, name: str, fetch_func: SourceFetchFunc, ttl: float | None = None):
+        self.name = name
+        self.fetch_func = fetch_func
+        self.ttl = plugin_config.source_cache_ttl if ttl is None else ttl
+        self._inflight: asyncio.Future | None = None
+        self._result: Any = None
+        self._fetched_at: float | None = None
+        # Statistics
+        self.fetch_count = 0
+        self.shared_count = 0
+
+    async def fetch(self) -> Any:
+        """Fetch the source, sharing in-flight and recent results between callers"""
+        if self._fetched_at is not None and time.monotonic() - self._fetched_at < self.ttl:
+            self.shared_count += 1
+            return self._result
+
+        if self._inflight is not None:
+            self.shared_count += 1
+            return await asyncio.shield(self._inflight)
+
+        loop = asyncio.get_running_loop()
+        self._inflight = future = loop.create_future()
+        self.fetch_count += 1
+        try:
+            result = await self.fetch_func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case no other caller is waiting
+            future.exception()
+            raise
+        else:
+            self._result = result
+            self._fetched_at = time.monotonic()
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight = None
+
+    def invalidate(self):
+        """Drop the cached result so the next call fetches again"""
+        self._result = None
+        self._fetched_at = None
+
+
+# Registry of shared sources: {source_name: SharedSource}
+sources: dict[str, SharedSource] = {}
+
+
+def _definition_of(func: SourceFetchFunc) -> tuple[str | None, str | None]:
+    return getattr(func, "__module__", None), getattr(func, "__qualname__", None)
+
+
+def register_source(name: str, fetch_func: SourceFetchFunc, ttl: float | None = None) -> SharedSource:
+    """
+    Register a shared source, or return the existing one with the same name
+
+    A fetch function with the same module and qualified name as the registered
+    one comes from a reloaded site module, and replaces the source.
+    Args:
+        name: Source name referenced by `SiteConfig(source=...)`
+        fetch_func: Async function fetching the upstream
+        ttl: Seconds a completed fetch is reused, defaults to `source_cache_ttl`
+    Returns:
+        The registered source
+    """
+    existing = sources.get(name)
+    if existing is not None:
+        if existing.fetch_func is fetch_func:
+            return existing
+        if _definition_of(existing.fetch_func) != _definition_of(fetch_func):
+            logger.warning(f"共享数据源 {name} 已注册，忽略新的抓取函数")
+            return existing
+        logger.debug(f"共享数据源 {name} 的抓取函数已重新加载")
+    sources[name] = SharedSource(name, fetch_func, ttl)
+    return sources[name]
+
+
+def get_source(name: str) -> SharedSource:
+    """
+    Get a registered shared source
+    Raises:
+        KeyError: If no source with this name is registered
+    """
+    return sources[name]
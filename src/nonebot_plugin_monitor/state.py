@@ -0,0 +1,188 @@
+"""Startup state snapshot
+
+With `startup_snapshot`, the plugin periodically writes its warm state to one
+file in the cache directory: subscriptions, the decoded cache of every site,
+the next run time of every site job and the origins the shared HTTP client
+talked to. On startup the snapshot is read in one go instead of one file per
+site. Every entry carries the size and modification time of the file it was
+read from and is dropped if that file changed since, so a stale snapshot only
+costs the reads it would have saved.
+
+Everything else (importing lazily registered site modules, re-opening
+connections, reading caches missing from the snapshot) is warmed in the
+background, concurrently and within `startup_warmup_budget`; checks that run
+before the warm-up finishes simply do the work themselves.
+"""
+
+import asyncio
+from pathlib import Path
+import time
+from typing import Any
+
+from nonebot import logger
+
+from .cache import (
+    decode_data,
+    encode_data,
+    file_signature,
+    get_cache_suffix,
+    get_memory_cache_entry,
+    load_cache,
+    prime_cache,
+    write_atomic,
+)
+from .config import plugin_config
+from .fetch import known_origins, warm_connections
+from .manager import subscription_manager
+from .scheduler import scheduler, scheduler_instance
+
+SNAPSHOT_VERSION = 1
+
+
+def get_snapshot_file() -> Path:
+    """Get the state snapshot file path"""
+    return plugin_config.cache_dir / f"state_snapshot{get_cache_suffix()}"
+
+
+def build_snapshot() -> dict[str, Any]:
+    """Collect the current warm state; only caches already held in memory are included"""
+    # Sharded subscriptions already load lazily and are not duplicated in the snapshot
+    subscriptions = None
+    if plugin_config.subscription_storage == "single":
+        try:
+            subscriptions = {
+                **file_signature(subscription_manager.data_file),
+                "data": subscription_manager.export_subscriptions(),
+            }
+        except OSError:
+            pass
+
+    caches = {}
+    next_run_times = {}
+    for site_name in scheduler_instance.site_configs:
+        entry = get_memory_cache_entry(site_name)
+        if entry is not None:
+            signature, data = entry
+            caches[site_name] = {**signature, "data": data}
+        job = scheduler.get_job(f"site_check_{site_name}")
+        if job is not None and job.next_run_time is not None:
+            next_run_times[site_name] = job.next_run_time.timestamp()
+
+    return {
+        "version": SNAPSHOT_VERSION,
+        "saved_at": time.time(),
+        "subscriptions": subscriptions,
+        "caches": caches,
+        "next_run_times": next_run_times,
+        "origins": sorted(known_origins),
+    }
+
+
+def write_snapshot(snapshot: dict[str, Any]) -> bool:
+    """Write a state snapshot"""
+    try:
+        write_atomic(get_snapshot_file(), encode_data(snapshot))
+        return True
+    except Exception as e:
+        logger.error(f"保存状态快照失败: {e}")
+        return False
+
+
+def save_state_snapshot() -> bool:
+    """Write the current state snapshot"""
+    start = time.perf_counter()
+    snapshot = build_snapshot()
+    if not write_snapshot(snapshot):
+        return False
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    logger.debug(f"状态快照已保存: {len(snapshot['caches'])} 个站点缓存 ({elapsed_ms:.1f}ms)")
+    return True
+
+
+async def save_state_snapshot_periodically():
+    """Scheduled job: collect the snapshot on the event loop, encode and write it in a thread"""
+    await asyncio.to_thread(write_snapshot, build_snapshot())
+
+
+def load_state_snapshot() -> dict[str, Any] | None:
+    """Read the state snapshot, or None if it is missing or unreadable"""
+    snapshot_file = get_snapshot_file()
+    try:
+        if not snapshot_file.exists():
+            return None
+        snapshot = decode_data(snapshot_file.read_bytes())
+    except Exception as e:
+        logger.warning(f"加载状态快照失败: {e}")
+        return None
+    if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+        logger.warning("状态快照版本不匹配，已忽略")
+        return None
+    return snapshot
+
+
+def restore_subscriptions(snapshot: dict[str, Any] | None) -> dict[str, dict[str, list[str]]] | None:
+    """Get the snapshot's subscriptions if the subscription file has not changed since"""
+    entry = (snapshot or {}).get("subscriptions")
+    if not entry or plugin_config.subscription_storage != "single":
+        return None
+    try:
+        if file_signature(subscription_manager.data_file) != {"size": entry["size"], "mtime_ns": entry["mtime_ns"]}:
+            return None
+    except OSError:
+        return None
+    return entry["data"]
+
+
+def restore_state(snapshot: dict[str, Any]) -> int:
+    """
+    Seed site caches and job run times from a snapshot (before sites are loaded)
+    Returns:
+        Number of site caches restored
+    """
+    restored = 0
+    for site_name, entry in snapshot.get("caches", {}).items():
+        signature = {"size": entry["size"], "mtime_ns": entry["mtime_ns"]}
+        restored += prime_cache(site_name, entry["data"], signature)
+    scheduler_instance.resume_times.update(snapshot.get("next_run_times", {}))
+    return restored
+
+
+async def _prefill_caches(concurrency: int) -> int:
+    """Read the caches of sites that the snapshot did not cover"""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    missing = [name for name in scheduler_instance.site_configs if get_memory_cache_entry(name) is None]
+
+    async def load(site_name: str):
+        async with semaphore:
+            await asyncio.to_thread(load_cache, site_name)
+
+    await asyncio.gather(*(load(site_name) for site_name in missing))
+    return len(missing)
+
+
+async def warm_up(snapshot: dict[str, Any] | None, started: float):
+    """
+    Warm site modules, connections and caches concurrently within the startup budget
+    Args:
+        snapshot: Restored state snapshot, if any
+        started: `time.perf_counter()` when the plugin started initializing
+    """
+    concurrency = plugin_config.startup_warmup_concurrency
+    tasks = [asyncio.create_task(scheduler_instance.warm_up_sites())]
+    if snapshot is not None:
+        tasks.append(asyncio.create_task(warm_connections(snapshot.get("origins", []), concurrency)))
+        tasks.append(asyncio.create_task(_prefill_caches(concurrency)))
+
+    budget = plugin_config.startup_warmup_budget or None
+    done, pending = await asyncio.wait(tasks, timeout=budget)
+    for task in pending:
+        task.cancel()
+    for task in done:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"启动预热出错: {task.exception()}")
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if pending:
+        logger.warning(f"启动预热超出预算 {budget} 秒，剩余工作将在首次检查时完成 (已耗时 {elapsed_ms:.1f}ms)")
+    else:
+        logger.success(f"启动预热完成，插件就绪耗时 {elapsed_ms:.1f}ms")
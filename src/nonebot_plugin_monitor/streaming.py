@@ -0,0 +1,199 @@
+"""Streaming sources: sites updated over a persistent SSE or WebSocket connection
+
+A site created with `stream=StreamSource(...)` keeps one connection open while
+the bot is connected. Every event is parsed into the site's data and run
+through compare → format → deliver on its own, in the order received, just
+like pushed data. The connection is re-opened with exponential backoff when
+it fails or stays silent longer than `heartbeat` seconds (SSE comments and
+WebSocket pings count as traffic); SSE reconnects send `Last-Event-ID`.
+
+For each site the time from publishing (as reported by `published_func`, or
+from receipt if there is none) to the end of delivery is tracked.
+
+WebSocket streams need the `websockets` package (`nonebot-plugin-monitor[websocket]`).
+"""
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable
+import json
+import random
+import time
+from typing import Any
+
+import httpx
+from nonebot import logger
+
+STREAM_KINDS = ("sse", "websocket")
+
+# Weight of the newest sample in the moving average latency
+LATENCY_SMOOTHING = 0.2
+
+
+class StreamSource:
+    """Persistent event stream feeding a site"""
+
+    def __init__(
+        self,
+        url: str,
+        kind: str = "sse",
+        parse_func: Callable[[str], Any] | None = None,
+        published_func: Callable[[Any], float | None] | None = None,
+        heartbeat: float = 60.0,
+        headers: dict[str, str] | None = None,
+        backoff_initial: float = 1.0,
+        backoff_max: float = 60.0,
+    ):
+        """
+        Args:
+            url: SSE endpoint (http/https) or WebSocket URL (ws/wss)
+            kind: "sse" or "websocket"
+            parse_func: Turns an event's data (text) into the site's data, JSON by default
+            published_func: Unix time an event was published, used to track latency
+            heartbeat: Seconds without any traffic after which the connection is re-opened
+            headers: Extra request headers
+            backoff_initial: First reconnect delay in seconds, doubled on every failure
+            backoff_max: Longest reconnect delay in seconds
+        """
+        if kind not in STREAM_KINDS:
+            raise ValueError(f"Invalid stream kind: {kind}")
+        self.url = url
+        self.kind = kind
+        self.parse = parse_func or json.loads
+        self.published = published_func
+        self.heartbeat = heartbeat
+        self.headers = headers or {}
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+
+        # Runtime state
+        self.connected = False
+        self.latest: Any = None  # Data of the last event received
+        self.last_event_id: str | None = None
+        self.events = 0
+        self.reconnects = 0
+        self.last_latency: float | None = None
+        self.average_latency: float | None = None
+
+    def record_latency(self, latency: float):
+        """Track publish-to-delivery latency"""
+        self.last_latency = latency
+        if self.average_latency is None:
+            self.average_latency = latency
+        else:
+            self.average_latency += LATENCY_SMOOTHING * (latency - self.average_latency)
+
+    def status(self) -> str:
+        """One-line summary for status output"""
+        state = "已连接" if self.connected else "重连中"
+        latency = f", 平均延迟 {self.average_latency:.2f}s" if self.average_latency is not None else ""
+        return f"{state}, 事件 {self.events}, 重连 {self.reconnects}{latency}"
+
+
+async def _with_heartbeat(iterator: AsyncIterator[Any], heartbeat: float) -> AsyncIterator[Any]:
+    """Iterate, raising asyncio.TimeoutError when nothing arrives for `heartbeat` seconds"""
+    while True:
+        try:
+            item = await asyncio.wait_for(anext(iterator), heartbeat)
+        except StopAsyncIteration:
+            return
+        yield item
+
+
+async def iter_sse(stream: StreamSource) -> AsyncIterator[str]:
+    """Connect to an SSE endpoint and yield the data of each event"""
+    headers = {"Accept": "text/event-stream", "Cache-Control": "no-cache", **stream.headers}
+    if stream.last_event_id is not None:
+        headers["Last-Event-ID"] = stream.last_event_id
+    timeout = httpx.Timeout(10.0, read=None)
+    async with (
+        httpx.AsyncClient(timeout=timeout) as client,
+        client.stream("GET", stream.url, headers=headers) as response,
+    ):
+        response.raise_for_status()
+        stream.connected = True
+        data_lines: list[str] = []
+        event_id = None
+        async for line in _with_heartbeat(response.aiter_lines(), stream.heartbeat):
+            if not line:
+                # A blank line dispatches the event
+                if event_id is not None:
+                    stream.last_event_id = event_id
+                    event_id = None
+                if data_lines:
+                    yield "\n".join(data_lines)
+                    data_lines = []
+                continue
+            if line.startswith(":"):
+                continue  # Comment, used as a keep-alive
+            field, _, value = line.partition(":")
+            value = value.removeprefix(" ")
+            if field == "data":
+                data_lines.append(value)
+            elif field == "id":
+                event_id = value
+
+
+async def iter_websocket(stream: StreamSource) -> AsyncIterator[str]:
+    """Connect to a WebSocket endpoint and yield each text message"""
+    try:
+        from websockets.asyncio.client import connect
+    except ImportError as e:
+        raise RuntimeError("WebSocket 流式数据源需要安装 nonebot-plugin-monitor[websocket]") from e
+
+    async with connect(
+        stream.url,
+        additional_headers=stream.headers,
+        ping_interval=stream.heartbeat,
+        ping_timeout=stream.heartbeat,
+    ) as websocket:
+        stream.connected = True
+        async for message in websocket:
+            yield message if isinstance(message, str) else message.decode("utf-8")
+
+
+async def run_stream(site_name: str, stream: StreamSource, on_event: Callable[[Any], Awaitable[Any]]):
+    """
+    Keep a site's stream connected until cancelled, handing each event's data to `on_event`
+    Args:
+        site_name: Name of the site
+        stream: The site's stream
+        on_event: Processes one event's data; the next event is read once it returns
+    """
+    backoff = stream.backoff_initial
+    iterate = iter_sse if stream.kind == "sse" else iter_websocket
+    while True:
+        try:
+            logger.info(f"正在连接站点 {site_name} 的流式数据源: {stream.url}")
+            async for payload in iterate(stream):
+                backoff = stream.backoff_initial
+                received = time.time()
+                try:
+                    data = stream.parse(payload)
+                except Exception as e:
+                    logger.warning(f"站点 {site_name} 的流式事件解析失败: {e}")
+                    continue
+                stream.latest = data
+                stream.events += 1
+                # A failing event is logged and skipped; it must not drop the connection
+                try:
+                    published = stream.published(data) if stream.published else None
+                    await on_event(data)
+                except Exception as e:
+                    logger.warning(f"站点 {site_name} 的流式事件处理失败: {e}")
+                    continue
+                stream.record_latency(time.time() - (published or received))
+            logger.warning(f"站点 {site_name} 的流式连接已关闭")
+        except asyncio.CancelledError:
+            stream.connected = False
+            raise
+        except asyncio.TimeoutError:
+            logger.warning(f"站点 {site_name} 的流式连接超过 {stream.heartbeat} 秒无数据")
+        except Exception as e:
+            logger.warning(f"站点 {site_name} 的流式连接出错: {e}")
+        stream.connected = False
+        stream.reconnects += 1
+        # Jitter keeps many streams from reconnecting in lockstep
+        delay = backoff * random.uniform(0.5, 1.0)
+        logger.info(f"{delay:.1f} 秒后重连站点 {site_name} 的流式数据源")
+        await asyncio.sleep(delay)
+        backoff = min(backoff * 2, stream.backoff_max)
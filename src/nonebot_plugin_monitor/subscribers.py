@@ -0,0 +1,133 @@
+"""Compact subscriber id sets
+
+QQ user and group ids are integers, and keeping each one as its own `str`
+object costs roughly 60 bytes per subscription plus a list slot. A
+`SubscriberSet` stores numeric ids in a sorted `array("q")` (8 bytes each) and
+looks them up by bisection. Ids that are not canonical integers (e.g. other
+platforms' string ids, or ones with leading zeros) are kept as strings in a
+small sorted side list, so every id round-trips unchanged.
+
+Members are returned as `int` for numeric ids and `str` otherwise, so sending
+code does not have to parse the id again for every notification.
+"""
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+import sys
+
+Member = int | str
+
+
+def _as_int(member: Member) -> int | None:
+    """The integer form of an id, or None if it must be kept as a string"""
+    if isinstance(member, int):
+        return member if -(2**63) <= member < 2**63 else None
+    if member.isascii() and member.isdigit() and (member == "0" or member[0] != "0") and len(member) < 19:
+        return int(member)
+    return None
+
+
+class SubscriberSet:
+    """Set of subscriber ids backed by a sorted int64 array"""
+
+    __slots__ = ("_ids", "_others")
+
+    def __init__(self, members: Iterable[Member] = ()):
+        members = list(members)
+        # Fast path: every id is a canonical integer string, converted in bulk
+        try:
+            numbers = list(map(int, members))
+            if list(map(str, numbers)) == members:
+                self._ids = array("q", sorted(set(numbers)))
+                self._others: list[str] = []
+                return
+        except (ValueError, TypeError, OverflowError):
+            pass
+
+        ids: set[int] = set()
+        others: set[str] = set()
+        for member in members:
+            number = _as_int(member)
+            if number is None:
+                others.add(str(member))
+            else:
+                ids.add(number)
+        self._ids = array("q", sorted(ids))
+        self._others = sorted(others)
+
+    def __contains__(self, member: object) -> bool:
+        if not isinstance(member, int | str):
+            return False
+        number = _as_int(member)
+        if number is None:
+            items, key = self._others, str(member)
+        else:
+            items, key = self._ids, number
+        index = bisect_left(items, key)
+        return index < len(items) and items[index] == key
+
+    def __len__(self) -> int:
+        return len(self._ids) + len(self._others)
+
+    def __iter__(self) -> Iterator[Member]:
+        yield from self._ids
+        yield from self._others
+
+    def __repr__(self) -> str:
+        return f"SubscriberSet({self.members()!r})"
+
+    def add(self, member: Member) -> bool:
+        """Add an id; returns False if it was already present"""
+        number = _as_int(member)
+        items, key = (self._others, str(member)) if number is None else (self._ids, number)
+        index = bisect_left(items, key)
+        if index < len(items) and items[index] == key:
+            return False
+        items.insert(index, key)
+        return True
+
+    def discard(self, member: Member) -> bool:
+        """Remove an id if present; returns False if it was not"""
+        number = _as_int(member)
+        items, key = (self._others, str(member)) if number is None else (self._ids, number)
+        index = bisect_left(items, key)
+        if index < len(items) and items[index] == key:
+            del items[index]
+            return True
+        return False
+
+    def remove(self, member: Member):
+        """Remove an id, raising ValueError if it is not present (like list.remove)"""
+        if not self.discard(member):
+            raise ValueError(f"{member!r} not in SubscriberSet")
+
+    def members(self) -> list[Member]:
+        """All ids, numeric ones as int"""
+        return self._ids.tolist() + self._others
+
+    def to_list(self) -> list[str]:
+        """All ids as strings, for storage"""
+        return [str(number) for number in self._ids] + self._others
+
+    def memory_size(self) -> int:
+        """Approximate bytes used by the set and its members"""
+        return (
+            sys.getsizeof(self._ids) + sys.getsizeof(self._others) + sum(sys.getsizeof(other) for other in self._others)
+        )
+
+    @staticmethod
+    def union(*subscriber_sets: "SubscriberSet") -> list[Member]:
+        """Deduplicated ids of several sets, numeric ids in ascending order"""
+        non_empty = [subscriber_set for subscriber_set in subscriber_sets if subscriber_set]
+        if not non_empty:
+            return []
+        if len(non_empty) == 1:
+            return non_empty[0].members()
+        # Concatenate the sorted arrays; sorting merges the runs in linear time
+        ids = array("q")
+        others: list[str] = []
+        for subscriber_set in non_empty:
+            ids += subscriber_set._ids
+            others += subscriber_set._others
+        return list(dict.fromkeys(sorted(ids))) + list(dict.fromkeys(sorted(others)))
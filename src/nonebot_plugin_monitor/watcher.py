@@ -0,0 +1,81 @@
+"""Sites directory watcher for hot reloading site modules
+
+Uses `watchfiles` (inotify/FSEvents) when it is installed, via the `watch`
+extra, and falls back to polling file sizes and modification times otherwise.
+Either way, every change notification triggers a rescan, and only files whose
+signature changed are reloaded.
+"""
+
+import asyncio
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from nonebot import logger
+
+from .declarative import DEFINITION_SUFFIXES
+from .registry import file_signature
+
+if TYPE_CHECKING:
+    from .scheduler import Scheduler
+
+
+def is_site_file(file_path: Path) -> bool:
+    """Whether a file in the sites directory defines a loadable site"""
+    if file_path.stem == "template" or file_path.name == "__init__.py":
+        return False
+    return file_path.suffix == ".py" or file_path.suffix in DEFINITION_SUFFIXES
+
+
+class SiteWatcher:
+    """Reload sites whose files change in a directory"""
+
+    def __init__(self, scheduler: "Scheduler", directory: Path, interval: float):
+        self.scheduler = scheduler
+        self.directory = directory
+        self.interval = interval
+        self.signatures = self.scan()
+
+    def scan(self) -> dict[Path, dict[str, int]]:
+        """Current signatures of all site files"""
+        signatures = {}
+        for file_path in self.directory.iterdir():
+            if is_site_file(file_path):
+                try:
+                    signatures[file_path] = file_signature(file_path)
+                except FileNotFoundError:
+                    continue
+        return signatures
+
+    async def apply_changes(self) -> list[Path]:
+        """
+        Reload changed and new site files and unload removed ones
+        Returns:
+            Paths that changed
+        """
+        current = self.scan()
+        changed = [path for path, signature in current.items() if self.signatures.get(path) != signature]
+        removed = [path for path in self.signatures if path not in current]
+        for file_path in sorted(changed):
+            # A file that fails to load keeps the old version active until it changes again
+            await self.scheduler.reload_site_file(file_path)
+        for file_path in removed:
+            self.scheduler.remove_site_file(file_path)
+        self.signatures = current
+        return changed + removed
+
+    async def run(self):
+        """Watch until cancelled"""
+        try:
+            from watchfiles import awatch
+        except ImportError:
+            awatch = None
+
+        if awatch is not None:
+            logger.info(f"正在监视站点目录 (watchfiles): {self.directory}")
+            async for _ in awatch(self.directory, debounce=int(self.interval * 1000)):
+                await self.apply_changes()
+        else:
+            logger.info(f"正在监视站点目录 (每 {self.interval} 秒轮询): {self.directory}")
+            while True:
+                await asyncio.sleep(self.interval)
+                await self.apply_changes()
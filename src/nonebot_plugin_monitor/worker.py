@@ -0,0 +1,41 @@
+"""Process pool worker bootstrap
+
+Every pool worker runs this file (by path, see `execution.get_process_pool`)
+before it unpickles any site callback. Importing anything from this package
+needs NoneBot to be initialized and the plugin loaded, so the bootstrap must
+not be part of the package's import graph itself.
+
+Workers started with `forkserver` or `spawn` first re-import the bot's
+`__main__`. A standard `bot.py` initializes NoneBot and loads its plugins at
+top level, so both steps are skipped when they already happened. The parent
+passes the `sites` package path, which includes `extra_site_dirs`, so site
+modules from extra directories can be imported by reference here as well.
+"""
+
+import nonebot
+
+PLUGIN_NAME = "nonebot_plugin_monitor"
+
+
+def bootstrap_worker(site_dirs: list[str]):
+    """
+    Initialize NoneBot and load the plugin unless the worker's `__main__` already did
+    Args:
+        site_dirs: The parent's `sites` package path
+    """
+    try:
+        nonebot.get_driver()
+    except ValueError:
+        nonebot.init()
+    if nonebot.get_plugin(PLUGIN_NAME) is None:
+        nonebot.load_plugin(PLUGIN_NAME)
+
+    from nonebot_plugin_monitor import sites
+
+    for site_dir in site_dirs:
+        if site_dir not in sites.__path__:
+            sites.__path__.append(site_dir)
+
+
+if __name__ == "__monitor_worker__":
+    bootstrap_worker(SITE_DIRS)  # noqa: F821 - passed in by the pool initializer
@@ -1,4 +1,6 @@
 import os
+import shutil
+import tempfile
 
 import nonebot
 from nonebot.adapters.onebot.v11 import Adapter as OnebotV11Adapter
@@ -6,6 +8,14 @@ import pytest
 from pytest_asyncio import is_async_test
 
 os.environ["ENVIRONMENT"] = "test"
+# 插件启动时会写入缓存和数据文件，测试期间不要写进仓库
+_localstore_dir = tempfile.mkdtemp(prefix="nonebot_plugin_monitor_test_")
+for _kind in ("cache", "data", "config"):
+    os.environ[f"LOCALSTORE_{_kind.upper()}_DIR"] = os.path.join(_localstore_dir, _kind)
+
+
+def pytest_sessionfinish():
+    shutil.rmtree(_localstore_dir, ignore_errors=True)
 
 
 def pytest_collection_modifyitems(items: list[pytest.Item]):
@@ -23,3 +33,69 @@ async def after_nonebot_init(after_nonebot_init: None):
 
     # 加载插件
     nonebot.load_from_toml("pyproject.toml")
+
+
+@pytest.fixture
+def make_site():
+    """Factory for test sites: fetch returns None, any change is an update, checked hourly"""
+    from nonebot_plugin_monitor.sites import SiteConfig
+
+    def make(name: str, fetch_func=None, *, compare_func=None, format_func=str, schedule="interval:3600", **kwargs):
+        if fetch_func is None and "stream" not in kwargs and "source" not in kwargs:
+
+            async def fetch_func():
+                return None
+
+        return SiteConfig(
+            name=name,
+            fetch_func=fetch_func,
+            compare_func=compare_func or (lambda cached, latest: cached != latest),
+            format_func=format_func,
+            description_func=lambda: name,
+            schedule_func=lambda: schedule,
+            **kwargs,
+        )
+
+    return make
+
+
+@pytest.fixture
+def isolated_scheduler(tmp_path, monkeypatch):
+    """The plugin's scheduler without sites or checks in flight, caching into a temporary directory"""
+    from nonebot_plugin_monitor.config import plugin_config
+    from nonebot_plugin_monitor.last_checks import LastCheckStore
+    from nonebot_plugin_monitor.scheduler import scheduler_instance
+
+    monkeypatch.setattr(plugin_config, "cache_dir", tmp_path)
+    monkeypatch.setattr(plugin_config, "history_max_entries", 0)
+    monkeypatch.setattr(plugin_config, "seed_missing_cache", False)
+    for attribute in (
+        "site_configs",
+        "display_name_to_site_name",
+        "running_checks",
+        "active_checks",
+        "pending_resumes",
+        "stream_tasks",
+        "manifest",
+        "entry_points",
+    ):
+        monkeypatch.setattr(scheduler_instance, attribute, {})
+    monkeypatch.setattr(scheduler_instance, "streaming", False)
+    monkeypatch.setattr(scheduler_instance, "accepting_checks", True)
+    last_checks = LastCheckStore()
+    monkeypatch.setattr(scheduler_instance, "last_checks", last_checks)
+    yield scheduler_instance
+    last_checks.flush(tmp_path / "last_checks.json")
+
+
+@pytest.fixture
+def sent_notifications(isolated_scheduler, monkeypatch):
+    """(subscriber, message) pairs sent by the isolated scheduler instead of a bot"""
+    sent = []
+
+    async def send(subscribers, message):
+        sent.extend((subscriber, message) for subscriber in subscribers)
+        return subscribers
+
+    monkeypatch.setattr(isolated_scheduler, "_send_notifications", send)
+    return sent
@@ -0,0 +1,73 @@
+"""Tests for cache codecs and legacy cache migration"""
+
+import json
+
+import pytest
+
+SAMPLE = {"update_count": 3, "title": "标题", "items": [{"id": 1, "tags": ["a", "b"]}, {"id": 2, "score": 1.5}]}
+
+
+@pytest.fixture
+def cache_config(tmp_path, monkeypatch):
+    from nonebot_plugin_monitor.config import plugin_config
+
+    monkeypatch.setattr(plugin_config, "cache_dir", tmp_path)
+    monkeypatch.setattr(plugin_config, "cache_codec", "json")
+    monkeypatch.setattr(plugin_config, "cache_compression", "none")
+    return plugin_config
+
+
+@pytest.mark.parametrize("codec", ["json", "orjson", "msgpack"])
+def test_cache_roundtrip(cache_config, monkeypatch, codec):
+    if codec != "json":
+        pytest.importorskip(codec)
+    from nonebot_plugin_monitor.cache import get_cache_file, load_cache, save_cache
+
+    monkeypatch.setattr(cache_config, "cache_codec", codec)
+
+    assert load_cache("roundtrip") is None
+    assert save_cache("roundtrip", SAMPLE)
+    assert get_cache_file("roundtrip").exists()
+    assert load_cache("roundtrip") == SAMPLE
+
+
+def test_legacy_json_cache_is_migrated(cache_config, monkeypatch):
+    pytest.importorskip("msgpack")
+    from nonebot_plugin_monitor.cache import get_cache_file, load_cache
+
+    legacy_file = cache_config.cache_dir / "legacy_subscription.json"
+    legacy_file.write_text(json.dumps(SAMPLE, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    monkeypatch.setattr(cache_config, "cache_codec", "msgpack")
+
+    assert load_cache("legacy") == SAMPLE
+    assert not legacy_file.exists()
+    assert get_cache_file("legacy").name == "legacy_subscription.msgpack"
+    assert load_cache("legacy") == SAMPLE
+
+
+def test_unknown_codec_is_rejected():
+    from nonebot_plugin_monitor.cache import get_codec
+
+    with pytest.raises(ValueError, match="Unknown cache codec"):
+        get_codec("pickle")
+
+
+def test_zstd_roundtrip_and_migration(cache_config, monkeypatch):
+    pytest.importorskip("zstandard")
+    from nonebot_plugin_monitor.cache import get_cache_file, load_cache, save_cache
+
+    monkeypatch.setattr(cache_config, "cache_compression", "zstd")
+    assert save_cache("compressed", SAMPLE)
+    cache_file = get_cache_file("compressed")
+    assert cache_file.name == "compressed_subscription.json.zst"
+    assert cache_file.read_bytes()[:4] == b"\x28\xb5\x2f\xfd"  # zstd frame magic
+    assert load_cache("compressed") == SAMPLE
+
+    # An uncompressed legacy file is migrated into the compressed format
+    legacy_file = cache_config.cache_dir / "legacy_subscription.json"
+    legacy_file.write_text(json.dumps(SAMPLE, ensure_ascii=False, indent=2), encoding="utf-8")
+    assert load_cache("legacy") == SAMPLE
+    assert not legacy_file.exists()
+    assert get_cache_file("legacy").name == "legacy_subscription.json.zst"
+    assert load_cache("legacy") == SAMPLE
@@ -0,0 +1,84 @@
+"""Tests for catching up checks missed while the bot was down"""
+
+import asyncio
+from datetime import datetime
+import json
+import time
+
+import pytest
+
+
+def test_next_run_after():
+    from nonebot_plugin_monitor.scheduler import next_run_after, scheduler
+
+    tz = scheduler.timezone
+    previous = datetime(2026, 3, 2, 9, 30, 15, tzinfo=tz)
+    assert next_run_after("interval:60", previous) == datetime(2026, 3, 2, 9, 31, 15, tzinfo=tz)
+    assert next_run_after("*/5 * * * *", previous) == datetime(2026, 3, 2, 9, 35, tzinfo=tz)
+    assert next_run_after("0 9 * * *", previous) == datetime(2026, 3, 3, 9, 0, tzinfo=tz)
+    with pytest.raises(ValueError, match="Invalid cron"):
+        next_run_after("every minute", previous)
+
+
+def test_last_check_store_round_trip(tmp_path, monkeypatch):
+    from nonebot_plugin_monitor.config import plugin_config
+    from nonebot_plugin_monitor.last_checks import LastCheckStore
+
+    monkeypatch.setattr(plugin_config, "cache_dir", tmp_path)
+    store = LastCheckStore()
+    assert store.get("news") is None
+    store.record("news", 1000.0)
+    assert store.flush()
+
+    assert LastCheckStore().get("news") == 1000.0
+
+
+@pytest.mark.asyncio
+async def test_delayed_flush_writes_where_recorded(tmp_path, monkeypatch):
+    from nonebot_plugin_monitor import last_checks
+    from nonebot_plugin_monitor.config import plugin_config
+
+    monkeypatch.setattr(last_checks, "FLUSH_DELAY", 0.01)
+    with monkeypatch.context() as patch:
+        patch.setattr(plugin_config, "cache_dir", tmp_path / "recorded")
+        store = last_checks.LastCheckStore()
+        store.record("news", 1000.0)
+    monkeypatch.setattr(plugin_config, "cache_dir", tmp_path / "later")
+    await asyncio.sleep(0.05)
+
+    assert json.loads((tmp_path / "recorded" / "last_checks.json").read_text(encoding="utf-8")) == {"news": 1000.0}
+    assert not (tmp_path / "later").exists()
+
+
+@pytest.mark.asyncio
+async def test_overdue_sites_are_caught_up(tmp_path, make_site, monkeypatch):
+    from nonebot_plugin_monitor.config import plugin_config
+    from nonebot_plugin_monitor.scheduler import CHECK_UNCHANGED, Scheduler
+
+    monkeypatch.setattr(plugin_config, "cache_dir", tmp_path)
+    monkeypatch.setattr(plugin_config, "catch_up_concurrency", 3)
+    scheduler = Scheduler()
+    scheduler.site_configs = {
+        "fresh": make_site("fresh", schedule="interval:3600"),
+        "stale": make_site("stale", schedule="interval:60"),
+        "staler": make_site("staler", schedule="*/5 * * * *"),
+        "never": make_site("never", schedule="interval:60"),
+    }
+    now = time.time()
+    scheduler.last_checks.record("fresh", now - 120)
+    scheduler.last_checks.record("stale", now - 120)
+    scheduler.last_checks.record("staler", now - 3600)
+
+    assert scheduler.find_overdue_sites(now) == ["staler", "stale"]
+
+    requested = []
+
+    async def fake_check_sites(site_names, concurrency=None):
+        requested.append((site_names, concurrency))
+        return [(site_name, CHECK_UNCHANGED, 0.0, False) for site_name in site_names]
+
+    monkeypatch.setattr(scheduler, "check_sites", fake_check_sites)
+    await scheduler.catch_up_after_restart()
+    await scheduler.catch_up_after_restart()
+    assert requested == [(["staler", "stale"], 3)]
+    scheduler.last_checks.flush()
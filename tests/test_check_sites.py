@@ -0,0 +1,120 @@
+"""Tests for on-demand bulk site checks"""
+
+import asyncio
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_check_sites_respects_concurrency_limit(isolated_scheduler, make_site):
+    from nonebot_plugin_monitor.scheduler import CHECK_ERROR, CHECK_UPDATED
+
+    running = 0
+    peak = 0
+
+    def make_fetch(index: int):
+        async def fetch():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+            if index == 3:
+                raise RuntimeError("upstream down")
+            return {"value": index}
+
+        return fetch
+
+    for index in range(6):
+        isolated_scheduler.site_configs[f"bulk_{index}"] = make_site(f"bulk_{index}", make_fetch(index))
+
+    results = await isolated_scheduler.check_sites(concurrency=2)
+
+    assert peak == 2
+    assert [site_name for site_name, *_ in results] == [f"bulk_{index}" for index in range(6)]
+    assert [result for _, result, _, _ in results] == [CHECK_UPDATED] * 3 + [CHECK_ERROR] + [CHECK_UPDATED] * 2
+    assert all(elapsed > 0 for _, _, elapsed, _ in results)
+
+
+@pytest.mark.asyncio
+async def test_check_sites_coalesces_with_running_check(isolated_scheduler, make_site):
+    from nonebot_plugin_monitor.scheduler import CHECK_UNCHANGED, CHECK_UNREGISTERED, CHECK_UPDATED
+
+    calls = 0
+    release = asyncio.Event()
+
+    async def slow_fetch():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {"value": 1}
+
+    isolated_scheduler.site_configs["slow"] = make_site("slow", slow_fetch)
+
+    scheduled = asyncio.create_task(isolated_scheduler.check_site_updates("slow"))
+    await asyncio.sleep(0)
+    bulk = asyncio.create_task(isolated_scheduler.check_sites(["slow", "missing"]))
+    await asyncio.sleep(0.01)
+    release.set()
+
+    assert await scheduled == CHECK_UPDATED
+    results = await bulk
+    assert calls == 1
+    assert results[0][0] == "slow"
+    assert results[0][1] == CHECK_UPDATED
+    assert results[0][3] is True
+    assert results[1][1] == CHECK_UNREGISTERED
+    assert not isolated_scheduler.running_checks
+
+    # The next run sees the cached data
+    assert await isolated_scheduler.check_site_updates("slow") == CHECK_UNCHANGED
+
+
+@pytest.mark.asyncio
+async def test_slow_delivery_does_not_hold_fetch_workers(isolated_scheduler, make_site, monkeypatch):
+    from nonebot_plugin_monitor.manager import subscription_manager
+    from nonebot_plugin_monitor.scheduler import CHECK_UPDATED
+
+    release = asyncio.Event()
+    fetched: list[str] = []
+    delivered: list[str] = []
+
+    async def slow_send(subscribers, message):
+        await release.wait()
+        delivered.append(message)
+        return subscribers
+
+    monkeypatch.setattr(isolated_scheduler, "_send_notifications", slow_send)
+    monkeypatch.setattr(subscription_manager, "get_subscribers", lambda site_name: ["10001"])
+    deliver_stage = isolated_scheduler.pipeline.stages[-1]
+    monkeypatch.setattr(deliver_stage, "workers", 1)
+    await isolated_scheduler.pipeline.stop()
+
+    def make_fetch(name: str):
+        async def fetch():
+            fetched.append(name)
+            return {"name": name}
+
+        return fetch
+
+    for name in ("first", "second", "third"):
+        isolated_scheduler.site_configs[name] = make_site(name, make_fetch(name))
+
+    checks = asyncio.gather(*(isolated_scheduler.check_site_updates(name) for name in ("first", "second", "third")))
+    for _ in range(20):
+        await asyncio.sleep(0.01)
+        if isolated_scheduler.pipeline.stats()["deliver"]["queued"] == 2:
+            break
+
+    # All sites were fetched while the first delivery is still blocked
+    assert sorted(fetched) == ["first", "second", "third"]
+    assert delivered == []
+    stats = isolated_scheduler.pipeline.stats()
+    assert stats["deliver"]["busy"] == 1
+    assert stats["deliver"]["queued"] == 2
+
+    release.set()
+    assert await checks == [CHECK_UPDATED] * 3
+    assert len(delivered) == 3
+
+    await isolated_scheduler.pipeline.stop()
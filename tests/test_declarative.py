@@ -0,0 +1,128 @@
+"""Tests for declarative site definitions"""
+
+import pytest
+
+
+def test_compile_jsonpath():
+    from nonebot_plugin_monitor.declarative import compile_jsonpath
+
+    data = {"data": {"list": [{"id": 1, "tags": ["a"]}, {"id": 2, "tags": ["b", "c"]}]}, "meta": {"x": 1}}
+
+    assert compile_jsonpath("$.data.list[*]")(data) == data["data"]["list"]
+    assert compile_jsonpath("$.data.list[*].id")(data) == [1, 2]
+    assert compile_jsonpath("$['data'].list[-1].tags[0]")(data) == ["b"]
+    assert compile_jsonpath("$.missing[*]")(data) == []
+    assert compile_jsonpath("$.data.list[*]").stream_path == ("data", "list")
+    assert compile_jsonpath("$['a.b'].items[*]").stream_path == ("a.b", "items")
+    assert compile_jsonpath("$[*]").stream_path == ()
+    assert compile_jsonpath("$.data.list[*].id").stream_path is None
+    # .* also matches object values, so it is not streamed
+    assert compile_jsonpath("$.meta.*")(data) == [1]
+    assert compile_jsonpath("$.meta.*").stream_path is None
+    with pytest.raises(ValueError, match="Unsupported JSONPath"):
+        compile_jsonpath("$.data..list")
+
+
+def test_compiled_template():
+    from nonebot_plugin_monitor.declarative import CompiledTemplate
+
+    template = CompiledTemplate("{title} ({author.name}) {score:.1f}{missing}")
+    assert template.render({"title": "标题", "author": {"name": "张三"}, "score": 2}) == "标题 (张三) 2.0"
+
+
+@pytest.mark.asyncio
+async def test_definition_reports_only_new_items(tmp_path, monkeypatch):
+    from nonebot_plugin_monitor import declarative
+    from nonebot_plugin_monitor.cache import save_cache
+    from nonebot_plugin_monitor.config import plugin_config
+
+    monkeypatch.setattr(plugin_config, "cache_dir", tmp_path)
+    requested = []
+
+    async def fake_iter_json_items(url, *, path="", limit=None, method="GET", **kwargs):
+        requested.append((url, path, limit, method, kwargs))
+        for item in [{"id": 3, "title": "三"}, {"id": 2, "title": "二"}, {"id": 1, "title": "一"}][:limit]:
+            yield item
+
+    monkeypatch.setattr(declarative, "iter_json_items", fake_iter_json_items)
+
+    definition_file = tmp_path / "news.yaml"
+    definition_file.write_text(
+        "display_name: 快讯\n"
+        "schedule: interval:60\n"
+        "url: https://api.example.com/news\n"
+        "headers: {User-Agent: test}\n"
+        "items: $.data.list[*]\n"
+        "key: id\n"
+        "limit: 3\n"
+        "header: '【{display_name}】{count} 条'\n"
+        "template: '{title}'\n"
+        'separator: "\\n"\n',
+        encoding="utf-8",
+    )
+    site = declarative.load_definition(definition_file)
+    assert site.name == "news"
+    assert site.display_name() == "快讯"
+    assert site.schedule() == "interval:60"
+
+    latest = await site.fetch()
+    assert requested == [
+        ("https://api.example.com/news", ("data", "list"), 3, "GET", {"headers": {"User-Agent": "test"}})
+    ]
+    # New items are those missing from the compared data, not from whatever is on disk
+    save_cache("news", {"keys": ["3", "2", "1"], "items": []})
+    assert site.compare({"keys": ["2", "1"], "items": []}, latest) is True
+    assert latest["new"] == ["3"]
+    assert site.format(latest) == "【快讯】1 条\n三"
+
+    assert site.compare(latest, await site.fetch()) is False
+    assert site.compare(None, latest) is True
+    assert site.format(latest) == "【快讯】3 条\n三\n二\n一"
+
+
+@pytest.mark.asyncio
+async def test_css_definition(tmp_path, monkeypatch):
+    pytest.importorskip("bs4")
+    from nonebot_plugin_monitor import declarative
+    from nonebot_plugin_monitor.config import plugin_config
+
+    monkeypatch.setattr(plugin_config, "cache_dir", tmp_path)
+
+    async def fake_fetch_bytes(url, *, method="GET", **kwargs):
+        return b'<ul class="news"><li><a href="/a">A</a></li><li><a href="/b">B</a></li></ul>'
+
+    monkeypatch.setattr(declarative, "fetch_bytes", fake_fetch_bytes)
+
+    site = declarative.compile_definition(
+        {
+            "url": "https://example.com",
+            "css": "ul.news li",
+            "fields": {"title": "a", "url": "a@href"},
+            "key": "url",
+            "template": "{title} {url}",
+        },
+        "html_news",
+    )
+    latest = await site.fetch()
+    assert latest["items"] == [{"title": "A", "url": "/a"}, {"title": "B", "url": "/b"}]
+    assert site.format(latest) == "A /a\n\nB /b"
+
+
+def test_invalid_definition_is_rejected():
+    from nonebot_plugin_monitor.declarative import compile_definition
+
+    with pytest.raises(ValueError, match="missing 'key'"):
+        compile_definition({"url": "https://example.com", "items": "$[*]", "template": "{x}"}, "bad")
+    with pytest.raises(ValueError, match="exactly one"):
+        compile_definition({"url": "https://example.com", "key": "id", "template": "{x}"}, "bad")
+
+
+def test_template_definition_is_valid():
+    from pathlib import Path
+
+    from nonebot_plugin_monitor.declarative import load_definition
+
+    template = Path(__file__).parent.parent / "src" / "nonebot_plugin_monitor" / "sites" / "template.toml"
+    site = load_definition(template)
+    assert site.name == "template"
+    assert site.schedule() == "*/30 * * * *"
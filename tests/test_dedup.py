@@ -0,0 +1,91 @@
+"""Tests for cross-site near-duplicate suppression"""
+
+import pytest
+
+
+def test_simhash_is_close_for_near_duplicates():
+    from nonebot_plugin_monitor.dedup import hamming_distance, simhash
+
+    story = "央行宣布下调存款准备金率0.5个百分点，释放长期资金约1万亿元，以支持实体经济发展"
+    first = simhash(f"【财经快讯】\n{story}")
+    second = simhash(f"【要闻速递】 {story}。")
+    other = simhash("某科技公司发布新款手机，搭载自研芯片，售价较上一代下调三百元，下周正式开售")
+    assert simhash(story) == simhash(story)
+    assert hamming_distance(first, second) <= 8
+    assert hamming_distance(first, other) > 16
+
+
+def test_index_suppresses_per_subscriber_across_sites():
+    from nonebot_plugin_monitor.dedup import RecentFingerprints
+
+    index = RecentFingerprints(window=600, max_entries=100)
+    story = "Fed holds rates steady, signals two cuts later this year as inflation cools"
+    assert index.select("site_a", story, [1, 2], now=0) == [1, 2]
+    index.record("site_a", story, [1, 2], now=0)
+    # Same story from another site: only the new subscriber gets it
+    assert index.select("site_b", story, [2, 3], now=60) == [3]
+    index.record("site_b", story, [3], now=60)
+    # Updates of the same site are never suppressed
+    assert index.select("site_a", story, [1], now=90) == [1]
+    assert index.select("site_c", "Unrelated earnings report for a retailer", [1, 2], now=120) == [1, 2]
+    # Outside the window it is delivered again
+    assert index.select("site_c", story, [1, 2, 3], now=1000) == [1, 2, 3]
+    assert index.suppressed == 1
+
+
+def test_index_is_bounded():
+    from nonebot_plugin_monitor.dedup import RecentFingerprints
+
+    index = RecentFingerprints(window=600, max_entries=3)
+    for number in range(10):
+        index.record(f"site_{number}", f"headline number {number} about topic {number * 7919}", [1], now=number)
+    assert len(index) == 3
+    assert sum(len(bucket) for bucket in index.bands.values()) == 3 * len(index.band_ranges)
+
+
+def test_only_recorded_deliveries_suppress():
+    from nonebot_plugin_monitor.dedup import RecentFingerprints
+
+    index = RecentFingerprints(window=600, max_entries=100)
+    story = "Fed holds rates steady, signals two cuts later this year as inflation cools"
+    # Selecting alone does not record anything: a held or failed send must not suppress
+    assert index.select("site_a", story, [1, 2], now=0) == [1, 2]
+    assert index.select("site_b", story, [1, 2], now=10) == [1, 2]
+    index.record("site_b", story, [2], now=20)
+    assert index.select("site_a", story, [1, 2], now=30) == [1]
+    index.record("site_c", story, [], now=40)
+    assert len(index) == 1
+
+
+@pytest.mark.asyncio
+async def test_deliver_records_only_sent_subscribers(isolated_scheduler, make_site, monkeypatch):
+    from nonebot_plugin_monitor.dedup import RecentFingerprints
+    from nonebot_plugin_monitor.manager import subscription_manager
+    from nonebot_plugin_monitor.scheduler import CHECK_UPDATED
+
+    monkeypatch.setattr(isolated_scheduler, "recent_fingerprints", RecentFingerprints(600, 100))
+    monkeypatch.setattr(subscription_manager, "get_subscribers", lambda site_name: [10001, 10002])
+
+    story = "Fed holds rates steady, signals two cuts later this year as inflation cools"
+    attempts = []
+    sent = []
+
+    async def send(subscribers, message):
+        attempts.extend(subscribers)
+        # Sending to 10001 fails
+        delivered = [subscriber for subscriber in subscribers if subscriber != 10001]
+        sent.extend((subscriber, message) for subscriber in delivered)
+        return delivered
+
+    async def fetch():
+        return {"story": story}
+
+    monkeypatch.setattr(isolated_scheduler, "_send_notifications", send)
+    for name in ("first", "second"):
+        isolated_scheduler.site_configs[name] = make_site(name, fetch, format_func=lambda latest: latest["story"])
+
+    assert await isolated_scheduler.check_site_updates("first") == CHECK_UPDATED
+    assert await isolated_scheduler.check_site_updates("second") == CHECK_UPDATED
+    # 10001 never got the story, so the second site still tries it; 10002 is not sent a duplicate
+    assert attempts == [10001, 10002, 10001]
+    assert sent == [(10002, story)]
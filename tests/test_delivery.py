@@ -0,0 +1,108 @@
+"""Tests for delivery preferences and the deferred delivery dispatcher"""
+
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+TIMEZONE = ZoneInfo("Asia/Shanghai")
+
+
+@pytest.fixture
+def dispatcher(tmp_path, monkeypatch):
+    from nonebot_plugin_monitor.config import plugin_config
+    from nonebot_plugin_monitor.delivery import Dispatcher
+
+    monkeypatch.setattr(plugin_config, "cache_dir", tmp_path / "cache")
+    monkeypatch.setattr(plugin_config, "delivery_preferences_file", tmp_path / "delivery_preferences.json")
+    return Dispatcher(TIMEZONE, 30)
+
+
+def at(hour: int, minute: int = 0, day: int = 1) -> datetime:
+    return datetime(2026, 3, day, hour, minute, tzinfo=TIMEZONE)
+
+
+def test_quiet_hours_hold_and_batch(dispatcher):
+    from nonebot_plugin_monitor.delivery import DeliveryPolicy, parse_quiet_hours
+
+    dispatcher.set_policy("20001", DeliveryPolicy(quiet_hours=parse_quiet_hours("23:00-08:00")), is_group=True)
+    assert dispatcher.route(10001, "first", at(23, 30))
+    assert not dispatcher.route(20001, "first", at(23, 30))
+    assert not dispatcher.route(20001, "second", at(2, 0, day=2))
+    assert len(dispatcher) == 2
+
+    assert dispatcher.release_due(at(7, 59, day=2)) == []
+    assert dispatcher.release_due(at(8, 1, day=2)) == [("20001", "first\n\nsecond")]
+    assert dispatcher.route(20001, "third", at(9, 0, day=2))
+    assert len(dispatcher) == 0
+
+
+def test_interval_and_daily_limit(dispatcher):
+    from nonebot_plugin_monitor.delivery import DeliveryPolicy
+
+    dispatcher.set_policy("10001", DeliveryPolicy(min_interval=600))
+    assert dispatcher.route(10001, "a", at(10))
+    assert not dispatcher.route(10001, "b", at(10, 1))
+    assert not dispatcher.route(10001, "c", at(10, 5))
+    assert dispatcher.release_due(at(10, 9)) == []
+    assert dispatcher.release_due(at(10, 11)) == [("10001", "b\n\nc")]
+
+    dispatcher.set_policy("10002", DeliveryPolicy(max_per_day=1))
+    assert dispatcher.route("10002", "a", at(9))
+    assert not dispatcher.route("10002", "b", at(12))
+    assert dispatcher.release_due(at(23, 59)) == []
+    assert dispatcher.release_due(at(0, 1, day=2)) == [("10002", "b")]
+    # The released batch counts towards the new day's limit
+    assert not dispatcher.route("10002", "c", at(1, 0, day=2))
+
+
+def test_held_notifications_survive_restart(dispatcher):
+    from nonebot_plugin_monitor.delivery import DeliveryPolicy, Dispatcher
+
+    dispatcher.set_policy("10001", DeliveryPolicy(max_per_day=1))
+    dispatcher.set_policy("10002", DeliveryPolicy(max_per_day=1))
+    now = datetime.now(TIMEZONE)
+    for subscriber_id in ("10001", "10002"):
+        dispatcher.route(subscriber_id, "sent", now)
+        dispatcher.route(subscriber_id, "shared update", now)
+    assert dispatcher.save_pending()
+
+    restored = Dispatcher(TIMEZONE, 30)
+    restored.load_preferences()
+    restored.load_pending()
+    assert restored.get_policy("10001").describe() == "每日最多 1 条"
+    assert restored.pending == {"10001": ["shared update"], "10002": ["shared update"]}
+    assert restored.release_due(now) == []
+    released = restored.release_due(now.replace(hour=0, minute=1) + timedelta(days=1))
+    assert sorted(released) == [("10001", "shared update"), ("10002", "shared update")]
+    assert not restored.get_pending_file().exists()
+
+
+@pytest.mark.parametrize("min_interval", [float("inf"), float("nan"), 99999999999 * 60, -1])
+def test_out_of_range_interval_is_rejected(dispatcher, min_interval):
+    from nonebot_plugin_monitor.delivery import DeliveryPolicy
+
+    with pytest.raises(ValueError, match="间隔"):
+        DeliveryPolicy(min_interval=min_interval).validate()
+    with pytest.raises(ValueError, match="间隔"):
+        DeliveryPolicy.from_dict({"min_interval": min_interval})
+    with pytest.raises(ValueError, match="每日上限"):
+        DeliveryPolicy.from_dict({"max_per_day": 10**9})
+
+    # A policy that bypassed validation still routes without overflowing
+    dispatcher.set_policy("10001", DeliveryPolicy(min_interval=min_interval))
+    assert dispatcher.route(10001, "a", at(10))
+    dispatcher.route(10001, "b", at(10, 1))
+
+
+def test_invalid_stored_policy_is_skipped(dispatcher):
+    import json
+
+    from nonebot_plugin_monitor.delivery import Dispatcher
+
+    dispatcher.preferences_file.write_text(
+        json.dumps({"users": {"10001": {"min_interval": "inf"}, "10002": {"max_per_day": 3}}}), encoding="utf-8"
+    )
+    restored = Dispatcher(TIMEZONE, 30)
+    restored.load_preferences()
+    assert list(restored.preferences["users"]) == ["10002"]
@@ -0,0 +1,200 @@
+"""Tests for site callback execution strategies"""
+
+import os
+import threading
+
+import pytest
+
+
+def _render_pid(data: dict) -> tuple[int, str]:
+    return os.getpid(), f"{data['title']}"
+
+
+def _render_thread(data: dict) -> tuple[int, str]:
+    return threading.get_ident(), f"{data['title']}"
+
+
+@pytest.mark.asyncio
+async def test_call_site_func_strategies():
+    from nonebot_plugin_monitor.execution import call_site_func, get_execution_mode
+    from nonebot_plugin_monitor.sites import run_in_process, run_in_thread
+
+    async def async_compare(cached, latest):
+        return cached != latest
+
+    assert get_execution_mode(async_compare) == "async"
+    assert await call_site_func(async_compare, 1, 2) is True
+
+    ident, text = await call_site_func(_render_thread, {"title": "inline"})
+    assert ident == threading.get_ident()
+    assert text == "inline"
+
+    ident, _ = await call_site_func(_render_thread, {"title": "default"}, default="thread")
+    assert ident != threading.get_ident()
+
+    thread_render = run_in_thread(lambda data: (threading.get_ident(), data["title"]))
+    ident, _ = await call_site_func(thread_render, {"title": "thread"})
+    assert ident != threading.get_ident()
+
+    process_render = run_in_process(_render_pid)
+    assert get_execution_mode(process_render) == "process"
+    pid, text = await call_site_func(process_render, {"title": "process"})
+    assert pid != os.getpid()
+    assert text == "process"
+
+
+def test_site_config_rejects_unknown_execution_mode():
+    from nonebot_plugin_monitor.sites import SiteConfig
+
+    with pytest.raises(ValueError, match="execution mode"):
+        SiteConfig(
+            name="bad",
+            fetch_func=None,
+            source="feed",
+            compare_func=lambda cached, latest: True,
+            format_func=str,
+            description_func=lambda: "bad",
+            schedule_func=lambda: "interval:10",
+            execution="gpu",
+        )
+
+
+def _parse_listing(raw: bytes) -> dict:
+    import json
+
+    items = json.loads(raw)
+    return {"pid": os.getpid(), "ids": [item["id"] for item in items]}
+
+
+@pytest.mark.asyncio
+async def test_parse_func_runs_in_process_pool(isolated_scheduler, make_site):
+    import json
+
+    from nonebot_plugin_monitor.cache import load_cache
+    from nonebot_plugin_monitor.scheduler import CHECK_UPDATED
+
+    async def fetch_raw() -> bytes:
+        return json.dumps([{"id": i} for i in range(5)]).encode()
+
+    formatted = []
+
+    def format_listing(data: dict) -> str:
+        formatted.append(data)
+        return str(data["ids"])
+
+    isolated_scheduler.site_configs["pipeline"] = make_site(
+        "pipeline",
+        fetch_raw,
+        parse_func=_parse_listing,
+        compare_func=lambda cached, latest: cached is None or cached["ids"] != latest["ids"],
+        format_func=format_listing,
+    )
+
+    assert await isolated_scheduler.check_site_updates("pipeline") == CHECK_UPDATED
+    assert formatted[0]["ids"] == [0, 1, 2, 3, 4]
+    assert formatted[0]["pid"] != os.getpid()
+    # Workers are never forked from the multithreaded bot process
+    from nonebot_plugin_monitor.execution import get_process_pool
+
+    assert get_process_pool()._mp_context.get_start_method() in ("forkserver", "spawn")
+    assert load_cache("pipeline")["ids"] == [0, 1, 2, 3, 4]
+
+
+def _exit_worker(data: dict):
+    os._exit(1)
+
+
+@pytest.mark.asyncio
+async def test_broken_pool_is_replaced(monkeypatch):
+    from concurrent.futures.process import BrokenProcessPool
+
+    from nonebot_plugin_monitor import execution
+    from nonebot_plugin_monitor.config import plugin_config
+    from nonebot_plugin_monitor.sites import run_in_process
+
+    monkeypatch.setattr(plugin_config, "process_pool_workers", 1)
+    execution.restart_process_pool()
+    broken = execution.get_process_pool()
+    with pytest.raises(BrokenProcessPool):
+        await execution.call_site_func(run_in_process(_exit_worker), {})
+    assert execution.get_process_pool() is not broken
+    pid, _ = await execution.call_site_func(run_in_process(_render_pid), {"title": "again"})
+    assert pid != os.getpid()
+    execution.restart_process_pool()
+
+
+BOT_MAIN = """
+import asyncio
+import os
+
+import nonebot
+
+# Like a bot.py generated by nb-cli: NoneBot is set up at import time, so pool workers repeat it
+nonebot.init()
+nonebot.load_plugin("nonebot_plugin_monitor")
+
+
+def render(data):
+    return os.getpid(), data["title"]
+
+
+async def main():
+    from nonebot_plugin_monitor.execution import call_site_func, shutdown_process_pool
+    from nonebot_plugin_monitor.sites import run_in_process
+
+    try:
+        for title in ("first", "second"):
+            pid, text = await call_site_func(run_in_process(render), {"title": title})
+            assert pid != os.getpid()
+            print(f"rendered {text}")
+    finally:
+        shutdown_process_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+"""
+
+
+def test_pool_workers_start_under_a_bot_main_that_loads_plugins(tmp_path):
+    import subprocess
+    import sys
+
+    src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+    (tmp_path / "bot.py").write_text(BOT_MAIN, encoding="utf-8")
+    env = {
+        **os.environ,
+        "PYTHONPATH": src,
+        "LOCALSTORE_CACHE_DIR": str(tmp_path / "cache"),
+        "LOCALSTORE_DATA_DIR": str(tmp_path / "data"),
+        "LOCALSTORE_CONFIG_DIR": str(tmp_path / "config"),
+    }
+    result = subprocess.run(
+        [sys.executable, "bot.py"], cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120, check=False
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    rendered = [line.split()[1] for line in result.stdout.splitlines() if line.startswith("rendered ")]
+    assert rendered == ["first", "second"]
+
+
+@pytest.mark.asyncio
+async def test_extra_dir_sites_run_in_process_pool(tmp_path, monkeypatch):
+    import importlib
+    import sys
+
+    from nonebot_plugin_monitor import execution, sites
+    from nonebot_plugin_monitor.sites import run_in_process
+
+    (tmp_path / "ext_pool_probe.py").write_text(
+        "import os\n\n\ndef render(data):\n    return os.getpid(), data\n", encoding="utf-8"
+    )
+    monkeypatch.setattr(sites, "__path__", [*sites.__path__, str(tmp_path)])
+    execution.restart_process_pool()
+    try:
+        module = importlib.import_module("nonebot_plugin_monitor.sites.ext_pool_probe")
+        pid, data = await execution.call_site_func(run_in_process(module.render), "extra")
+        assert pid != os.getpid()
+        assert data == "extra"
+    finally:
+        execution.restart_process_pool()
+        sys.modules.pop("nonebot_plugin_monitor.sites.ext_pool_probe", None)
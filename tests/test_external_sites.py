@@ -0,0 +1,101 @@
+"""Tests for site discovery from extra directories and entry points"""
+
+from importlib.metadata import EntryPoint
+import sys
+
+import pytest
+
+SITE_SOURCE = """from {package} import SiteConfig
+
+
+async def fetch():
+    return 1
+
+
+site = SiteConfig(
+    name="{name}",
+    fetch_func=fetch,
+    compare_func=lambda cached, latest: cached != latest,
+    format_func=str,
+    description_func=lambda: "{name}",
+    schedule_func=lambda: "interval:3600",
+    display_name_func=lambda: "外部 {name}",
+)
+"""
+
+
+@pytest.fixture
+def fresh_scheduler(tmp_path, monkeypatch):
+    from nonebot_plugin_monitor import sites
+    from nonebot_plugin_monitor.config import plugin_config
+    from nonebot_plugin_monitor.scheduler import Scheduler
+
+    monkeypatch.setattr(plugin_config, "cache_dir", tmp_path / "cache")
+    monkeypatch.setattr(plugin_config, "lazy_site_loading", True)
+    monkeypatch.setattr(sites, "__path__", list(sites.__path__))
+    monkeypatch.setattr(Scheduler, "start_site_scheduling", lambda self, site_name: None)
+    yield Scheduler
+    for module_name in [name for name in sys.modules if "ext_probe" in name]:
+        del sys.modules[module_name]
+
+
+def test_extra_site_dir(fresh_scheduler, tmp_path, monkeypatch):
+    from nonebot_plugin_monitor.config import plugin_config
+
+    extra_dir = tmp_path / "my_sites"
+    extra_dir.mkdir()
+    (extra_dir / "ext_probe_dir.py").write_text(SITE_SOURCE.format(package=".", name="ext_probe_dir"), "utf-8")
+    # Same name as a built-in site: skipped
+    (extra_dir / "example.py").write_text("raise RuntimeError('should not be imported')\n", "utf-8")
+    monkeypatch.setattr(plugin_config, "extra_site_dirs", [extra_dir])
+
+    scheduler = fresh_scheduler()
+    loaded = scheduler.load_site_modules()
+    assert "ext_probe_dir" in loaded
+    assert loaded.count("example") == 1
+    assert scheduler.get_site_name_by_display_name("外部 ext_probe_dir") == "ext_probe_dir"
+    assert scheduler.site_files[extra_dir / "ext_probe_dir.py"] == "ext_probe_dir"
+
+
+@pytest.mark.asyncio
+async def test_entry_point_sites_use_cached_discovery(fresh_scheduler, tmp_path, monkeypatch):
+    from nonebot_plugin_monitor import registry
+    from nonebot_plugin_monitor.registry import LazySiteConfig
+    from nonebot_plugin_monitor.sites import SiteConfig
+
+    package_dir = tmp_path / "packages"
+    package_dir.mkdir()
+    source = SITE_SOURCE.format(package="nonebot_plugin_monitor.sites", name="ext_probe_ep")
+    (package_dir / "ext_probe_pkg.py").write_text(source, "utf-8")
+    monkeypatch.syspath_prepend(str(package_dir))
+
+    scans = 0
+
+    def fake_entry_points(group):
+        nonlocal scans
+        scans += 1
+        return [EntryPoint("ext_probe_ep", "ext_probe_pkg:site", group)]
+
+    monkeypatch.setattr(registry, "entry_points", fake_entry_points)
+
+    first = fresh_scheduler()
+    assert "ext_probe_ep" in first.load_site_modules()
+    assert isinstance(first.site_configs["ext_probe_ep"], SiteConfig)
+    assert scans == 1
+
+    # Unchanged environment: neither metadata scan nor import
+    del sys.modules["ext_probe_pkg"]
+    second = fresh_scheduler()
+    assert "ext_probe_ep" in second.load_site_modules()
+    assert scans == 1
+    assert isinstance(second.site_configs["ext_probe_ep"], LazySiteConfig)
+    assert "ext_probe_pkg" not in sys.modules
+    assert second.site_configs["ext_probe_ep"].display_name() == "外部 ext_probe_ep"
+
+    loaded = await second.ensure_site_loaded("ext_probe_ep")
+    assert isinstance(loaded, SiteConfig)
+
+    # Installing or removing a distribution changes a sys.path directory
+    (package_dir / "new_dist-1.0.dist-info").mkdir()
+    fresh_scheduler().load_site_modules()
+    assert scans == 2
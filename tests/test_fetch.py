@@ -0,0 +1,156 @@
+"""Tests for the streaming fetch helpers"""
+
+import json
+
+import pytest
+
+
+def _chunked_transport(body: bytes, chunk_size: int = 7, requested: list[int] | None = None):
+    import httpx
+
+    class _ChunkedStream(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            for start in range(0, len(body), chunk_size):
+                if requested is not None:
+                    requested.append(start)
+                yield body[start : start + chunk_size]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, stream=_ChunkedStream())
+
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.asyncio
+async def test_fetch_json_items_top_level_array():
+    import httpx
+
+    from nonebot_plugin_monitor.fetch import fetch_json_items
+
+    items = [{"id": i, "title": f"标题 {i}", "tags": [i, None]} for i in range(20)]
+    body = json.dumps(items, ensure_ascii=False).encode("utf-8")
+
+    async with httpx.AsyncClient(transport=_chunked_transport(body)) as client:
+        result = await fetch_json_items("https://example.com/list", client=client)
+
+    assert result == items
+
+
+@pytest.mark.asyncio
+async def test_fetch_json_items_nested_path_and_limit_stops_early():
+    import httpx
+
+    from nonebot_plugin_monitor.fetch import fetch_json_items
+
+    payload = {
+        "status": {"code": 0, "msg": "ok"},
+        "data": {"total": 1000, "list": [{"id": i, "value": 1.5 * i} for i in range(1000)]},
+    }
+    body = json.dumps(payload).encode("utf-8")
+    requested: list[int] = []
+
+    async with httpx.AsyncClient(transport=_chunked_transport(body, 64, requested)) as client:
+        result = await fetch_json_items("https://example.com/list", path="data.list", limit=3, client=client)
+
+    assert result == payload["data"]["list"][:3]
+    # Only the beginning of the body should have been read
+    assert len(requested) < len(body) // 64 // 10
+
+
+@pytest.mark.asyncio
+async def test_fetch_json_items_key_sequence_path():
+    import httpx
+
+    from nonebot_plugin_monitor.fetch import fetch_json_items
+
+    payload = {"a": {"b": {"items": [0]}}, "a.b": {"items": [1, 2]}}
+    body = json.dumps(payload).encode("utf-8")
+
+    async with httpx.AsyncClient(transport=_chunked_transport(body)) as client:
+        result = await fetch_json_items("https://example.com/list", path=("a.b", "items"), client=client)
+
+    assert result == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_fetch_json_items_missing_path_returns_nothing():
+    import httpx
+
+    from nonebot_plugin_monitor.fetch import fetch_json_items
+
+    body = json.dumps({"data": {"other": [1, 2, 3]}}).encode("utf-8")
+    async with httpx.AsyncClient(transport=_chunked_transport(body)) as client:
+        result = await fetch_json_items("https://example.com/list", path="data.list", client=client)
+
+    assert result == []
+
+
+@pytest.mark.asyncio
+async def test_fetch_rejects_oversized_body():
+    import httpx
+
+    from nonebot_plugin_monitor.fetch import ResponseTooLargeError, fetch_bytes, fetch_json_items
+
+    body = json.dumps(list(range(1000))).encode("utf-8")
+    async with httpx.AsyncClient(transport=_chunked_transport(body)) as client:
+        with pytest.raises(ResponseTooLargeError):
+            await fetch_bytes("https://example.com/list", max_bytes=100, client=client)
+        with pytest.raises(ResponseTooLargeError):
+            await fetch_json_items("https://example.com/list", max_bytes=100, client=client)
+        assert await fetch_bytes("https://example.com/list", max_bytes=len(body), client=client) == body
+
+
+def test_incremental_decoder_handles_any_chunking():
+    from nonebot_plugin_monitor.fetch import _IncrementalArrayDecoder
+
+    document = {
+        "skip": {"text": 'a "quoted" ] } [ { \\ value', "list": [[1, 2], {"x": "]"}]},
+        "data": [{"id": 1, "title": 'he said "hi\\\\"'}, [1, [2, "]"]], "[{", 12.5, None, {"nested": {"deep": []}}],
+    }
+    text = json.dumps(document, ensure_ascii=False)
+    for chunk_size in range(1, 24):
+        decoder = _IncrementalArrayDecoder("data")
+        items = []
+        for start in range(0, len(text), chunk_size):
+            items.extend(decoder.feed(text[start : start + chunk_size]))
+        items.extend(decoder.feed("", final=True))
+        assert items == document["data"], chunk_size
+
+
+def test_incremental_decoder_decodes_large_items_once():
+    from nonebot_plugin_monitor.fetch import _IncrementalArrayDecoder
+
+    item = {"body": "x" * 200_000, "tags": list(range(2000))}
+    text = json.dumps([item, item])
+    decoder = _IncrementalArrayDecoder()
+    calls = []
+    raw_decode = decoder._decoder.raw_decode
+
+    def counting_raw_decode(buffer, position):
+        calls.append(position)
+        return raw_decode(buffer, position)
+
+    decoder._decoder.raw_decode = counting_raw_decode
+    items = []
+    for start in range(0, len(text), 1024):
+        items.extend(decoder.feed(text[start : start + 1024]))
+    items.extend(decoder.feed("", final=True))
+    assert items == [item, item]
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_fetch_size_limit_edge_cases():
+    import httpx
+
+    from nonebot_plugin_monitor.fetch import ResponseTooLargeError, fetch_bytes
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"Content-Length": "unknown"}, content=b"[1, 2]")
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        # A malformed Content-Length falls back to counting the streamed bytes
+        assert await fetch_bytes("https://example.com/list", client=client) == b"[1, 2]"
+        # An explicit limit of 0 is a limit, not "use the default"
+        with pytest.raises(ResponseTooLargeError):
+            await fetch_bytes("https://example.com/list", max_bytes=0, client=client)
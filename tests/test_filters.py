@@ -0,0 +1,81 @@
+"""Tests for per-subscription keyword filters"""
+
+import pytest
+
+
+def test_automaton_finds_overlapping_keywords():
+    from nonebot_plugin_monitor.filters import KeywordAutomaton
+
+    automaton = KeywordAutomaton(["he", "she", "his", "hers", "aapl"])
+    assert automaton.search("ushers") == {"she", "he", "hers"}
+    assert automaton.search("aaapl rally") == {"aapl"}
+    assert automaton.search("nothing") == set()
+
+
+def test_matcher_selects_subscribers():
+    from nonebot_plugin_monitor.filters import FilterMatcher, parse_filter
+
+    matcher = FilterMatcher({"1": ["aapl", "tsla"], "2": ["/\\bnvda\\b/"], "3": ["/q[1-4] earnings/"]})
+    subscribers = [1, 2, 3, 4]
+    assert matcher.select(subscribers, "AAPL beats estimates") == [1, 4]
+    assert matcher.select(subscribers, "NVDA and TSLA slide after Q3 earnings") == [1, 2, 3, 4]
+    assert matcher.select(subscribers, "NVDAX listing") == [4]
+
+    assert parse_filter(" Tesla ") == "tesla"
+    with pytest.raises(ValueError, match="正则"):
+        parse_filter("/[unclosed/")
+    with pytest.raises(ValueError, match="嵌套"):
+        parse_filter("/(a+)+$/")
+    with pytest.raises(ValueError, match="字符"):
+        parse_filter("x" * 101)
+
+
+def test_matcher_handles_regexes_that_cannot_be_combined():
+    from nonebot_plugin_monitor.filters import FilterMatcher, parse_filter
+
+    patterns = ["/(?i)abc/", "/(?P<t>nvda)/", "/(?P<t>tsla)/", "/(x)\\1/"]
+    for pattern in patterns:
+        assert parse_filter(pattern) == pattern
+    matcher = FilterMatcher({"1": patterns[:1], "2": patterns[1:3], "3": patterns[3:]})
+    assert matcher.combined_regex is None
+    assert matcher.select([1, 2, 3, 4], "ABC and TSLA") == [1, 2, 4]
+    assert matcher.select([1, 2, 3, 4], "xx") == [3, 4]
+    assert matcher.select([1, 2, 3, 4], "nothing") == [4]
+
+    # A backreference next to another expression must keep pointing at its own group
+    matcher = FilterMatcher({"1": ["/(a)z/"], "2": ["/(b)\\1/"]})
+    assert matcher.combined_regex is None
+    assert matcher.select([1, 2], "bb") == [2]
+    assert FilterMatcher({"1": ["/(?:a|b)z/", "/tsla/"]}).combined_regex is not None
+
+
+def test_manager_filters_persist_and_apply(tmp_path):
+    from nonebot_plugin_monitor.manager import SubscriptionManager
+
+    manager = SubscriptionManager()
+    manager.data_file = tmp_path / "subscriptions.json"
+    manager.filters_file = tmp_path / "filters.json"
+    manager.load_subscriptions()
+    manager.subscribe("10001", "news")
+    manager.subscribe("20001", "news", is_group=True)
+    manager.subscribe("30001", "全部", is_group=True)
+
+    assert manager.add_filters("10002", "news", ["aapl"]) is None
+    assert manager.add_filters("10001", "news", ["AAPL", "aapl", "/tsla|nvda/"]) == ["aapl", "/tsla|nvda/"]
+    assert manager.add_filters("30001", "全部", ["earnings"], is_group=True) == ["earnings"]
+
+    subscribers = manager.get_subscribers("news")
+    assert manager.filter_subscribers("news", subscribers, "NVDA earnings") == [10001, 20001, 30001]
+    assert manager.filter_subscribers("news", subscribers, "Weather") == [20001]
+
+    reloaded = SubscriptionManager()
+    reloaded.filters_file = manager.filters_file
+    reloaded.load_filters()
+    assert reloaded.get_filters("10001", "news") == ["aapl", "/tsla|nvda/"]
+
+    assert manager.remove_filters("10001", "news", ["AAPL"]) == 1
+    assert manager.filter_subscribers("news", subscribers, "AAPL") == [20001]
+    # Unsubscribing drops the subscription's filters
+    manager.unsubscribe("30001", "全部", is_group=True)
+    assert manager.get_filters("30001", "全部", is_group=True) == []
+    assert manager.filter_subscribers("news", manager.get_subscribers("news"), "Weather") == [20001]
@@ -0,0 +1,79 @@
+"""Tests for delta-encoded snapshot history"""
+
+import pytest
+
+
+def _snapshot(start: int, count: int = 30) -> dict:
+    return {
+        "updated": start,
+        "items": [{"id": i, "title": f"新闻 {i}"} for i in range(start + count, start, -1)],
+    }
+
+
+@pytest.fixture
+def history_dir(tmp_path, monkeypatch):
+    from nonebot_plugin_monitor.config import plugin_config
+
+    monkeypatch.setattr(plugin_config, "cache_dir", tmp_path)
+    monkeypatch.setattr(plugin_config, "cache_codec", "json")
+    monkeypatch.setattr(plugin_config, "cache_compression", "none")
+    return tmp_path
+
+
+@pytest.mark.parametrize(
+    ("old", "new"),
+    [
+        ({"a": 1, "b": [1, 2, 3]}, {"a": 2, "b": [0, 1, 2, 3], "c": None}),
+        ([{"id": 1}, {"id": 2}], [{"id": 3}, {"id": 1}]),
+        ({"a": {"b": {"c": 1}}}, {"a": {"b": {}}}),
+        ("text", {"now": "dict"}),
+        (1, 1.0),
+    ],
+)
+def test_delta_roundtrip(old, new):
+    from nonebot_plugin_monitor.history import apply_delta, make_delta
+
+    result = apply_delta(old, make_delta(old, new))
+    assert result == new
+    assert type(result) is type(new)
+
+
+def test_history_reconstructs_every_version(history_dir):
+    from nonebot_plugin_monitor.history import SnapshotHistory
+
+    history = SnapshotHistory("news", max_entries=50, max_age=0, base_interval=4)
+    snapshots = [_snapshot(i * 2) for i in range(10)]
+    for index, snapshot in enumerate(snapshots):
+        assert history.append(snapshot, timestamp=1000.0 + index) == index + 1
+
+    assert sum("base" in entry for entry in history.entries) == 3
+    for index, snapshot in enumerate(snapshots):
+        assert history.get(index + 1) == snapshot
+    assert [version for version, _, _ in history.since(1007.0)] == [9, 10]
+
+    # Reload from disk
+    reloaded = SnapshotHistory("news", max_entries=50, max_age=0, base_interval=4)
+    assert reloaded.latest() == snapshots[-1]
+    assert reloaded.get(3) == snapshots[2]
+
+
+def test_history_retention_rebases(history_dir):
+    from nonebot_plugin_monitor.history import SnapshotHistory
+
+    history = SnapshotHistory("news", max_entries=5, max_age=0, base_interval=4)
+    snapshots = [_snapshot(i) for i in range(12)]
+    for index, snapshot in enumerate(snapshots):
+        history.append(snapshot, timestamp=1000.0 + index)
+
+    assert [version for version, _ in history.versions()] == [8, 9, 10, 11, 12]
+    assert "base" in history.entries[0]
+    for version in range(8, 13):
+        assert history.get(version) == snapshots[version - 1]
+    with pytest.raises(KeyError):
+        history.get(7)
+
+    aged = SnapshotHistory("aged", max_entries=0, max_age=3, base_interval=10)
+    for index, snapshot in enumerate(snapshots):
+        aged.append(snapshot, timestamp=1000.0 + index)
+    assert [version for version, _ in aged.versions()] == [9, 10, 11, 12]
+    assert aged.get(9) == snapshots[8]
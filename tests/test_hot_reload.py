@@ -0,0 +1,198 @@
+"""Tests for hot reloading site modules and definitions"""
+
+import os
+from pathlib import Path
+import sys
+
+import pytest
+
+
+@pytest.fixture
+def fresh_scheduler(tmp_path, monkeypatch):
+    from nonebot_plugin_monitor.config import plugin_config
+    from nonebot_plugin_monitor.scheduler import Scheduler
+
+    monkeypatch.setattr(plugin_config, "cache_dir", tmp_path / "cache")
+    monkeypatch.setattr(plugin_config, "lazy_site_loading", False)
+    monkeypatch.setattr(Scheduler, "start_site_scheduling", lambda self, site_name: None)
+    return Scheduler
+
+
+def _write(path: Path, text: str):
+    path.write_text(text, encoding="utf-8")
+    # Make sure the signature changes even on coarse mtime filesystems
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.mark.asyncio
+async def test_watcher_reloads_changed_definitions(fresh_scheduler, tmp_path):
+    from nonebot_plugin_monitor.watcher import SiteWatcher
+
+    sites_dir = tmp_path / "sites"
+    sites_dir.mkdir()
+    definition = sites_dir / "news.yaml"
+    _write(definition, "display_name: 快讯\nurl: https://example.com\nitems: $[*]\nkey: id\ntemplate: '{id}'\n")
+
+    scheduler = fresh_scheduler()
+    scheduler.sites_dir = sites_dir
+    assert scheduler.load_site_modules() == ["news"]
+    watcher = SiteWatcher(scheduler, sites_dir, 0.1)
+    assert await watcher.apply_changes() == []
+
+    _write(definition, "display_name: 新快讯\nurl: https://example.com\nitems: $[*]\nkey: id\ntemplate: '{id}'\n")
+    assert await watcher.apply_changes() == [definition]
+    assert scheduler.site_configs["news"].display_name() == "新快讯"
+    assert scheduler.get_site_name_by_display_name("新快讯") == "news"
+    assert "快讯" not in scheduler.display_name_to_site_name
+
+    # A broken definition keeps the previous version active
+    _write(definition, "display_name: 坏掉的\nurl: https://example.com\n")
+    assert await watcher.apply_changes() == [definition]
+    assert scheduler.site_configs["news"].display_name() == "新快讯"
+
+    # Renaming the site in the definition replaces the old site
+    _write(definition, "name: flash\nurl: https://example.com\nitems: $[*]\nkey: id\ntemplate: '{id}'\n")
+    assert await watcher.apply_changes() == [definition]
+    assert "news" not in scheduler.site_configs
+    assert "新快讯" not in scheduler.display_name_to_site_name
+    assert "flash" in scheduler.site_configs
+
+    definition.unlink()
+    assert await watcher.apply_changes() == [definition]
+    assert "flash" not in scheduler.site_configs
+    assert "新快讯" not in scheduler.display_name_to_site_name
+
+
+@pytest.mark.asyncio
+async def test_failed_module_reload_rolls_back(fresh_scheduler):
+    from nonebot_plugin_monitor.sites import SiteConfig
+
+    scheduler = fresh_scheduler()
+    module_file = scheduler.sites_dir / "hot_reload_probe.py"
+    module_name = "nonebot_plugin_monitor.sites.hot_reload_probe"
+    source = (
+        "from . import SiteConfig\n\n"
+        "VERSION = {version!r}\n\n\n"
+        "async def fetch():\n"
+        "    return VERSION\n\n\n"
+        "site = SiteConfig(\n"
+        "    name='hot_reload_probe',\n"
+        "    fetch_func=fetch,\n"
+        "    compare_func=lambda cached, latest: cached != latest,\n"
+        "    format_func=str,\n"
+        "    description_func=lambda: VERSION,\n"
+        "    schedule_func=lambda: 'interval:3600',\n"
+        "    display_name_func=lambda: 'probe ' + VERSION,\n"
+        ")\n"
+    )
+    try:
+        _write(module_file, source.format(version="v1"))
+        assert await scheduler.reload_site_file(module_file)
+        first = scheduler.site_configs["hot_reload_probe"]
+        assert first.display_name() == "probe v1"
+
+        _write(module_file, source.format(version="v2"))
+        assert await scheduler.reload_site_file(module_file)
+        assert scheduler.site_configs["hot_reload_probe"].display_name() == "probe v2"
+
+        _write(module_file, "raise RuntimeError('broken')\n")
+        assert not await scheduler.reload_site_file(module_file)
+        assert scheduler.site_configs["hot_reload_probe"].display_name() == "probe v2"
+        module = sys.modules[module_name]
+        assert module.VERSION == "v2"
+        assert isinstance(module.site, SiteConfig)
+
+        scheduler.remove_site_file(module_file)
+        assert "hot_reload_probe" not in scheduler.site_configs
+    finally:
+        module_file.unlink(missing_ok=True)
+        sys.modules.pop(module_name, None)
+
+
+@pytest.mark.asyncio
+async def test_reload_restarts_process_pool_workers(fresh_scheduler, monkeypatch):
+    from nonebot_plugin_monitor.config import plugin_config
+    from nonebot_plugin_monitor.execution import call_site_func, restart_process_pool
+
+    # A single worker, so the second call runs where the first version was imported
+    restart_process_pool()
+    monkeypatch.setattr(plugin_config, "process_pool_workers", 1)
+    scheduler = fresh_scheduler()
+    module_file = scheduler.sites_dir / "hot_reload_pool_probe.py"
+    module_name = "nonebot_plugin_monitor.sites.hot_reload_pool_probe"
+    source = (
+        "from . import SiteConfig, run_in_process\n\n\n"
+        "async def fetch():\n"
+        "    return None\n\n\n"
+        "@run_in_process\n"
+        "def format_update(latest):\n"
+        "    return {version!r}\n\n\n"
+        "site = SiteConfig(\n"
+        "    name='hot_reload_pool_probe',\n"
+        "    fetch_func=fetch,\n"
+        "    compare_func=lambda cached, latest: cached != latest,\n"
+        "    format_func=format_update,\n"
+        "    description_func=lambda: 'pool probe',\n"
+        "    schedule_func=lambda: 'interval:3600',\n"
+        ")\n"
+    )
+    try:
+        _write(module_file, source.format(version="v1"))
+        assert await scheduler.reload_site_file(module_file)
+        site = scheduler.site_configs["hot_reload_pool_probe"]
+        assert site.uses_process_pool()
+        assert await call_site_func(site.format, None) == "v1"
+
+        _write(module_file, source.format(version="v2"))
+        assert await scheduler.reload_site_file(module_file)
+        site = scheduler.site_configs["hot_reload_pool_probe"]
+        assert await call_site_func(site.format, None) == "v2"
+    finally:
+        scheduler.remove_site_file(module_file)
+        module_file.unlink(missing_ok=True)
+        sys.modules.pop(module_name, None)
+        restart_process_pool()
+
+
+@pytest.mark.asyncio
+async def test_reload_replaces_shared_source_fetch(fresh_scheduler):
+    from nonebot_plugin_monitor.sources import sources
+
+    scheduler = fresh_scheduler()
+    module_file = scheduler.sites_dir / "hot_reload_source_probe.py"
+    module_name = "nonebot_plugin_monitor.sites.hot_reload_source_probe"
+    source = (
+        "from . import SiteConfig\n"
+        "from ..sources import register_source\n\n\n"
+        "async def fetch_feed():\n"
+        "    return {version!r}\n\n\n"
+        "register_source('hot_reload_source_probe', fetch_feed, ttl=0)\n\n"
+        "site = SiteConfig(\n"
+        "    name='hot_reload_source_probe',\n"
+        "    fetch_func=None,\n"
+        "    compare_func=lambda cached, latest: cached != latest,\n"
+        "    format_func=str,\n"
+        "    description_func=lambda: 'source probe',\n"
+        "    schedule_func=lambda: 'interval:3600',\n"
+        "    source='hot_reload_source_probe',\n"
+        ")\n"
+    )
+    try:
+        _write(module_file, source.format(version="v1"))
+        assert await scheduler.reload_site_file(module_file)
+        assert await scheduler.site_configs["hot_reload_source_probe"].fetch() == "v1"
+
+        _write(module_file, source.format(version="v2"))
+        assert await scheduler.reload_site_file(module_file)
+        assert await scheduler.site_configs["hot_reload_source_probe"].fetch() == "v2"
+
+        # A reload that fails after registering its source restores the previous one
+        _write(module_file, source.format(version="v3") + "raise RuntimeError('broken')\n")
+        assert not await scheduler.reload_site_file(module_file)
+        assert await scheduler.site_configs["hot_reload_source_probe"].fetch() == "v2"
+    finally:
+        scheduler.remove_site_file(module_file)
+        module_file.unlink(missing_ok=True)
+        sys.modules.pop(module_name, None)
+        sources.pop("hot_reload_source_probe", None)
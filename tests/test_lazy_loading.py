@@ -0,0 +1,54 @@
+"""Tests for manifest-based lazy site loading"""
+
+import pytest
+
+
+@pytest.fixture
+def fresh_scheduler(tmp_path, monkeypatch):
+    from nonebot_plugin_monitor.config import plugin_config
+    from nonebot_plugin_monitor.scheduler import Scheduler
+
+    monkeypatch.setattr(plugin_config, "cache_dir", tmp_path)
+    monkeypatch.setattr(plugin_config, "lazy_site_loading", True)
+    # Do not touch the real APScheduler jobs
+    monkeypatch.setattr(Scheduler, "start_site_scheduling", lambda self, site_name: None)
+    return Scheduler
+
+
+@pytest.mark.asyncio
+async def test_unchanged_sites_are_registered_from_manifest(fresh_scheduler):
+    from nonebot_plugin_monitor.registry import LazySiteConfig, load_manifest
+    from nonebot_plugin_monitor.sites import SiteConfig
+
+    first = fresh_scheduler()
+    assert "example" in first.load_site_modules()
+    assert isinstance(first.site_configs["example"], SiteConfig)
+    entry = load_manifest()["example"]
+    assert entry["display_name"] == "示例网站"
+    assert entry["schedule"] == "interval:10"
+
+    second = fresh_scheduler()
+    assert "example" in second.load_site_modules()
+    lazy = second.site_configs["example"]
+    assert isinstance(lazy, LazySiteConfig)
+    assert lazy.display_name() == "示例网站"
+    assert second.get_site_name_by_display_name("示例网站") == "example"
+
+    await second.warm_up_sites()
+    assert isinstance(second.site_configs["example"], SiteConfig)
+
+
+@pytest.mark.asyncio
+async def test_changed_module_is_imported_eagerly(fresh_scheduler):
+    from nonebot_plugin_monitor.registry import load_manifest, save_manifest
+    from nonebot_plugin_monitor.sites import SiteConfig
+
+    fresh_scheduler().load_site_modules()
+    manifest = load_manifest()
+    manifest["example"]["mtime_ns"] -= 1
+    save_manifest(manifest)
+
+    scheduler = fresh_scheduler()
+    scheduler.load_site_modules()
+    assert isinstance(scheduler.site_configs["example"], SiteConfig)
+    assert load_manifest()["example"]["mtime_ns"] == manifest["example"]["mtime_ns"] + 1
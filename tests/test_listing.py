@@ -0,0 +1,49 @@
+"""Tests for cached subscription list rendering"""
+
+import pytest
+
+
+@pytest.fixture
+def renderer(isolated_scheduler, tmp_path, monkeypatch):
+    from nonebot_plugin_monitor.listing import SubscriptionListRenderer
+    from nonebot_plugin_monitor.manager import subscription_manager
+    from nonebot_plugin_monitor.registry import LazySiteConfig
+    from nonebot_plugin_monitor.scheduler import Scheduler
+
+    monkeypatch.setattr(Scheduler, "start_site_scheduling", lambda self, site_name: None)
+    monkeypatch.setattr(subscription_manager, "subscriptions", {})
+    monkeypatch.setattr(subscription_manager, "data_file", tmp_path / "subscriptions.json")
+    for name, display_name in (("news", "快讯"), ("blog", "博客")):
+        entry = {"display_name": display_name, "description": f"{display_name}更新", "schedule": "interval:60"}
+        isolated_scheduler.register_site(name, LazySiteConfig(name, entry))
+    return SubscriptionListRenderer()
+
+
+def test_list_is_cached_until_subscriptions_change(renderer):
+    from nonebot_plugin_monitor.manager import subscription_manager
+
+    assert (
+        renderer.render("10001")
+        == "订阅列表:\n未订阅:\n○ 快讯 - 快讯更新\n○ 博客 - 博客更新\n○ 全部 - 接收所有站点的通知\n"
+    )
+    assert renderer.render("10001") is renderer.render("10001")
+    assert (renderer.hits, renderer.misses) == (2, 1)
+
+    subscription_manager.subscribe("10001", "blog")
+    subscription_manager.subscribe("20001", "news", is_group=True)
+    assert renderer.render("10001") == (
+        "订阅列表:\n已订阅:\n✓ 博客 - 博客更新\n\n未订阅:\n○ 快讯 - 快讯更新\n○ 全部 - 接收所有站点的通知\n"
+    )
+    # Another target's change does not invalidate this view
+    renderer.render("10001")
+    assert (renderer.hits, renderer.misses) == (3, 2)
+
+
+def test_catalog_is_rendered_again_when_sites_change(renderer):
+    from nonebot_plugin_monitor.scheduler import scheduler_instance
+
+    renderer.render("10001")
+    scheduler_instance.unregister_site("blog")
+    assert "博客" not in renderer.render("10001")
+    assert list(renderer.site_lines) == ["news"]
+    assert renderer.misses == 2
@@ -0,0 +1,51 @@
+"""Tests for the staged processing pipeline"""
+
+import asyncio
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_stop_releases_jobs_waiting_to_hand_off():
+    from nonebot_plugin_monitor.pipeline import Pipeline
+
+    release = asyncio.Event()
+
+    async def fast(job):
+        return True
+
+    async def blocked(job):
+        await release.wait()
+        return False
+
+    pipeline = Pipeline("test", [("fast", fast, 1), ("blocked", blocked, 1)], queue_size=1)
+    # One job runs in the blocked stage, one waits in its queue, and the third waits to be handed off
+    jobs = [asyncio.create_task(pipeline.submit(job)) for job in range(3)]
+    for _ in range(50):
+        await asyncio.sleep(0.01)
+        if pipeline.stats()["fast"]["busy"] == 1:
+            break
+    assert pipeline.stats()["fast"]["busy"] == 1
+
+    await pipeline.stop()
+    results = await asyncio.wait_for(asyncio.gather(*jobs, return_exceptions=True), timeout=1)
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_handler_cancelled_error_fails_only_its_job():
+    from nonebot_plugin_monitor.pipeline import Pipeline
+
+    async def handler(job):
+        if job == "bad":
+            raise asyncio.CancelledError
+        return False
+
+    pipeline = Pipeline("test", [("only", handler, 1)], queue_size=4)
+    try:
+        with pytest.raises(asyncio.CancelledError):
+            await pipeline.submit("bad")
+        assert await asyncio.wait_for(pipeline.submit("good"), timeout=1) == "good"
+        assert pipeline.stats()["only"]["failed"] == 1
+    finally:
+        await pipeline.stop()
@@ -0,0 +1,102 @@
+"""Tests for push-based ingestion"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+
+@pytest.fixture
+def push_config(isolated_scheduler, monkeypatch):
+    from nonebot_plugin_monitor.config import plugin_config
+
+    monkeypatch.setattr(plugin_config, "push_ingestion", True)
+    monkeypatch.setattr(plugin_config, "push_secret", "s3cret")
+    monkeypatch.setattr(plugin_config, "push_sites", ["pushed"])
+    monkeypatch.setattr("nonebot_plugin_monitor.push._seen_signatures", {})
+    return isolated_scheduler
+
+
+def _request(body: bytes, timestamp: str, signature: str):
+    from nonebot.drivers import Request
+
+    headers = {"X-Monitor-Timestamp": timestamp, "X-Monitor-Signature": signature}
+    return Request("POST", "http://127.0.0.1/monitor/push", headers=headers, content=body)
+
+
+def test_signature_verification(push_config):
+    from nonebot_plugin_monitor.push import sign_payload, verify_signature
+
+    now = str(int(time.time()))
+    signature = sign_payload("s3cret", now, b"{}")
+    assert verify_signature("s3cret", now, signature, b"{}")
+    assert not verify_signature("s3cret", now, signature, b'{"x": 1}')
+    assert not verify_signature("other", now, signature, b"{}")
+    stale = str(int(time.time()) - 3600)
+    assert not verify_signature("s3cret", stale, sign_payload("s3cret", stale, b"{}"), b"{}")
+    assert not verify_signature("", now, signature, b"{}")
+
+
+@pytest.mark.asyncio
+async def test_push_runs_compare_format_deliver_without_fetching(
+    push_config, sent_notifications, make_site, monkeypatch
+):
+    from nonebot_plugin_monitor.cache import load_cache
+    from nonebot_plugin_monitor.manager import subscription_manager
+    from nonebot_plugin_monitor.push import handle_push, sign_payload
+    from nonebot_plugin_monitor.scheduler import CHECK_UNCHANGED
+
+    async def fetch():
+        raise AssertionError("pushed sites are not fetched")
+
+    push_config.site_configs["pushed"] = make_site(
+        "pushed", fetch, format_func=lambda latest: f"update {latest['value']}", schedule="*/5 * * * *"
+    )
+    assert push_config.get_schedule("pushed") == "interval:3600"
+
+    monkeypatch.setattr(subscription_manager, "get_subscribers", lambda site_name: [10001])
+
+    body = json.dumps({"site": "pushed", "data": {"value": 7}}).encode()
+    now = str(int(time.time()))
+    response = await handle_push(_request(body, now, sign_payload("s3cret", now, body)))
+    assert response.status_code == 202
+    for _ in range(100):
+        if sent_notifications:
+            break
+        await asyncio.sleep(0.01)
+    assert sent_notifications == [(10001, "update 7")]
+    assert load_cache("pushed") == {"value": 7}
+
+    # The same data again is unchanged and not delivered twice
+    assert await push_config.ingest_push("pushed", {"value": 7}) == CHECK_UNCHANGED
+    assert len(sent_notifications) == 1
+
+    assert (await handle_push(_request(body, now, "sha256=forged"))).status_code == 401
+    other = json.dumps({"site": "polled", "data": {}}).encode()
+    assert (await handle_push(_request(other, now, sign_payload("s3cret", now, other)))).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_push_rejects_replays_and_invalid_site(push_config, make_site, monkeypatch):
+    from nonebot_plugin_monitor.push import handle_push, sign_payload
+
+    push_config.site_configs["pushed"] = make_site("pushed")
+    ingested = []
+
+    async def ingest_push(site_name, data):
+        ingested.append(data)
+
+    monkeypatch.setattr(push_config, "ingest_push", ingest_push)
+
+    now = str(int(time.time()))
+    body = json.dumps({"site": "pushed", "data": {"value": 1}}).encode()
+    request = _request(body, now, sign_payload("s3cret", now, body))
+    assert (await handle_push(request)).status_code == 202
+    assert (await handle_push(request)).status_code == 409
+    await asyncio.sleep(0)
+    assert ingested == [{"value": 1}]
+
+    for site in (["pushed"], {"name": "pushed"}, 1):
+        bad = json.dumps({"site": site, "data": {}}).encode()
+        assert (await handle_push(_request(bad, now, sign_payload("s3cret", now, bad)))).status_code == 400
@@ -0,0 +1,140 @@
+"""Tests for baseline seeding of sites without a cache"""
+
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def value_site(make_site):
+    """Factory for sites whose fetch returns the first element of a list the test can change"""
+
+    def make(name: str, values: list[int]):
+        async def fetch():
+            return {"value": values[0]}
+
+        return make_site(name, fetch, format_func=lambda latest: f"{name} {latest['value']}")
+
+    return make
+
+
+@pytest.fixture
+def seeding_scheduler(isolated_scheduler, sent_notifications, monkeypatch):
+    from nonebot_plugin_monitor.config import plugin_config
+    from nonebot_plugin_monitor.manager import subscription_manager
+
+    monkeypatch.setattr(plugin_config, "seed_missing_cache", True)
+    monkeypatch.setattr(subscription_manager, "get_subscribers", lambda site_name: [10001, 10002])
+    return isolated_scheduler, sent_notifications
+
+
+@pytest.mark.asyncio
+async def test_first_fetch_without_cache_only_seeds(seeding_scheduler, value_site):
+    from nonebot_plugin_monitor.cache import load_cache
+    from nonebot_plugin_monitor.scheduler import CHECK_SEEDED, CHECK_UNCHANGED, CHECK_UPDATED
+
+    scheduler, sent = seeding_scheduler
+    values = [1]
+    scheduler.site_configs["cold"] = value_site("cold", values)
+
+    assert await scheduler.check_site_updates("cold") == CHECK_SEEDED
+    assert sent == []
+    assert load_cache("cold") == {"value": 1}
+    assert scheduler.last_checks.get("cold") is not None
+
+    assert await scheduler.check_site_updates("cold") == CHECK_UNCHANGED
+    values[0] = 2
+    assert await scheduler.check_site_updates("cold") == CHECK_UPDATED
+    assert sent == [(10001, "cold 2"), (10002, "cold 2")]
+
+    # Pushed data is always delivered, even to a site without a cache
+    scheduler.site_configs["pushed"] = value_site("pushed", [0])
+    assert await scheduler.ingest_push("pushed", {"value": 5}) == CHECK_UPDATED
+    assert sent[-1] == (10002, "pushed 5")
+
+
+@pytest.mark.asyncio
+async def test_seed_sites_seeds_only_missing_caches_in_parallel(seeding_scheduler, value_site, monkeypatch):
+    from nonebot_plugin_monitor.cache import load_cache, save_cache
+    from nonebot_plugin_monitor.config import plugin_config
+    from nonebot_plugin_monitor.scheduler import CHECK_SEEDED, CHECK_UPDATED
+
+    scheduler, sent = seeding_scheduler
+    monkeypatch.setattr(plugin_config, "seed_missing_cache", False)
+
+    running = 0
+    peak = 0
+
+    def slow_site(name: str):
+        site = value_site(name, [1])
+        fetch = site.fetch
+
+        async def tracked_fetch():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.05)
+            running -= 1
+            return await fetch()
+
+        site.fetch = tracked_fetch
+        return site
+
+    for name in ("a", "b", "c", "d"):
+        scheduler.site_configs[name] = slow_site(name)
+    save_cache("d", {"value": 0})
+
+    results = await scheduler.seed_sites(concurrency=3)
+    assert [(name, result) for name, result, _, _ in results] == [
+        ("a", CHECK_SEEDED),
+        ("b", CHECK_SEEDED),
+        ("c", CHECK_SEEDED),
+    ]
+    assert peak == 3
+    assert sent == []
+    assert load_cache("a") == {"value": 1}
+    assert load_cache("d") == {"value": 0}
+    assert await scheduler.seed_sites() == []
+
+    # With seeding off, a regular check on a cold cache still notifies
+    scheduler.site_configs["e"] = value_site("e", [3])
+    assert await scheduler.check_site_updates("e") == CHECK_UPDATED
+    assert sent == [(10001, "e 3"), (10002, "e 3")]
+
+
+@pytest.mark.asyncio
+async def test_seed_joining_a_failed_check_still_seeds(seeding_scheduler, value_site, monkeypatch):
+    from nonebot_plugin_monitor.cache import load_cache
+    from nonebot_plugin_monitor.config import plugin_config
+    from nonebot_plugin_monitor.scheduler import CHECK_ERROR, CHECK_SEEDED
+
+    scheduler, sent = seeding_scheduler
+    monkeypatch.setattr(plugin_config, "seed_missing_cache", False)
+    site = value_site("flaky", [1])
+    fetch = site.fetch
+    release = asyncio.Event()
+    calls = 0
+
+    async def flaky_fetch():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await release.wait()
+            raise RuntimeError("upstream down")
+        return await fetch()
+
+    site.fetch = flaky_fetch
+    scheduler.site_configs["flaky"] = site
+
+    regular = asyncio.create_task(scheduler.check_site_updates("flaky"))
+    await asyncio.sleep(0)
+    seeding = asyncio.create_task(scheduler.seed_sites(["flaky"]))
+    await asyncio.sleep(0.01)
+    release.set()
+
+    assert await regular == CHECK_ERROR
+    assert [(name, result, coalesced) for name, result, _, coalesced in await seeding] == [
+        ("flaky", CHECK_SEEDED, True)
+    ]
+    assert load_cache("flaky") == {"value": 1}
+    assert sent == []
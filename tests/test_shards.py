@@ -0,0 +1,80 @@
+"""Tests for per-site sharded subscription storage"""
+
+import json
+
+import pytest
+
+
+@pytest.fixture
+def sharded_manager(tmp_path, monkeypatch):
+    from nonebot_plugin_monitor.config import plugin_config
+    from nonebot_plugin_monitor.manager import SubscriptionManager
+
+    monkeypatch.setattr(plugin_config, "subscription_storage", "sharded")
+    monkeypatch.setattr(plugin_config, "subscriptions_shard_dir", tmp_path / "subscriptions")
+
+    def make() -> SubscriptionManager:
+        manager = SubscriptionManager()
+        manager.data_file = tmp_path / "subscriptions.json"
+        manager.load_subscriptions()
+        return manager
+
+    return make
+
+
+def test_single_file_is_migrated_to_shards(sharded_manager, tmp_path):
+    (tmp_path / "subscriptions.json").write_text(
+        json.dumps({"news": {"users": ["10001"], "groups": ["20001"]}, "all": {"users": ["10002"], "groups": []}}),
+        encoding="utf-8",
+    )
+    sharded_manager()
+    assert sorted(path.name for path in (tmp_path / "subscriptions").glob("*.json")) == ["all.json", "news.json"]
+
+    manager = sharded_manager()
+    assert manager.subscriptions.loaded_count == 0
+    assert manager.get_subscriptions("10001") == ["news"]
+    assert manager.get_subscriptions("20001", is_group=True) == ["news"]
+    assert manager.subscriptions.loaded_count == 0
+    assert manager.get_subscribers("news") == [10001, 10002, 20001]
+    assert manager.subscriptions.loaded_count == 2
+
+
+def test_changes_write_only_touched_shards(sharded_manager, tmp_path, monkeypatch):
+    from nonebot_plugin_monitor import shards
+
+    manager = sharded_manager()
+    for index in range(5):
+        assert manager.subscribe(str(10000 + index), f"site_{index}")
+
+    written = []
+    original = shards._write_json
+    monkeypatch.setattr(shards, "_write_json", lambda path, data: (written.append(path.name), original(path, data)))
+
+    manager = sharded_manager()
+    assert manager.subscribe("10003", "site_0")
+    assert written == ["site_0.json", f"{10003 % shards.INDEX_BUCKETS:02x}.json"]
+    assert manager.subscriptions.loaded_count == 1
+    assert sorted(manager.get_subscriptions("10003")) == ["site_0", "site_3"]
+
+    # Removing the last subscriber removes the shard
+    assert manager.unsubscribe("10001", "site_1")
+    assert not (tmp_path / "subscriptions" / "site_1.json").exists()
+
+    reopened = sharded_manager()
+    assert "site_1" not in reopened.subscriptions
+    assert reopened.get_subscriptions("10001") == []
+    assert sorted(reopened.get_subscriptions("10003")) == ["site_0", "site_3"]
+
+
+@pytest.mark.parametrize("site_name", ["../../escaped", "..", "a/b", "a\\b", "站点%2F"])
+def test_site_names_cannot_escape_the_shard_directory(sharded_manager, tmp_path, site_name):
+    manager = sharded_manager()
+    assert manager.subscribe("10001", site_name)
+    shard_dir = tmp_path / "subscriptions"
+    written = [path for path in tmp_path.rglob("*.json") if path.name != "subscriptions.json"]
+    assert all(path.parent in (shard_dir, shard_dir / "_index") for path in written)
+    assert len([path for path in written if path.parent == shard_dir]) == 1
+
+    reopened = sharded_manager()
+    assert reopened.get_subscribers(site_name) == [10001]
+    assert reopened.get_subscriptions("10001") == [site_name]
@@ -0,0 +1,78 @@
+"""Tests for graceful shutdown and resuming checkpointed checks"""
+
+import asyncio
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_shutdown_drains_in_flight_checks(isolated_scheduler, make_site):
+    from nonebot_plugin_monitor.checkpoint import get_checkpoint_file
+    from nonebot_plugin_monitor.scheduler import CHECK_CANCELLED, CHECK_UPDATED
+
+    async def slow_fetch():
+        await asyncio.sleep(0.05)
+        return {"value": 1}
+
+    isolated_scheduler.site_configs["slow"] = make_site("slow", slow_fetch)
+    check = asyncio.create_task(isolated_scheduler.check_site_updates("slow"))
+    await asyncio.sleep(0)
+
+    await isolated_scheduler.shutdown(timeout=5)
+    assert await check == CHECK_UPDATED
+    assert not get_checkpoint_file().exists()
+    assert await isolated_scheduler.check_site_updates("slow") == CHECK_CANCELLED
+
+
+@pytest.mark.asyncio
+async def test_unfinished_fan_out_resumes_after_restart(isolated_scheduler, make_site, monkeypatch):
+    from nonebot_plugin_monitor.cache import load_cache
+    from nonebot_plugin_monitor.checkpoint import get_checkpoint_file
+    from nonebot_plugin_monitor.manager import subscription_manager
+    from nonebot_plugin_monitor.scheduler import CHECK_UPDATED
+
+    fetches = 0
+    sent: list[tuple[str, str]] = []
+    release = asyncio.Event()
+
+    async def fetch():
+        nonlocal fetches
+        fetches += 1
+        return {"value": 1}
+
+    async def send(subscribers, message):
+        if subscribers == ["2"]:
+            await release.wait()
+        sent.extend((subscriber, message) for subscriber in subscribers)
+        return subscribers
+
+    isolated_scheduler.site_configs["news"] = make_site(
+        "news", fetch, format_func=lambda latest: f"update {latest['value']}"
+    )
+    monkeypatch.setattr(isolated_scheduler, "_send_notifications", send)
+    monkeypatch.setattr(subscription_manager, "get_subscribers", lambda site_name: ["1", "2", "3"])
+
+    check = asyncio.create_task(isolated_scheduler.check_site_updates("news"))
+    for _ in range(20):
+        await asyncio.sleep(0.01)
+        if sent:
+            break
+    await isolated_scheduler.shutdown(timeout=0.05)
+    with pytest.raises(asyncio.CancelledError):
+        await check
+    assert sent == [("1", "update 1")]
+    assert get_checkpoint_file().exists()
+    assert load_cache("news") is None
+
+    # Next start: only the remaining subscribers are notified, without fetching again
+    isolated_scheduler.accepting_checks = True
+    isolated_scheduler.load_checkpoint()
+    assert list(isolated_scheduler.pending_resumes) == ["news"]
+    assert not get_checkpoint_file().exists()
+    release.set()
+
+    assert await isolated_scheduler.check_site_updates("news") == CHECK_UPDATED
+    assert sent == [("1", "update 1"), ("2", "update 1"), ("3", "update 1")]
+    assert fetches == 1
+    assert load_cache("news") == {"value": 1}
+    await isolated_scheduler.pipeline.stop()
@@ -0,0 +1,99 @@
+"""Tests for shared upstream sources"""
+
+import asyncio
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_shared_source_fetches_once_per_tick():
+    from nonebot_plugin_monitor.sites import SiteConfig
+    from nonebot_plugin_monitor.sources import register_source, sources
+
+    calls = 0
+
+    async def fetch_feed():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return [{"id": 1, "tag": "a"}, {"id": 2, "tag": "b"}, {"id": 3, "tag": "a"}]
+
+    source = register_source("test_feed", fetch_feed, ttl=60)
+    try:
+        sites = [
+            SiteConfig(
+                name=f"feed_{tag}",
+                fetch_func=None,
+                compare_func=lambda cached, latest: cached != latest,
+                format_func=str,
+                description_func=lambda: "feed",
+                schedule_func=lambda: "interval:10",
+                source="test_feed",
+                select_func=lambda data, tag=tag: [item for item in data if item["tag"] == tag],
+            )
+            for tag in ("a", "b", "a")
+        ]
+
+        results = await asyncio.gather(*(site.fetch() for site in sites))
+        assert calls == 1
+        assert [[item["id"] for item in result] for result in results] == [[1, 3], [2], [1, 3]]
+
+        # Within the TTL the result is reused, after invalidation it is fetched again
+        await sites[0].fetch()
+        assert calls == 1
+        source.invalidate()
+        await sites[0].fetch()
+        assert calls == 2
+        assert source.fetch_count == 2
+        assert source.shared_count == 3
+    finally:
+        sources.pop("test_feed", None)
+
+
+@pytest.mark.asyncio
+async def test_shared_source_propagates_errors_to_waiters():
+    from nonebot_plugin_monitor.sources import register_source, sources
+
+    async def failing_fetch():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    source = register_source("test_failing", failing_fetch)
+    try:
+        results = await asyncio.gather(source.fetch(), source.fetch(), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert source.fetch_count == 1
+    finally:
+        sources.pop("test_failing", None)
+
+
+def test_site_requires_fetch_or_source():
+    from nonebot_plugin_monitor.sites import SiteConfig
+
+    with pytest.raises(ValueError, match="fetch_func or source"):
+        SiteConfig(
+            name="broken",
+            fetch_func=None,
+            compare_func=lambda cached, latest: True,
+            format_func=str,
+            description_func=lambda: "broken",
+            schedule_func=lambda: "interval:10",
+        )
+
+
+def test_site_rejects_fetch_with_source():
+    from nonebot_plugin_monitor.sites import SiteConfig
+
+    async def fetch():
+        return None
+
+    common = {
+        "compare_func": lambda cached, latest: True,
+        "format_func": str,
+        "description_func": lambda: "ambiguous",
+        "schedule_func": lambda: "interval:10",
+    }
+    with pytest.raises(ValueError, match="not both"):
+        SiteConfig(name="ambiguous", fetch_func=fetch, source="feed", **common)
+    with pytest.raises(ValueError, match="no source"):
+        SiteConfig(name="ambiguous", fetch_func=fetch, select_func=lambda data: data, **common)
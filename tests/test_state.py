@@ -0,0 +1,143 @@
+"""Tests for the startup state snapshot and warm caches"""
+
+import os
+
+import httpx
+import pytest
+
+
+@pytest.fixture
+def isolated_state(isolated_scheduler, tmp_path, monkeypatch):
+    from nonebot_plugin_monitor import cache
+    from nonebot_plugin_monitor.manager import subscription_manager
+
+    monkeypatch.setattr(cache, "_memory_cache", {})
+    monkeypatch.setattr(subscription_manager, "data_file", tmp_path / "subscriptions.json")
+    monkeypatch.setattr(
+        subscription_manager, "subscriptions", subscription_manager._from_dict({"news": {"users": ["10001"]}})
+    )
+    isolated_scheduler.site_configs.update({"news": None, "blog": None})
+    monkeypatch.setattr(isolated_scheduler, "resume_times", {})
+    subscription_manager.save_subscriptions()
+    return tmp_path
+
+
+def _count_decodes(monkeypatch) -> list[bytes]:
+    from nonebot_plugin_monitor import cache
+
+    decoded = []
+    original = cache.decode_data
+
+    def counting_decode(raw, *args):
+        decoded.append(raw)
+        return original(raw, *args)
+
+    monkeypatch.setattr(cache, "decode_data", counting_decode)
+    return decoded
+
+
+def test_load_cache_reuses_decoded_data(isolated_state, monkeypatch):
+    from nonebot_plugin_monitor import cache
+
+    cache.save_cache("news", {"value": 1})
+    cache._memory_cache.clear()
+    decoded = _count_decodes(monkeypatch)
+
+    assert cache.load_cache("news") == {"value": 1}
+    assert cache.load_cache("news") == {"value": 1}
+    assert len(decoded) == 1
+
+    # A file changed behind our back is read again
+    cache_file = cache.get_cache_file("news")
+    cache_file.write_bytes(cache.encode_data({"value": 2}))
+    stat = cache_file.stat()
+    os.utime(cache_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.load_cache("news") == {"value": 2}
+    assert len(decoded) == 2
+
+
+def test_snapshot_restores_unchanged_state(isolated_state, monkeypatch):
+    from nonebot_plugin_monitor import cache, state
+    from nonebot_plugin_monitor.scheduler import scheduler_instance
+
+    cache.save_cache("news", {"value": 1})
+    cache.save_cache("blog", {"value": 2})
+    assert state.save_state_snapshot()
+
+    # Simulate a restart where the blog cache changed since the snapshot
+    cache._memory_cache.clear()
+    blog_file = cache.get_cache_file("blog")
+    blog_file.write_bytes(cache.encode_data({"value": 3}))
+    stat = blog_file.stat()
+    os.utime(blog_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    snapshot = state.load_state_snapshot()
+    assert snapshot is not None
+    assert state.restore_subscriptions(snapshot) == {"news": {"users": ["10001"], "groups": []}}
+    assert state.restore_state(snapshot) == 1
+
+    decoded = _count_decodes(monkeypatch)
+    assert cache.load_cache("news") == {"value": 1}
+    assert decoded == []
+    assert cache.load_cache("blog") == {"value": 3}
+    assert len(decoded) == 1
+    assert scheduler_instance.resume_times == snapshot["next_run_times"]
+
+    # Subscriptions edited since the snapshot are read from file instead
+    from nonebot_plugin_monitor.manager import subscription_manager
+
+    subscription_manager.data_file.write_text("{}", encoding="utf-8")
+    assert state.restore_subscriptions(snapshot) is None
+
+
+@pytest.mark.asyncio
+async def test_warm_connections(monkeypatch):
+    import asyncio
+
+    from nonebot_plugin_monitor import fetch
+
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append((request.method, str(request.url)))
+        if request.url.host == "down.example.com":
+            raise httpx.ConnectError("unreachable")
+        return httpx.Response(200)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(fetch, "_shared_client", client)
+    monkeypatch.setattr(fetch, "_shared_client_loop", asyncio.get_running_loop())
+    monkeypatch.setattr(fetch, "known_origins", set())
+
+    assert await fetch.warm_connections(["https://up.example.com", "https://down.example.com"], 2) == 1
+    assert sorted(requested) == [("HEAD", "https://down.example.com"), ("HEAD", "https://up.example.com")]
+    assert fetch.known_origins == {"https://up.example.com"}
+    await client.aclose()
+
+
+def test_loaded_cache_is_a_private_bounded_copy(isolated_state, monkeypatch):
+    from nonebot_plugin_monitor import cache
+    from nonebot_plugin_monitor.config import plugin_config
+
+    cache.save_cache("news", {"items": [1]})
+    loaded = cache.load_cache("news")
+    loaded["items"].append(2)
+    assert cache.load_cache("news") == {"items": [1]}
+
+    # Least recently used files are dropped beyond the limit
+    monkeypatch.setattr(plugin_config, "cache_memory_entries", 2)
+    cache.save_cache("blog", {"value": 2})
+    cache.load_cache("news")
+    cache.save_cache("other", {"value": 3})
+    assert cache.get_memory_cache_entry("blog") is None
+    assert cache.get_memory_cache_entry("news") is not None
+    assert cache.load_cache("blog") == {"value": 2}
+
+    # With no memory cache every load reads the file
+    monkeypatch.setattr(plugin_config, "cache_memory_entries", 0)
+    cache._memory_cache.clear()
+    decoded = _count_decodes(monkeypatch)
+    assert cache.load_cache("news") == {"items": [1]}
+    assert cache.load_cache("news") == {"items": [1]}
+    assert len(decoded) == 2
+    assert cache._memory_cache == {}
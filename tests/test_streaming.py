@@ -0,0 +1,156 @@
+"""Tests for streaming (SSE/WebSocket) sources"""
+
+import asyncio
+import json
+
+import pytest
+
+
+async def _serve_sse(batches: list[list[str]], seen_ids: list[str | None]):
+    """Local SSE endpoint sending one batch of event lines per connection, then closing it"""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        last_event_id = None
+        while (line := await reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "last-event-id":
+                last_event_id = value.strip()
+        seen_ids.append(last_event_id)
+        batch = batches.pop(0) if batches else []
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nConnection: close\r\n\r\n")
+        writer.write("".join(f"{line}\n" for line in batch).encode())
+        await writer.drain()
+        if not batches:
+            # Keep the last connection open until the client goes away
+            await reader.read()
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+@pytest.mark.asyncio
+async def test_sse_stream_reconnects_with_last_event_id():
+    from nonebot_plugin_monitor.streaming import StreamSource, run_stream
+
+    seen_ids: list[str | None] = []
+    batches = [
+        [": keep-alive", "id: 1", 'data: {"value": 1}', ""],
+        ["id: 2", 'data: {"value":', "data: 2}", ""],
+    ]
+    server, port = await _serve_sse(batches, seen_ids)
+    stream = StreamSource(f"http://127.0.0.1:{port}/events", backoff_initial=0.01)
+    received = []
+
+    async def on_event(data):
+        received.append(data)
+
+    task = asyncio.create_task(run_stream("sse_site", stream, on_event))
+    try:
+        for _ in range(200):
+            if len(received) == 2:
+                break
+            await asyncio.sleep(0.01)
+        assert received == [{"value": 1}, {"value": 2}]
+        assert seen_ids == [None, "1"]
+        assert stream.last_event_id == "2"
+        assert stream.latest == {"value": 2}
+        assert stream.events == 2
+        assert stream.reconnects == 1
+        assert stream.connected
+        assert stream.average_latency is not None
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        server.close()
+    assert not stream.connected
+
+
+@pytest.mark.asyncio
+async def test_websocket_stream_runs_site_pipeline(isolated_scheduler, sent_notifications, make_site, monkeypatch):
+    pytest.importorskip("websockets")
+    from websockets.asyncio.server import serve
+
+    from nonebot_plugin_monitor.cache import load_cache
+    from nonebot_plugin_monitor.manager import subscription_manager
+    from nonebot_plugin_monitor.sites import StreamSource
+
+    async def handler(websocket):
+        for value in (1, 2):
+            await websocket.send(json.dumps({"value": value, "published": 0}))
+        await websocket.wait_closed()
+
+    monkeypatch.setattr(subscription_manager, "get_subscribers", lambda site_name: [10001])
+
+    async with serve(handler, "127.0.0.1", 0) as server:
+        port = next(iter(server.sockets)).getsockname()[1]
+        stream = StreamSource(
+            f"ws://127.0.0.1:{port}",
+            kind="websocket",
+            published_func=lambda data: data["published"] or None,
+        )
+        isolated_scheduler.site_configs["live"] = make_site(
+            "live",
+            stream=stream,
+            format_func=lambda latest: f"update {latest['value']}",
+            schedule="*/5 * * * *",
+        )
+        await isolated_scheduler.start_streams()
+        try:
+            assert set(isolated_scheduler.stream_tasks) == {"live"}
+            for _ in range(200):
+                if len(sent_notifications) == 2:
+                    break
+                await asyncio.sleep(0.01)
+            # Every event is delivered, in order
+            assert sent_notifications == [(10001, "update 1"), (10001, "update 2")]
+            assert load_cache("live") == {"value": 2, "published": 0}
+            assert stream.events == 2
+            assert stream.last_latency is not None
+            # Polling falls back to the latest event
+            assert await isolated_scheduler.site_configs["live"].fetch() == {"value": 2, "published": 0}
+        finally:
+            await isolated_scheduler.stop_streams()
+    assert isolated_scheduler.stream_tasks == {}
+    assert not stream.connected
+
+
+@pytest.mark.asyncio
+async def test_failing_event_keeps_the_connection():
+    from nonebot_plugin_monitor.streaming import StreamSource, run_stream
+
+    seen_ids: list[str | None] = []
+    batches = [['data: {"value": 1}', "", 'data: {"value": 2}', ""]]
+    server, port = await _serve_sse(batches, seen_ids)
+    stream = StreamSource(f"http://127.0.0.1:{port}/events", backoff_initial=0.01)
+    received = []
+
+    async def on_event(data):
+        if data["value"] == 1:
+            raise RuntimeError("compare failed")
+        received.append(data)
+
+    task = asyncio.create_task(run_stream("sse_site", stream, on_event))
+    try:
+        for _ in range(200):
+            if received:
+                break
+            await asyncio.sleep(0.01)
+        assert received == [{"value": 2}]
+        assert stream.reconnects == 0
+        assert seen_ids == [None]
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        server.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_site_without_data_is_not_seeded(isolated_scheduler, make_site):
+    from nonebot_plugin_monitor.cache import get_cache_file
+    from nonebot_plugin_monitor.scheduler import CHECK_UNCHANGED
+    from nonebot_plugin_monitor.sites import StreamSource
+
+    isolated_scheduler.site_configs["quiet"] = make_site("quiet", stream=StreamSource("http://127.0.0.1:9/events"))
+    assert await isolated_scheduler.check_site_updates("quiet") == CHECK_UNCHANGED
+    assert not get_cache_file("quiet").exists()
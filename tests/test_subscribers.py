@@ -0,0 +1,131 @@
+"""Tests for compact subscriber storage"""
+
+import pytest
+
+
+def test_subscriber_set_membership():
+    from nonebot_plugin_monitor.subscribers import SubscriberSet
+
+    members = SubscriberSet(["10002", "10001", "qq_abc", "007", 10003])
+    assert len(members) == 5
+    assert "10001" in members
+    assert 10001 in members
+    assert "007" in members
+    assert 7 not in members
+    assert "qq_abc" in members
+    assert "10004" not in members
+    assert members.members() == [10001, 10002, 10003, "007", "qq_abc"]
+    assert members.to_list() == ["10001", "10002", "10003", "007", "qq_abc"]
+
+    assert members.add("10000") is True
+    assert members.add(10000) is False
+    assert members.discard("qq_abc") is True
+    assert members.discard("qq_abc") is False
+    assert members.members() == [10000, 10001, 10002, 10003, "007"]
+
+
+def test_union_deduplicates():
+    from nonebot_plugin_monitor.subscribers import SubscriberSet
+
+    site = SubscriberSet(["3", "1", "x"])
+    everything = SubscriberSet(["2", "3", "x", "y"])
+    assert SubscriberSet.union(site, everything) == [1, 2, 3, "x", "y"]
+    assert SubscriberSet.union(SubscriberSet(), everything) == [2, 3, "x", "y"]
+    assert SubscriberSet.union() == []
+
+
+def test_manager_round_trips_stored_format(tmp_path):
+    import json
+
+    from nonebot_plugin_monitor.manager import SubscriptionManager
+
+    manager = SubscriptionManager()
+    manager.data_file = tmp_path / "subscriptions.json"
+    manager.data_file.write_text(
+        json.dumps({"news": {"users": ["20001", "10001"], "groups": ["30001"]}, "all": {"users": ["10001"]}}),
+        encoding="utf-8",
+    )
+    manager.load_subscriptions()
+
+    # Subscribed both directly and through 全部: notified once
+    assert manager.get_subscribers("news") == [10001, 20001, 30001]
+    assert manager.get_subscribers("blog") == [10001]
+    assert manager.get_subscriptions("10001") == ["news", "全部"]
+
+    assert manager.subscribe("40001", "news", is_group=True)
+    assert not manager.subscribe("40001", "news", is_group=True)
+    stored = json.loads(manager.data_file.read_text(encoding="utf-8"))
+    assert stored["news"] == {"users": ["10001", "20001"], "groups": ["30001", "40001"]}
+    assert stored["all"] == {"users": ["10001"], "groups": []}
+
+
+def test_bulk_changes_save_once(tmp_path, monkeypatch):
+    import json
+
+    from nonebot_plugin_monitor.manager import SubscriptionManager
+
+    manager = SubscriptionManager()
+    manager.data_file = tmp_path / "subscriptions.json"
+    manager.load_subscriptions()
+    saves = []
+    original_save = manager.save_subscriptions
+    monkeypatch.setattr(manager, "save_subscriptions", lambda: (saves.append(1), original_save()))
+
+    assert manager.subscribe_many("10001", ["news", "blog", "全部", "news"]) == ["news", "blog", "all"]
+    assert manager.subscribe_many("10001", ["news", "forum"]) == ["forum"]
+    assert manager.subscribe_many("10001", ["news"]) == []
+    assert len(saves) == 2
+
+    assert manager.unsubscribe_many("10001", ["blog", "forum", "missing"]) == ["blog", "forum"]
+    assert len(saves) == 3
+    assert sorted(manager.get_subscriptions("10001")) == ["news", "全部"]
+    assert "blog" not in manager.subscriptions
+
+    export_file = tmp_path / "export.json"
+    assert manager.export_subscriptions_file(export_file)
+    other = SubscriptionManager()
+    other.data_file = tmp_path / "other.json"
+    other.load_subscriptions()
+    assert other.import_subscriptions({"news": {"users": ["10002"], "groups": ["30001", "30002"]}}) == 3
+    assert other.import_subscriptions_file(export_file) == 2
+    stored = json.loads(other.data_file.read_text(encoding="utf-8"))
+    assert stored["news"] == {"users": ["10001", "10002"], "groups": ["30001", "30002"]}
+
+
+def test_bulk_change_rolls_back_on_error(tmp_path, monkeypatch):
+    from nonebot_plugin_monitor.manager import SubscriptionManager
+
+    manager = SubscriptionManager()
+    manager.data_file = tmp_path / "subscriptions.json"
+    manager.load_subscriptions()
+    original_apply = manager._apply
+
+    def failing_apply(user_id, site_name, is_group, subscribed):
+        if site_name == "broken":
+            raise RuntimeError("boom")
+        return original_apply(user_id, site_name, is_group, subscribed)
+
+    monkeypatch.setattr(manager, "_apply", failing_apply)
+    assert manager.subscribe_many("10001", ["news", "blog", "broken"]) == []
+    assert manager.get_subscriptions("10001") == []
+    assert "news" not in manager.subscriptions
+
+
+@pytest.mark.asyncio
+async def test_send_notifications_never_reuses_previous_target(monkeypatch):
+    import importlib
+
+    scheduler_module = importlib.import_module("nonebot_plugin_monitor.scheduler")
+
+    sent = []
+
+    class FakeBot:
+        async def send_group_msg(self, group_id, message):
+            sent.append(("group", group_id))
+
+        async def send_private_msg(self, user_id, message):
+            sent.append(("private", user_id))
+
+    monkeypatch.setattr(scheduler_module, "get_bot", lambda: FakeBot())
+    await scheduler_module.scheduler_instance._send_notifications([10001, "not-a-number", "20002"], "hi")
+    assert sent == [("group", 10001), ("group", 20002)]